@@ -1,22 +1,32 @@
-import requests
-from geopy.distance import distance as geopy_distance
-from geopy.geocoders import Nominatim
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
 from decimal import Decimal
 import json
 from datetime import datetime
 import os
 import time
-from bs4 import BeautifulSoup
 import random
+import threading
+import http_session
+import notifier
+import geocode_cache
+import location_index
+import fast_extract
+import oabs_templates
+from day_cache import DayCache
+from slot_store import SlotStore
+from poll_scheduler import AdaptivePollScheduler
+import subscriptions
 
 
 # --- Configuration ---
 
 # --- Notification Settings ---
+# Can list several targets, e.g. "discord:https://discord.com/api/webhooks/...,ntfy:https://ntfy.sh/topic,signal:http://localhost:8080/v2/send"
 YOUR_DISCORD_WEBHOOK_URL = os.getenv("YOUR_DISCORD_WEBHOOK_URL", "YOUR_WEBHOOK_URL_HERE")
 PROOF_OF_LIFE = os.getenv("PROOF_OF_LIFE", "False").lower() == 'true'
 INTRO_MESSAGE = os.getenv("INTRO_MESSAGE", "@everyone NCDMV Appointments Found at https://skiptheline.ncdot.gov/:\n")
-MAX_DISCORD_MESSAGE_LENGTH = 1950
 
 # --- Locations Data ---
 # Path to your locations.json file
@@ -28,6 +38,41 @@ BASE_INTERVAL_MINUTES = os.getenv("BASE_INTERVAL_MINUTES", "1")
 RANDOM_OFFSET_SECONDS_MIN = os.getenv("RANDOM_OFFSET_SECONDS_MIN", "-25")
 RANDOM_OFFSET_SECONDS_MAX = os.getenv("RANDOM_OFFSET_SECONDS_MAX", "25")
 
+# --- Scrape Engine ---
+# "sequential" checks one location/date at a time, "async" fans the same calls out concurrently.
+SCRAPE_ENGINE = os.getenv("SCRAPE_ENGINE", "sequential").lower()
+ASYNC_MAX_PER_HOST = os.getenv("ASYNC_MAX_PER_HOST", "6")  # max in-flight requests per host for the async engine
+SCAN_WORKERS = os.getenv("SCAN_WORKERS", "1")  # threads checking locations in parallel with the sequential engine
+
+# --- Adaptive Polling ---
+# "interval" sweeps every location each BASE_INTERVAL_MINUTES. "adaptive" polls each location on its own
+# schedule, faster where availability changes often, while keeping to POLL_BUDGET_PER_MINUTE requests.
+POLL_SCHEDULER = os.getenv("POLL_SCHEDULER", "interval").lower()
+POLL_BUDGET_PER_MINUTE = os.getenv("POLL_BUDGET_PER_MINUTE", "30")
+POLL_MIN_INTERVAL_SECONDS = os.getenv("POLL_MIN_INTERVAL_SECONDS", "5")
+POLL_MAX_INTERVAL_SECONDS = os.getenv("POLL_MAX_INTERVAL_SECONDS", "600")
+
+# --- Day Cache ---
+# Reuse a day's time slots for this many seconds instead of calling scrapeday for it every run.
+# 0 disables the cache.
+DAY_CACHE_STALE_SECONDS = os.getenv("DAY_CACHE_STALE_SECONDS", "0")
+
+# --- Slot Store ---
+# SQLite file remembering every slot seen and when it was notified, so a slot is only sent again
+# after NOTIFICATION_THROTTLE_MINUTES, even across restarts. Unset sends every slot every run.
+SLOT_STORE_FILE = os.getenv("SLOT_STORE_FILE")
+NOTIFICATION_THROTTLE_MINUTES = os.getenv("NOTIFICATION_THROTTLE_MINUTES", "10")
+
+# --- Streaming Notifications ---
+# Send each location's appointments as soon as that location is checked instead of once per run.
+STREAM_NOTIFICATIONS = os.getenv("STREAM_NOTIFICATIONS", "False").lower() == 'true'
+STREAM_COALESCE_SECONDS = os.getenv("STREAM_COALESCE_SECONDS", "0")  # batch locations finishing within this window
+
+# Several people with different filters, each with their own webhook, from one scraping process.
+# JSON list of subscriptions (see subscriptions.py for the format). When set, the per-person
+# filters come from the file and YOUR_DISCORD_WEBHOOK_URL / YOUR_ADDRESS / DATE_RANGE_* are ignored.
+SUBSCRIPTIONS_FILE = os.getenv("SUBSCRIPTIONS_FILE")
+
 # --- Filtering Criteria from Environment ---
 # For Distance
 YOUR_ADDRESS = os.getenv("YOUR_ADDRESS")  # e.g., "123 Main St, Raleigh, NC"
@@ -59,43 +104,53 @@ REVERSE_TYPE_MAPPING = {name: f"formJourney{num}" for num, name in TYPE_MAPPING.
 
 LOCATIONS_DATA_FILE = "locations.json"
 
+OABS_INDEX_URL = 'https://skiptheline.ncdot.gov/Webapp/Appointment/Index/a7ade79b-996d-4971-8766-97feb75254de'
+OABS_HOST = urlparse(OABS_INDEX_URL).hostname
+OABS_AMEND_STEP_URL = 'https://skiptheline.ncdot.gov/Webapp/Appointment/AmendStep'
+
+OABS_TEMPLATES = oabs_templates.OabsTemplateRegistry()
+
+
+def refresh_oabs_engine_version():
+    """After a 500, re-read the OABSEngine version from the live page. Returns True if it changed and requests should be retried."""
+    return OABS_TEMPLATES.refresh_engine_version(lambda: http_session.get(OABS_INDEX_URL, timeout=20).text)
 
-def scrapelocations(type):
-    with open(LOCATIONS_DATA_FILE, 'r') as f:
-        all_locations_data = json.load(f)
-    formJourney = (all_locations_data["fjbase"])
-    data = {
-        # this has been minimized, all of these are necessary.
-        'StepId': '09004482-03df-4378-bce7-b39db9dc7711',
-        'formJourney': formJourney,
-        'StepControls[0].FieldName': 'ApptTypeIdPreUnit',  # not needed, but got really slow suddenly when i commented out? might be fluke.
-        'StepControls[0].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[0].Model.ModelTypeName': 'OABSEngine.Models.QFlowObjectModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[0].StepControlId': '7225b493-d89c-4c14-b670-3f9c5bb24645',
-        'StepControls[0].Model.Value': type,
-        'StepControls[1].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[1].Model.ModelTypeName': 'OABSEngine.Models.ListItemModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[1].StepControlId': 'ede2f6a3-ff89-4412-b382-8cd2e4ff10d3',
-        'StepControls[1].Step.StepId': '418e99e5-dd8c-4dc0-b25b-6504ca5217f6',
-        'StepControls[2].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[2].Model.ModelTypeName': 'OABSEngine.Models.CustomerLocationModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[2].StepControlId': '2e1c2c27-af0d-40d2-b350-eacdb995d6dd',
-    }
 
+def scrapelocations(type, formJourney=None):
+    """Active location names for appointment type id `type`, or -1. formJourney defaults to fjbase in locations.json."""
+    if formJourney is None:
+        with open(LOCATIONS_DATA_FILE, 'r') as f:
+            all_locations_data = json.load(f)
+        formJourney = (all_locations_data["fjbase"])
+    # this has been minimized, all of these fields are necessary (see oabs_steps.json).
+    params, body = OABS_TEMPLATES.render("locations", form_journey=formJourney, appointment_type_id=type)
+    engine_version_refreshed = False
+
+    errors = 0
     while True:
-        errors = 0
         try:
-            response = requests.post(
-                'https://skiptheline.ncdot.gov/Webapp/Appointment/Index/a7ade79b-996d-4971-8766-97feb75254de',
-                data=data,
+            response = http_session.post(
+                OABS_INDEX_URL,
+                params=params,
+                data=body,
+                headers=oabs_templates.FORM_HEADERS,
                 timeout=20
             )
             if "<title>500 Application Error</title>" in response.text:
+                if not engine_version_refreshed and refresh_oabs_engine_version():
+                    engine_version_refreshed = True
+                    params, body = OABS_TEMPLATES.render("locations", form_journey=formJourney, appointment_type_id=type)
+                    continue
                 print("we ran into a 500 error, fuuuck bro")
                 return -1
             if "UnitIdList" in response.text:
                 break
-            # sleep(.5)
+            # e.g. a stale formJourney or expired session; don't keep posting forever
+            errors += 1
+            if errors > 6:
+                print("never found UnitIdList... odd")
+                return -1
+            time.sleep(.5)
         except Exception as e:
             if errors > 5:
                 print("over 5 errors idiot stpuid fuck!!!!")
@@ -103,63 +158,33 @@ def scrapelocations(type):
                 return -1
             errors += 1
             time.sleep(.5)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    active_location_names = []
-
-    location_item_divs = soup.find_all('div', class_='QflowObjectItem')
-    if not location_item_divs:
-        return []
-
-    for loc_div in location_item_divs:
-        classes = loc_div.get('class', [])
-        if 'Active-Unit' in classes and 'disabled-unit' not in classes:
-            name_container = loc_div.find('div', recursive=False)
-            if name_container:
-                location_name_tag = name_container.find('div', recursive=False)
-                if location_name_tag and location_name_tag.string:
-                    location_name = location_name_tag.string.strip()
-                    active_location_names.append(location_name)
-    return active_location_names
+    return fast_extract.extract_active_location_names(response.text)
 
 
 def scrapeday(date, formJourney):
-    params = {
-        'stepControlTriggerId': '919c2e66-f9d4-44a3-9a11-c271d12d8f3c',
-        'targetStepControlId': '39f2cb09-28e2-41bf-9f8e-8c8057cbdb93',
-    }
-
-    data = {
-        # this has been minimized, all of these are necessary
-        'StepId': '34cc0d43-4c99-42ea-abec-e639d2e1180b',
-        'formJourney': formJourney,
-        'StepControls[0].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',  # neeeded
-        'StepControls[0].Model.ModelTypeName': 'OABSEngine.Models.ListItemModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[0].StepControlId': 'da1fb91a-c5cb-487f-b293-44c71ffeb1ec',
-        'StepControls[1].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[1].Model.ModelTypeName': 'OABSEngine.Models.ListItemModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[1].StepControlId': '547650da-008d-4fd0-a164-31a489a44e94',
-        'StepControls[2].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[2].Model.ModelTypeName': 'OABSEngine.Models.CalendarDateModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[2].StepControlId': '919c2e66-f9d4-44a3-9a11-c271d12d8f3c',
-        'StepControls[2].Model.Value': date,
-        'StepControls[3].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[3].Model.ModelTypeName': 'OABSEngine.Models.TimeSlotModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[3].StepControlId': '39f2cb09-28e2-41bf-9f8e-8c8057cbdb93',
-        'StepControls[4].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[4].Model.ModelTypeName': 'OABSEngine.Models.ListItemModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[4].StepControlId': 'fc6c2f34-0580-4a8a-8c0b-dbb316e1a6d7',
-
-    }
+    # this has been minimized, all of these fields are necessary (see oabs_steps.json).
+    params, body = OABS_TEMPLATES.render("day_times", form_journey=formJourney, date=date)
+    engine_version_refreshed = False
 
+    errors = 0
     while True:
-        errors = 0
         try:
-            response = requests.post('https://skiptheline.ncdot.gov/Webapp/Appointment/AmendStep', params=params, data=data, timeout=20)
+            response = http_session.post(OABS_AMEND_STEP_URL, params=params, data=body, headers=oabs_templates.FORM_HEADERS, timeout=20)
             if "<title>500 Application Error</title>" in response.text:
+                if not engine_version_refreshed and refresh_oabs_engine_version():
+                    engine_version_refreshed = True
+                    params, body = OABS_TEMPLATES.render("day_times", form_journey=formJourney, date=date)
+                    continue
                 print("we ran into a 500 error, fuuuck bro")
                 return -1
             if "data-datetime" in response.text:
                 break
+            # e.g. an expired session; don't keep posting forever
+            errors += 1
+            if errors > 6:
+                print("never found data-datetime... odd")
+                return -1
+            time.sleep(.5)
         except Exception as e:
             if errors > 5:
                 print("over 5 errors idiot stpuid fuck!!!!")
@@ -168,15 +193,13 @@ def scrapeday(date, formJourney):
             errors += 1
             time.sleep(.5)
 
-    soup = BeautifulSoup(response.text, 'html.parser')
     parsed_datetime_objects = []
-    option_tags = soup.find_all('option', attrs={'data-datetime': True})
-    if not option_tags:
+    option_datetimes = fast_extract.extract_option_datetimes(response.text)
+    if not option_datetimes:
         return -1
 
     found_valid_time = False
-    for option in option_tags:
-        datetime_str = option.get('data-datetime')
+    for datetime_str in option_datetimes:
         if datetime_str and datetime_str.strip():
             try:
                 dt_object = datetime.strptime(datetime_str, "%m/%d/%Y %I:%M:%S %p")
@@ -205,37 +228,24 @@ def scrapeday(date, formJourney):
 
 
 def scrapeavailabledays(id, formJourney):
-    data = {
-        # this has been minimized, all of these are necessary
-        'StepId': 'd7147c7b-b911-44a1-9ebd-809506b78cae',
-        'formJourney': formJourney,
-        'StepControls[0].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[0].Model.ModelTypeName': 'OABSEngine.Models.ListItemModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[0].StepControlId': 'ab66e42f-812f-4cdf-90fd-55456865e085',
-        'StepControls[1].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[1].Model.ModelTypeName': 'OABSEngine.Models.StringModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[1].StepControlId': 'aa34462f-6355-4518-82b1-bdf84f068dfa',
-        'StepControls[2].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[2].Model.ModelTypeName': 'OABSEngine.Models.ListItemModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[2].StepControlId': 'd9eb34df-9d86-4730-ae38-694b51ae2785',
-        'StepControls[3].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[3].Model.ModelTypeName': 'OABSEngine.Models.QFlowObjectModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[3].StepControlId': 'f758c6da-46ae-4e42-bb78-84fecb432a90',
-        'StepControls[3].Model.Value': id,
-        'StepControls[4].TargetTypeName': 'OABSEngine.StepControl, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[4].Model.ModelTypeName': 'OABSEngine.Models.ListItemModel, OABSEngine, Version=2.29.47.104, Culture=neutral, PublicKeyToken=null',
-        'StepControls[4].StepControlId': 'b556eac8-0619-42e9-89cc-5a003b646092',
-    }
+    # this has been minimized, all of these fields are necessary (see oabs_steps.json).
+    params, body = OABS_TEMPLATES.render("available_days", form_journey=formJourney, unit_id=id)
+    engine_version_refreshed = False
 
     errors = 0
     while True:
         try:
-            response = requests.post(
-                'https://skiptheline.ncdot.gov/Webapp/Appointment/Index/a7ade79b-996d-4971-8766-97feb75254de',
-                data=data, timeout=20
+            response = http_session.post(
+                OABS_INDEX_URL,
+                params=params, data=body, headers=oabs_templates.FORM_HEADERS, timeout=20
             )
             if "var Dates" in response.text:
                 break
+            if "<title>500 Application Error</title>" in response.text and not engine_version_refreshed:
+                engine_version_refreshed = True
+                if refresh_oabs_engine_version():
+                    params, body = OABS_TEMPLATES.render("available_days", form_journey=formJourney, unit_id=id)
+                    continue
             errors += 1
             if errors > 6:
                 print("never found var dates... odd")
@@ -303,34 +313,20 @@ def get_locations_within_distance(user_address_str, max_distance_miles_str, all_
         return None, None
 
     try:
-        geolocator = Nominatim(user_agent="dmvscraper/1.0")
         print(f"  Geocoding your address: '{user_address_str}'...")
-        user_location_geo = geolocator.geocode(user_address_str, timeout=10)
-        if not user_location_geo:
+        user_coords = geocode_cache.geocode(user_address_str, user_agent="dmvscraper/1.0")
+        if not user_coords:
             print(f"  Could not geocode your address '{user_address_str}'. Checking all locations. Please try some  other addresses near you.")
             return None, None
-        user_coords = (user_location_geo.latitude, user_location_geo.longitude)
         user_coords_str = f"({user_coords[0]:.4f}, {user_coords[1]:.4f})"
         print(f"  Your geocoded coordinates: {user_coords_str}")
     except Exception as e:
         print(f"  Error geocoding your address '{user_address_str}': {e}. Checking all locations.")
         return None, None
 
-    allowed_location_names = set()
     print("  Calculating distances to DMV locations...")
-    for location_name, location_data in all_locations_data.items():
-        try:
-            if "coordinates" not in location_data or not isinstance(location_data["coordinates"], list) or len(location_data["coordinates"]) != 2:
-                continue
-            loc_coords = tuple(location_data["coordinates"])
-            dist_miles = Decimal(geopy_distance(user_coords, loc_coords).miles)
-
-            if dist_miles <= max_distance_miles:
-                allowed_location_names.add(location_name)
-
-        except Exception as e:
-            print(f"    Warning: Error processing distance for {location_name}: {e}")
-            continue
+    # name -> miles, nearest first
+    allowed_location_names = dict(location_index.index_for_locations(all_locations_data).within(user_coords, max_distance_miles))
     if not allowed_location_names:
         print(f"  No locations found within {max_distance_miles} miles of your address.")
     else:
@@ -340,82 +336,298 @@ def get_locations_within_distance(user_address_str, max_distance_miles_str, all_
 
 
 def send_discord_notification(webhook_url, message_content_to_send):
+    """Queue the message for every target in webhook_url (bare URLs are Discord webhooks, see notifier.py).
+
+    Returns True if a message with appointments was handed to the notifier, False otherwise.
+    """
     if not webhook_url or webhook_url == "YOUR_WEBHOOK_URL_HERE":
         print("Webhook URL not configured. Skipping notification.")
-        return
+        return False
 
     if message_content_to_send is None:
         if PROOF_OF_LIFE:
-            print("Sending proof-of-life notification (no appointments found).")
-            payload = {"content": "No valid NCDMV appointments found at this time matching your criteria."}
-            try:
-                requests.post(webhook_url, json=payload, timeout=10)
-            except requests.exceptions.RequestException as e:
-                print(f"Error sending proof-of-life notification: {e}")
-            return
+            print("Queueing proof-of-life notification (no appointments found).")
+            notifier.get_notifier(webhook_url).notify(
+                "No valid NCDMV appointments found at this time matching your criteria.", "proof-of-life notification"
+            )
+            return False
         else:
             print("No appointments found and PROOF_OF_LIFE is False. No notification sent.")
-            return
+            return False
 
-    full_message = INTRO_MESSAGE + message_content_to_send
-    message_chunks = []
-    remaining_message = full_message
+    return notifier.get_notifier(webhook_url).notify(INTRO_MESSAGE + message_content_to_send)
 
-    while len(remaining_message) > 0:
-        if len(remaining_message) <= MAX_DISCORD_MESSAGE_LENGTH:
-            message_chunks.append(remaining_message)
-            remaining_message = ""
-        else:
-            split_index = remaining_message.rfind('\n', 0, MAX_DISCORD_MESSAGE_LENGTH)
-            if split_index == -1:
-                split_index = MAX_DISCORD_MESSAGE_LENGTH
 
-            message_chunks.append(remaining_message[:split_index])
-            remaining_message = remaining_message[split_index:].lstrip()
+def get_location_journey_payload(location_name, all_locations_master_data, configs):
+    if location_name not in all_locations_master_data:
+        print(f"Warning: Location '{location_name}' not found in main locations.json. Skipping.")
+        return None, None
+
+    current_location_details = all_locations_master_data[location_name]
+    current_location_id = current_location_details.get("id")
+    location_form_journeys = current_location_details.get("formJourneys", {})
+    current_form_journey = configs['form_journey']
+
+    if not current_location_id or current_form_journey not in location_form_journeys:
+        return None, None
+
+    journey_specific_content_map = location_form_journeys[current_form_journey]
+    actual_journey_content_payload = journey_specific_content_map.get("journeyContent")
+
+    if not actual_journey_content_payload or actual_journey_content_payload.startswith("Placeholder:"):
+        return None, None
+    return current_location_id, actual_journey_content_payload
+
 
-            if split_index == MAX_DISCORD_MESSAGE_LENGTH and len(remaining_message) > 0:
-                message_chunks[-1] += "\n... (message split)"
+def filter_days_by_date_range(days_available_from_site, configs):
+    filter_start_date_obj = configs.get('filter_start_date')
+    filter_end_date_obj = configs.get('filter_end_date')
+    is_date_filter_active = configs.get('is_date_filter_active', False)
 
-    print(f"Sending notification in {len(message_chunks)} chunk(s)...")
-    success_all_chunks = True
-    if "https://ntfy.sh/" in webhook_url:
+    days_passing_date_range_filter = []
+    for date_string_from_site in days_available_from_site:
+        try:
+            date_object_for_comparison = datetime.strptime(date_string_from_site, "%Y-%m-%d").date()
+        except ValueError:
+            continue
+
+        passes_date_filter = True
+        if is_date_filter_active:
+            if filter_start_date_obj and date_object_for_comparison < filter_start_date_obj:
+                passes_date_filter = False
+            if passes_date_filter and filter_end_date_obj and date_object_for_comparison > filter_end_date_obj:
+                passes_date_filter = False
+
+        if passes_date_filter:
+            days_passing_date_range_filter.append(date_string_from_site)
+    return days_passing_date_range_filter
+
+
+def filter_day_times_by_time_range(date_to_get_times_for, time_strings_from_day_scrape, configs):
+    filter_start_time_obj = configs.get('filter_start_time')
+    filter_end_time_obj = configs.get('filter_end_time')
+    is_time_filter_active = configs.get('is_time_filter_active', False)
+
+    valid_appointment_datetimes = []
+    for time_string_candidate in time_strings_from_day_scrape:
+        passes_time_filter = True
         try:
-            response = requests.post(webhook_url, data=full_message.encode('utf-8'), timeout=10, headers={"Markdown": "yes", "Title": "NCDMV Appointments"})
-            response.raise_for_status()
-            print("ntfy notification sent successfully.")
-        except requests.exceptions.RequestException as e:
-            print(f"Error sending ntfy notification: {e}")
-            success_all_chunks = False
-        except Exception as e:
-            print(f"An unexpected error occurred during ntfy notification: {e}")
-            success_all_chunks = False
-    else:  # Discord webhook handling
-        for i, chunk in enumerate(message_chunks):
-            payload = {"content": chunk}
             try:
-                response = requests.post(webhook_url, json=payload, timeout=15)
-                response.raise_for_status()
-                print(f"Discord notification chunk {i+1}/{len(message_chunks)} sent successfully.")
-                if i < len(message_chunks) - 1:  # if not the last chunk, pause briefly
-                    time.sleep(1)
-            except requests.exceptions.RequestException as e:
-                print(f"Error sending Discord notification chunk {i+1}: {e}")
-                print(f"Response content: {response.text if 'response' in locals() else 'N/A'}")
-                success_all_chunks = False
-                break
-            except Exception as e:
-                print(f"An unexpected error occurred during Discord notification chunk {i+1}: {e}")
-                success_all_chunks = False
-                break
-    if success_all_chunks:
-        print("All notification chunks processed successfully.")
-    else:
-        print("Failed to send all/some notification chunks.")
+                temp_dt_for_filtering = datetime.strptime(f"{date_to_get_times_for} {time_string_candidate}", "%Y-%m-%d %I:%M:%S %p")
+            except ValueError:
+                temp_dt_for_filtering = datetime.strptime(f"{date_to_get_times_for} {time_string_candidate}", "%Y-%m-%d %I:%M %p")
+
+            time_object_for_comparison = temp_dt_for_filtering.time()
+
+            if is_time_filter_active:
+                if filter_start_time_obj and time_object_for_comparison < filter_start_time_obj:
+                    passes_time_filter = False
+                if passes_time_filter and filter_end_time_obj and time_object_for_comparison > filter_end_time_obj:
+                    passes_time_filter = False
+        except ValueError:
+            passes_time_filter = False
+
+        if passes_time_filter:
+            valid_appointment_datetimes.append(temp_dt_for_filtering)
+    return valid_appointment_datetimes
+
+
+def format_location_appointments(location_name, all_valid_appointment_datetimes_for_this_location):
+    if not all_valid_appointment_datetimes_for_this_location:
+        print("    No appointments found matching all filters at this location.")
+        return ""
+
+    all_valid_appointment_datetimes_for_this_location.sort()
+    location_specific_output_string = f"**Location: {location_name}**\n"
+    for appointment_dt in all_valid_appointment_datetimes_for_this_location:
+        # Format: M/D/YYYY H:MM:SS AM/PM, (e.g., 7/23/2025 2:45:00 PM,)
+        time_str_maybe_padded_hour = appointment_dt.strftime('%I:%M:%S %p')
+
+        final_time_str_part = ""
+        if time_str_maybe_padded_hour.startswith('0'):
+            final_time_str_part = time_str_maybe_padded_hour[1:]
+        else:
+            final_time_str_part = time_str_maybe_padded_hour
+
+        appointment_line = f"*  {appointment_dt.month}/{appointment_dt.day}/{appointment_dt.year} {final_time_str_part},\n"
+        location_specific_output_string += appointment_line
+
+    print(location_specific_output_string.strip())
+    return location_specific_output_string
+
+
+def filter_unnotified_datetimes(location_name, appointment_datetimes, configs):
+    """Record the slots as seen and drop the ones already notified within the throttle window.
+
+    The slots returned are held until release_notified_slots, so they only count as notified once sent.
+    """
+    slot_store = configs.get('slot_store')
+    if slot_store is None or not appointment_datetimes:
+        return appointment_datetimes
+    datetimes_by_slot = {appointment_dt.strftime("%Y-%m-%d %H:%M"): appointment_dt for appointment_dt in appointment_datetimes}
+    slot_store.observe(configs['appointment_type'], location_name, datetimes_by_slot)
+    new_slots = slot_store.filter_unnotified(
+        configs['appointment_type'], location_name, list(datetimes_by_slot), configs['notification_throttle_seconds']
+    )
+    slot_store.hold_notified(configs['appointment_type'], location_name, new_slots)
+    if len(new_slots) < len(datetimes_by_slot):
+        print(f"    {len(datetimes_by_slot) - len(new_slots)} of {len(datetimes_by_slot)} appointments were already notified recently.")
+    return [datetimes_by_slot[slot] for slot in new_slots]
+
+
+def release_notified_slots(configs, sent):
+    """Call after handing this sweep's message to the notifier (or deciding not to send it)."""
+    slot_store = configs.get('slot_store')
+    if slot_store is not None:
+        slot_store.release_held(sent)
+
 
+def flush_slot_store(configs):
+    slot_store = configs.get('slot_store')
+    if slot_store is None:
+        return
+    try:
+        slots_seen, slots_notified = slot_store.flush()
+        print(f"Slot store: recorded {slots_seen} seen and {slots_notified} notified appointments.")
+    except Exception as e:
+        print(f"Warning: Could not write to slot store: {e}")
+
+
+def session_is_stale(configs):
+    """True once configs['session_health'] ( set by hybrid_scrape.py ) says the captured session stopped working."""
+    session_health = configs.get('session_health')
+    return session_health is not None and session_health.is_stale()
+
+
+def record_session_response(days_available_from_site, configs):
+    session_health = configs.get('session_health')
+    if session_health is not None:
+        session_health.record(days_available_from_site != -1)
+
+
+def remember_available_days(location_name, days_available_from_site, configs):
+    day_cache = configs.get('day_cache')
+    if day_cache is not None and days_available_from_site and days_available_from_site != -1:
+        day_cache.update_dates((location_name, configs['form_journey']), days_available_from_site)
+
+
+def get_cached_day_times(location_name, date, configs):
+    day_cache = configs.get('day_cache')
+    if day_cache is None:
+        return None
+    return day_cache.get_times((location_name, configs['form_journey']), date)
+
+
+def scrapeday_and_cache(location_name, date, formJourney, configs):
+    time_strings_from_day_scrape = scrapeday(date, formJourney)
+    day_cache = configs.get('day_cache')
+    if day_cache is not None and time_strings_from_day_scrape and time_strings_from_day_scrape != -1:
+        day_cache.store_times((location_name, configs['form_journey']), date, time_strings_from_day_scrape)
+    return time_strings_from_day_scrape
 
-def get_appointments(all_locations_master_data, configs):
+
+def scrapeday_cached(location_name, date, formJourney, configs):
+    cached_times = get_cached_day_times(location_name, date, configs)
+    if cached_times is not None:
+        return cached_times
+    return scrapeday_and_cache(location_name, date, formJourney, configs)
+
+
+def collect_location_datetimes(location_name_being_checked, all_locations_master_data, configs):
+    """All appointment datetimes at one location passing the configs filters, or None if it can't be checked."""
+    current_location_id, actual_journey_content_payload = get_location_journey_payload(
+        location_name_being_checked, all_locations_master_data, configs
+    )
+    if not current_location_id or session_is_stale(configs):
+        return None
+
+    print(f"\n--- Checking Location: {location_name_being_checked} ---")
+
+    days_available_from_site = scrapeavailabledays(current_location_id, actual_journey_content_payload)
+    record_session_response(days_available_from_site, configs)
+    remember_available_days(location_name_being_checked, days_available_from_site, configs)
+    all_valid_appointment_datetimes_for_this_location = []
+
+    if days_available_from_site and days_available_from_site != -1:
+        for date_to_get_times_for in filter_days_by_date_range(days_available_from_site, configs):
+            time_strings_from_day_scrape = scrapeday_cached(
+                location_name_being_checked, date_to_get_times_for, actual_journey_content_payload, configs
+            )
+            if time_strings_from_day_scrape and time_strings_from_day_scrape != -1:
+                all_valid_appointment_datetimes_for_this_location.extend(
+                    filter_day_times_by_time_range(date_to_get_times_for, time_strings_from_day_scrape, configs)
+                )
+    return all_valid_appointment_datetimes_for_this_location
+
+
+def check_location(location_name_being_checked, all_locations_master_data, configs):
+    all_valid_appointment_datetimes_for_this_location = collect_location_datetimes(
+        location_name_being_checked, all_locations_master_data, configs
+    )
+    if all_valid_appointment_datetimes_for_this_location is None:
+        return ""
+    return format_location_appointments(
+        location_name_being_checked,
+        filter_unnotified_datetimes(location_name_being_checked, all_valid_appointment_datetimes_for_this_location, configs)
+    )
+
+
+async def check_locations_async(location_names, all_locations_master_data, configs):
+    # scrapeavailabledays/scrapeday stay blocking; the event loop fans them out onto worker
+    # threads while a semaphore per host caps how many requests are in flight at once.
+    max_per_host = configs.get('async_max_per_host', 6)
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max_per_host))
+    host_semaphores = {}
+
+    async def call_host_bounded(url, func, *args):
+        host = urlparse(url).netloc
+        if host not in host_semaphores:
+            host_semaphores[host] = asyncio.Semaphore(max_per_host)
+        async with host_semaphores[host]:
+            return await asyncio.to_thread(func, *args)
+
+    async def check_one_location(location_name):
+        current_location_id, actual_journey_content_payload = get_location_journey_payload(
+            location_name, all_locations_master_data, configs
+        )
+        if not current_location_id or session_is_stale(configs):
+            return ""
+
+        print(f"\n--- Checking Location: {location_name} ---")
+        days_available_from_site = await call_host_bounded(
+            OABS_INDEX_URL, scrapeavailabledays, current_location_id, actual_journey_content_payload
+        )
+        record_session_response(days_available_from_site, configs)
+        remember_available_days(location_name, days_available_from_site, configs)
+        all_valid_appointment_datetimes_for_this_location = []
+
+        async def scrape_day(day):
+            cached_times = get_cached_day_times(location_name, day, configs)
+            if cached_times is not None:
+                return cached_times
+            return await call_host_bounded(
+                OABS_AMEND_STEP_URL, scrapeday_and_cache, location_name, day, actual_journey_content_payload, configs
+            )
+
+        if days_available_from_site and days_available_from_site != -1:
+            days_to_scrape = filter_days_by_date_range(days_available_from_site, configs)
+            day_results = await asyncio.gather(*[scrape_day(day) for day in days_to_scrape])
+            for date_to_get_times_for, time_strings_from_day_scrape in zip(days_to_scrape, day_results):
+                if time_strings_from_day_scrape and time_strings_from_day_scrape != -1:
+                    all_valid_appointment_datetimes_for_this_location.extend(
+                        filter_day_times_by_time_range(date_to_get_times_for, time_strings_from_day_scrape, configs)
+                    )
+        return format_location_appointments(
+            location_name, filter_unnotified_datetimes(location_name, all_valid_appointment_datetimes_for_this_location, configs)
+        )
+
+    # gather keeps the input order, so the merged output matches the sequential path exactly.
+    return await asyncio.gather(*[check_one_location(name) for name in location_names])
+
+
+def get_locations_for_sweep(all_locations_master_data, configs):
     appointment_type_display_name = configs['appointment_type']
-    current_form_journey = configs['form_journey']
     appointment_type_id_for_initial_scrape = configs['appointment_type_id_for_scrape']
 
     filter_start_date_obj = configs.get('filter_start_date')
@@ -425,12 +637,11 @@ def get_appointments(all_locations_master_data, configs):
     filter_end_time_obj = configs.get('filter_end_time')
     is_time_filter_active = configs.get('is_time_filter_active', False)
 
-    total_notification_string = ""
-
     print(f"Fetching current list of active locations for type ID: {appointment_type_id_for_initial_scrape}...")
     locations_active_on_site = []
     try:
-        locations_from_scrapelocations = scrapelocations(appointment_type_id_for_initial_scrape)
+        locations_from_scrapelocations = scrapelocations(appointment_type_id_for_initial_scrape, configs.get('location_list_journey'))
+        record_session_response(locations_from_scrapelocations, configs)
         if locations_from_scrapelocations == -1:
             print("Warning: scrapelocations returned an error. Fallback initiated.")
             if configs.get('is_distance_filter_active', False):
@@ -446,7 +657,7 @@ def get_appointments(all_locations_master_data, configs):
             print(f"Found {len(locations_active_on_site)} initially active locations from site listing for this run.")
     except Exception as e:
         print(f"Critical Error during scrapelocations for this run: {e}. Skipping detailed checks.")
-        return ""
+        return None, []
 
     candidate_locations_after_prefilters = set(locations_active_on_site)
     if configs.get('is_distance_filter_active', False):
@@ -473,135 +684,355 @@ def get_appointments(all_locations_master_data, configs):
 
     print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] --- Searching for '{appointment_type_display_name}' appointments{filter_summary_text} ---")
 
-    sorted_locations_for_detailed_check = sorted(list(candidate_locations_after_prefilters))
-    print(f"Will check {len(sorted_locations_for_detailed_check)} pre-filtered locations (sorted alphabetically) for details.")
-
-    any_appointments_found_overall = False
+    location_distances = configs.get('locations_allowed_by_distance') if configs.get('is_distance_filter_active', False) else None
+    if location_distances:
+        # nearest offices first, so the ones that matter most are reported first
+        sorted_locations_for_detailed_check = sorted(
+            candidate_locations_after_prefilters, key=lambda location_name: (location_distances[location_name], location_name)
+        )
+        print(f"Will check {len(sorted_locations_for_detailed_check)} pre-filtered locations (nearest first) for details.")
+    else:
+        sorted_locations_for_detailed_check = sorted(list(candidate_locations_after_prefilters))
+        print(f"Will check {len(sorted_locations_for_detailed_check)} pre-filtered locations (sorted alphabetically) for details.")
 
     if not sorted_locations_for_detailed_check:
         print("No locations to check after applying pre-filters for this run.")
+    return sorted_locations_for_detailed_check, summary_parts
 
-    for location_name_being_checked in sorted_locations_for_detailed_check:
-        if location_name_being_checked not in all_locations_master_data:
-            print(f"Warning: Location '{location_name_being_checked}' not found in main locations.json. Skipping.")
-            continue
 
-        current_location_details = all_locations_master_data[location_name_being_checked]
-        current_location_id = current_location_details.get("id")
-        location_form_journeys = current_location_details.get("formJourneys", {})
+def print_sweep_summary(configs, summary_parts, any_appointments_found_overall):
+    appointment_type_display_name = configs['appointment_type']
+    if not any_appointments_found_overall:
+        console_summary_message = f"\n--- No appointments found for '{appointment_type_display_name}'"
+        if summary_parts:
+            console_summary_message += " matching all specified filters"
+        console_summary_message += " across checked locations for this run. ---"
+        print(console_summary_message)
+    else:
+        print(f"\n--- Finished checking locations for '{appointment_type_display_name}' for this run. ---")
+
 
-        if not current_location_id or current_form_journey not in location_form_journeys:
-            continue
+def iter_location_results(location_names, all_locations_master_data, configs, workers=1):
+    """Yield (location_name, output_string) as soon as each location finishes, in completion order."""
+    if workers <= 1:
+        for location_name in location_names:
+            yield location_name, check_location(location_name, all_locations_master_data, configs)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as location_pool:
+        pending_checks = {
+            location_pool.submit(check_location, location_name, all_locations_master_data, configs): location_name
+            for location_name in location_names
+        }
+        for finished_check in as_completed(pending_checks):
+            yield pending_checks[finished_check], finished_check.result()
+
+
+class NotificationCoalescer:
+    """Batches location messages that finish within coalesce_seconds of the first one into a single notification."""
+
+    def __init__(self, notify, coalesce_seconds=0):
+        self.notify = notify
+        self.coalesce_seconds = coalesce_seconds
+        self.pending_messages = []
+        self.flush_timer = None
+        self.lock = threading.Lock()
+
+    def add(self, message):
+        with self.lock:
+            self.pending_messages.append(message)
+            if self.coalesce_seconds > 0:
+                if self.flush_timer is None:
+                    self.flush_timer = threading.Timer(self.coalesce_seconds, self.flush)
+                    self.flush_timer.daemon = True
+                    self.flush_timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            messages_to_send = self.pending_messages
+            self.pending_messages = []
+        if messages_to_send:
+            self.notify("\n".join(message.strip() + "\n" for message in messages_to_send).strip())
+
+
+def stream_appointments(all_locations_master_data, configs, notify, coalesce_seconds=0, workers=None):
+    """Like get_appointments, but hands each location's matches to notify as soon as that location is done.
+
+    Returns True if any appointments were found.
+    """
+    if workers is None:
+        workers = configs.get('scan_workers', 1)
+    if configs.get('scrape_engine') == "async":
+        # the asyncio engine only returns once the whole sweep is gathered; stream from threads instead.
+        workers = max(workers, configs.get('async_max_per_host', 6))
+
+    sorted_locations_for_detailed_check, summary_parts = get_locations_for_sweep(all_locations_master_data, configs)
+    if sorted_locations_for_detailed_check is None:
+        return False
+
+    coalescer = NotificationCoalescer(notify, coalesce_seconds)
+    any_appointments_found_overall = False
+    try:
+        for location_name, location_specific_output_string in iter_location_results(
+            sorted_locations_for_detailed_check, all_locations_master_data, configs, workers
+        ):
+            if location_specific_output_string:
+                any_appointments_found_overall = True
+                print(f"Streaming results for {location_name} to notifier.")
+                coalescer.add(location_specific_output_string)
+    finally:
+        coalescer.flush()
 
-        journey_specific_content_map = location_form_journeys[current_form_journey]
-        actual_journey_content_payload = journey_specific_content_map.get("journeyContent")
+    print_sweep_summary(configs, summary_parts, any_appointments_found_overall)
+    return any_appointments_found_overall
 
-        if not actual_journey_content_payload or actual_journey_content_payload.startswith("Placeholder:"):
-            continue
 
-        print(f"\n--- Checking Location: {location_name_being_checked} ---")
+def run_adaptive_polling(all_locations_master_data, configs, notify, refresh_seconds):
+    """Poll each (appointment type, location) on its own churn-adaptive schedule instead of sweeping all of them every run."""
+    scheduler = AdaptivePollScheduler(
+        configs['poll_budget_per_minute'], configs['poll_min_interval_seconds'], configs['poll_max_interval_seconds']
+    )
+    configs_by_journey = {type_configs['form_journey']: type_configs for type_configs in get_type_configs(configs)}
+    last_notified_output = {}
+    next_refresh_at = 0.0
+    while True:
+        if time.monotonic() >= next_refresh_at:
+            poll_keys = []
+            for form_journey, type_configs in configs_by_journey.items():
+                candidate_locations, _ = get_locations_for_sweep(all_locations_master_data, type_configs)
+                if candidate_locations is not None:
+                    poll_keys.extend((form_journey, location_name) for location_name in candidate_locations)
+            if next_refresh_at:
+                http_session.print_session_stats()
+                print(f"Notifications waiting to send: {notifier.queue_depth()}")
+                notifier.print_stats()
+            scheduler.sync_locations(poll_keys)
+            next_refresh_at = time.monotonic() + refresh_seconds
+            flush_slot_store(configs)
+
+        for poll_key in scheduler.pop_due():
+            form_journey, location_name = poll_key
+            type_configs = configs_by_journey[form_journey]
+            # only the DMV host; notification POSTs go out on other threads meanwhile
+            requests_before = http_session.total_requests(OABS_HOST)
+            appointment_datetimes = collect_location_datetimes(location_name, all_locations_master_data, type_configs)
+            changed = scheduler.record(
+                poll_key, repr(sorted(appointment_datetimes or [])), http_session.total_requests(OABS_HOST) - requests_before
+            )
+            location_specific_output_string = "" if appointment_datetimes is None else format_location_appointments(
+                location_name, filter_unnotified_datetimes(location_name, appointment_datetimes, type_configs)
+            )
+            sent = False
+            if location_specific_output_string and location_specific_output_string != last_notified_output.get(poll_key):
+                sent = notify(label_for_type(type_configs, location_specific_output_string.strip()))
+            release_notified_slots(type_configs, sent)
+            last_notified_output[poll_key] = location_specific_output_string
+            print(f"Next poll of {location_name} ({type_configs['appointment_type']}) in {scheduler.interval_for(poll_key):.0f}s"
+                  f"{' (availability changed)' if changed else ''}.")
+
+        seconds_until_refresh = next_refresh_at - time.monotonic()
+        seconds_until_next_poll = scheduler.seconds_until_next()
+        if seconds_until_next_poll is None:
+            sleep_seconds = seconds_until_refresh
+        else:
+            sleep_seconds = min(seconds_until_next_poll, seconds_until_refresh)
+        time.sleep(max(0.5, sleep_seconds))
+
 
-        days_available_from_site = scrapeavailabledays(current_location_id, actual_journey_content_payload)
-        all_valid_appointment_datetimes_for_this_location = []
+def get_type_configs(configs):
+    """One configs dict per requested appointment type, sharing everything except the type fields."""
+    return [dict(configs, **type_entry) for type_entry in configs.get('appointment_types', [])] or [configs]
 
-        if days_available_from_site and days_available_from_site != -1:
-            days_passing_date_range_filter = []
-            for date_string_from_site in days_available_from_site:
-                try:
-                    date_object_for_comparison = datetime.strptime(date_string_from_site, "%Y-%m-%d").date()
-                except ValueError:
-                    continue
 
-                passes_date_filter = True
-                if is_date_filter_active:
-                    if filter_start_date_obj and date_object_for_comparison < filter_start_date_obj:
-                        passes_date_filter = False
-                    if passes_date_filter and filter_end_date_obj and date_object_for_comparison > filter_end_date_obj:
-                        passes_date_filter = False
+def label_for_type(configs, message):
+    if len(configs.get('appointment_types', [])) <= 1:
+        return message
+    return f"__**{configs['appointment_type']}**__\n{message}"
 
-                if passes_date_filter:
-                    days_passing_date_range_filter.append(date_string_from_site)
 
-            for date_to_get_times_for in days_passing_date_range_filter:
-                time_strings_from_day_scrape = scrapeday(date_to_get_times_for, actual_journey_content_payload)
-                if time_strings_from_day_scrape and time_strings_from_day_scrape != -1:
-                    for time_string_candidate in time_strings_from_day_scrape:
-                        passes_time_filter = True
-                        try:
-                            try:
-                                temp_dt_for_filtering = datetime.strptime(f"{date_to_get_times_for} {time_string_candidate}", "%Y-%m-%d %I:%M:%S %p")
-                            except ValueError:
-                                temp_dt_for_filtering = datetime.strptime(f"{date_to_get_times_for} {time_string_candidate}", "%Y-%m-%d %I:%M %p")
-
-                            time_object_for_comparison = temp_dt_for_filtering.time()
-
-                            if is_time_filter_active:
-                                if filter_start_time_obj and time_object_for_comparison < filter_start_time_obj:
-                                    passes_time_filter = False
-                                if passes_time_filter and filter_end_time_obj and time_object_for_comparison > filter_end_time_obj:
-                                    passes_time_filter = False
-                        except ValueError:
-                            passes_time_filter = False
-
-                        if passes_time_filter:
-                            all_valid_appointment_datetimes_for_this_location.append(temp_dt_for_filtering)
-        if all_valid_appointment_datetimes_for_this_location:
-            any_appointments_found_overall = True
-            all_valid_appointment_datetimes_for_this_location.sort()
-            location_specific_output_string = f"**Location: {location_name_being_checked}**\n"
-            for appointment_dt in all_valid_appointment_datetimes_for_this_location:
-                # Format: M/D/YYYY H:MM:SS AM/PM, (e.g., 7/23/2025 2:45:00 PM,)
-                time_str_maybe_padded_hour = appointment_dt.strftime('%I:%M:%S %p')
-
-                final_time_str_part = ""
-                if time_str_maybe_padded_hour.startswith('0'):
-                    final_time_str_part = time_str_maybe_padded_hour[1:]
-                else:
-                    final_time_str_part = time_str_maybe_padded_hour
-
-                appointment_line = f"*  {appointment_dt.month}/{appointment_dt.day}/{appointment_dt.year} {final_time_str_part},\n"
-                location_specific_output_string += appointment_line
-
-            print(location_specific_output_string.strip())
-
-            if total_notification_string:
-                total_notification_string += "\n"
-            total_notification_string += location_specific_output_string
-        else:
-            print("    No appointments found matching all filters at this location.")
+def get_appointments_for_all_types(all_locations_master_data, configs):
+    labeled_results = []
+    for type_configs in get_type_configs(configs):
+        type_results = get_appointments(all_locations_master_data, type_configs)
+        if type_results:
+            labeled_results.append(label_for_type(type_configs, type_results))
+    return "\n\n".join(labeled_results)
 
-    if not any_appointments_found_overall:
-        console_summary_message = f"\n--- No appointments found for '{appointment_type_display_name}'"
-        if summary_parts:
-            console_summary_message += " matching all specified filters"
-        console_summary_message += " across checked locations for this run. ---"
-        print(console_summary_message)
+
+def stream_appointments_for_all_types(all_locations_master_data, configs, notify, coalesce_seconds=0):
+    any_appointments_found = False
+    for type_configs in get_type_configs(configs):
+        if stream_appointments(
+            all_locations_master_data,
+            type_configs,
+            lambda message, type_configs=type_configs: notify(label_for_type(type_configs, message)),
+            coalesce_seconds
+        ):
+            any_appointments_found = True
+    return any_appointments_found
+
+
+def get_appointments(all_locations_master_data, configs, workers=None):
+    if workers is None:
+        workers = configs.get('scan_workers', 1)
+    total_notification_string = ""
+
+    sorted_locations_for_detailed_check, summary_parts = get_locations_for_sweep(all_locations_master_data, configs)
+    if sorted_locations_for_detailed_check is None:
+        return ""
+
+    if configs.get('scrape_engine') == "async":
+        location_output_strings = asyncio.run(
+            check_locations_async(sorted_locations_for_detailed_check, all_locations_master_data, configs)
+        )
+    elif workers > 1:
+        print(f"Checking locations on {workers} worker threads.")
+        with ThreadPoolExecutor(max_workers=workers) as location_pool:
+            # map yields in submission order, so output stays in the same order as the sequential path.
+            location_output_strings = list(location_pool.map(
+                lambda location_name: check_location(location_name, all_locations_master_data, configs),
+                sorted_locations_for_detailed_check
+            ))
     else:
-        print(f"\n--- Finished checking locations for '{appointment_type_display_name}' for this run. ---")
+        location_output_strings = [
+            check_location(location_name, all_locations_master_data, configs)
+            for location_name in sorted_locations_for_detailed_check
+        ]
+
+    any_appointments_found_overall = False
+    for location_specific_output_string in location_output_strings:
+        if not location_specific_output_string:
+            continue
+        any_appointments_found_overall = True
+        if total_notification_string:
+            total_notification_string += "\n"
+        total_notification_string += location_specific_output_string
 
+    print_sweep_summary(configs, summary_parts, any_appointments_found_overall)
     return total_notification_string.strip()
 
 
+def build_subscription_index(subscription_list, all_location_details):
+    """Resolve each subscription's appointment type and distance filter, then index them."""
+    indexed_subscriptions = []
+    for subscription in subscription_list:
+        if subscription["appointment_type"] not in REVERSE_TYPE_MAPPING:
+            print(f"Warning: Subscription '{subscription['name']}' has unknown appointment type '{subscription['appointment_type']}'. Skipping it.")
+            continue
+        subscription["form_journey"] = REVERSE_TYPE_MAPPING[subscription["appointment_type"]]
+        print(f"Subscription '{subscription['name']}': {subscription['appointment_type']}")
+        subscription["allowed_locations"], _ = get_locations_within_distance(
+            subscription["address"], subscription["distance"], all_location_details
+        )
+        indexed_subscriptions.append(subscription)
+    return subscriptions.SubscriptionIndex(indexed_subscriptions)
+
+
+def get_subscription_scrape_configs(configs, subscription_index, form_journey):
+    """configs for scraping one journey once on behalf of every subscriber to it."""
+    appointment_type_numeric_id, appointment_type_name = next(
+        (num_id, name) for num_id, name in TYPE_MAPPING.items() if REVERSE_TYPE_MAPPING[name] == form_journey
+    )
+    journey_configs = dict(configs)
+    journey_configs['appointment_type'] = appointment_type_name
+    journey_configs['form_journey'] = form_journey
+    journey_configs['appointment_type_id_for_scrape'] = appointment_type_numeric_id
+    allowed_locations = subscription_index.locations_for(form_journey)
+    if allowed_locations is not None:
+        # each location's distance to the nearest subscriber wanting it, for nearest-first ordering
+        location_distances = {}
+        for subscription in subscription_index.subscriptions.values():
+            if subscription["form_journey"] != form_journey:
+                continue
+            for location_name, miles in subscription["allowed_locations"].items():
+                location_distances[location_name] = min(miles, location_distances.get(location_name, miles))
+        allowed_locations = location_distances
+    journey_configs['locations_allowed_by_distance'] = allowed_locations
+    journey_configs['is_distance_filter_active'] = allowed_locations is not None
+    journey_configs['max_distance_for_display'] = "per-subscriber"
+    journey_configs['user_address_for_display'] = "subscribers"
+    # scrape the widest date window any subscriber wants; per-subscriber date/time windows are applied when matching
+    journey_configs['filter_start_date'], journey_configs['filter_end_date'] = subscription_index.date_window(form_journey)
+    journey_configs['is_date_filter_active'] = bool(journey_configs['filter_start_date'] or journey_configs['filter_end_date'])
+    journey_configs['filter_start_time'] = None
+    journey_configs['filter_end_time'] = None
+    journey_configs['is_time_filter_active'] = False
+    return journey_configs
+
+
+def run_subscription_cycle(all_locations_master_data, configs, subscription_index):
+    """Scrape every location any subscriber needs once, then send each subscriber only their matches."""
+    matched_by_subscription = {}
+    for form_journey in subscription_index.form_journeys():
+        journey_configs = get_subscription_scrape_configs(configs, subscription_index, form_journey)
+        location_names, _ = get_locations_for_sweep(all_locations_master_data, journey_configs)
+        if not location_names:
+            continue
+        workers = journey_configs.get('scan_workers', 1)
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as location_pool:
+                location_datetimes = list(location_pool.map(
+                    lambda location_name: collect_location_datetimes(location_name, all_locations_master_data, journey_configs),
+                    location_names
+                ))
+        else:
+            location_datetimes = [
+                collect_location_datetimes(location_name, all_locations_master_data, journey_configs)
+                for location_name in location_names
+            ]
+        for location_name, appointment_datetimes in zip(location_names, location_datetimes):
+            if not appointment_datetimes:
+                continue
+            for subscription_id, matched_datetimes in subscription_index.match(form_journey, location_name, appointment_datetimes).items():
+                matched_by_subscription.setdefault(subscription_id, []).append(
+                    format_location_appointments(location_name, matched_datetimes)
+                )
+
+    for subscription_id, subscription in subscription_index.subscriptions.items():
+        subscriber_outputs = matched_by_subscription.get(subscription_id)
+        if not subscriber_outputs:
+            send_discord_notification(subscription["webhook_url"], None)
+            continue
+        print(f"Sending {len(subscriber_outputs)} location(s) to subscriber '{subscription['name']}'.")
+        send_discord_notification(subscription["webhook_url"], "\n".join(subscriber_outputs).strip())
+
+
 def parse_and_validate_configs(all_location_details):
     print("--- Parsing User-Defined Configurations ---")
     configs = {}
     appointment_type_numeric_id = None
 
-    configs['appointment_type'] = APPOINTMENT_TYPE_NAME
-    if APPOINTMENT_TYPE_NAME in REVERSE_TYPE_MAPPING:
-        configs['form_journey'] = REVERSE_TYPE_MAPPING[APPOINTMENT_TYPE_NAME]
-        for num_id, name_val in TYPE_MAPPING.items():
-            if name_val == APPOINTMENT_TYPE_NAME:
-                appointment_type_numeric_id = num_id
-                break
-        configs['appointment_type_id_for_scrape'] = appointment_type_numeric_id
-        print(f"Appointment Type: '{configs['appointment_type']}' (Journey: {configs['form_journey']}, ID: {appointment_type_numeric_id})")
-    else:
-        print(f"ERROR: Invalid APPOINTMENT_TYPE_NAME '{APPOINTMENT_TYPE_NAME}'. Not found in TYPE_MAPPING.")
-        exit(1)
-    if configs['appointment_type_id_for_scrape'] is None:
-        print(f"ERROR: Could not derive numeric ID for type '{APPOINTMENT_TYPE_NAME}'.")
+    # APPOINTMENT_TYPE may list several types separated by commas; they share one location list,
+    # distance filter and HTTP pool, and get scraped in turn.
+    configs['appointment_types'] = []
+    for appointment_type_name in [name.strip() for name in APPOINTMENT_TYPE_NAME.split(",") if name.strip()]:
+        appointment_type_numeric_id = None
+        if appointment_type_name in REVERSE_TYPE_MAPPING:
+            for num_id, name_val in TYPE_MAPPING.items():
+                if name_val == appointment_type_name:
+                    appointment_type_numeric_id = num_id
+                    break
+        else:
+            print(f"ERROR: Invalid APPOINTMENT_TYPE_NAME '{appointment_type_name}'. Not found in TYPE_MAPPING.")
+            exit(1)
+        if appointment_type_numeric_id is None:
+            print(f"ERROR: Could not derive numeric ID for type '{appointment_type_name}'.")
+            exit(1)
+        type_entry = {
+            'appointment_type': appointment_type_name,
+            'form_journey': REVERSE_TYPE_MAPPING[appointment_type_name],
+            'appointment_type_id_for_scrape': appointment_type_numeric_id,
+        }
+        configs['appointment_types'].append(type_entry)
+        print(f"Appointment Type: '{type_entry['appointment_type']}' (Journey: {type_entry['form_journey']}, ID: {appointment_type_numeric_id})")
+    if not configs['appointment_types']:
+        print("ERROR: APPOINTMENT_TYPE is empty.")
         exit(1)
+    configs.update(configs['appointment_types'][0])
 
     allowed_locations_by_dist, geocoded_user_address = get_locations_within_distance(
         YOUR_ADDRESS, DISTANCE_RANGE_MILES, all_location_details
@@ -668,6 +1099,63 @@ def parse_and_validate_configs(all_location_details):
         print(f"Time Filter: Active. Start: {configs['filter_start_time'] or 'Any'}, End: {configs['filter_end_time'] or 'Any'}")
     else:
         print("Time Filter: Inactive.")
+    configs['scrape_engine'] = SCRAPE_ENGINE if SCRAPE_ENGINE in ("sequential", "async") else "sequential"
+    if configs['scrape_engine'] != SCRAPE_ENGINE:
+        print(f"Warning: Unknown SCRAPE_ENGINE '{SCRAPE_ENGINE}'. Expected 'sequential' or 'async'. Using sequential.")
+    try:
+        configs['async_max_per_host'] = max(1, int(ASYNC_MAX_PER_HOST))
+    except ValueError:
+        print(f"Warning: Invalid ASYNC_MAX_PER_HOST ('{ASYNC_MAX_PER_HOST}'). Using 6.")
+        configs['async_max_per_host'] = 6
+    try:
+        configs['scan_workers'] = max(1, int(SCAN_WORKERS))
+    except ValueError:
+        print(f"Warning: Invalid SCAN_WORKERS ('{SCAN_WORKERS}'). Using 1.")
+        configs['scan_workers'] = 1
+    try:
+        configs['poll_budget_per_minute'] = max(1.0, float(POLL_BUDGET_PER_MINUTE))
+        configs['poll_min_interval_seconds'] = max(1.0, float(POLL_MIN_INTERVAL_SECONDS))
+        configs['poll_max_interval_seconds'] = max(configs['poll_min_interval_seconds'], float(POLL_MAX_INTERVAL_SECONDS))
+    except ValueError:
+        print("Warning: Invalid POLL_BUDGET_PER_MINUTE / POLL_*_INTERVAL_SECONDS. Using defaults (30/min, 5s to 600s).")
+        configs['poll_budget_per_minute'] = 30.0
+        configs['poll_min_interval_seconds'] = 5.0
+        configs['poll_max_interval_seconds'] = 600.0
+    if POLL_SCHEDULER == "adaptive":
+        print(f"Poll Scheduler: adaptive, {configs['poll_budget_per_minute']:g} requests/min, "
+              f"{configs['poll_min_interval_seconds']:g}s to {configs['poll_max_interval_seconds']:g}s per location.")
+    else:
+        print("Poll Scheduler: fixed interval.")
+    try:
+        day_cache_stale_seconds = float(DAY_CACHE_STALE_SECONDS)
+    except ValueError:
+        print(f"Warning: Invalid DAY_CACHE_STALE_SECONDS ('{DAY_CACHE_STALE_SECONDS}'). Disabling day cache.")
+        day_cache_stale_seconds = 0
+    configs['day_cache'] = DayCache(day_cache_stale_seconds) if day_cache_stale_seconds > 0 else None
+    if configs['day_cache'] is not None:
+        print(f"Day Cache: Active, time slots refreshed at least every {day_cache_stale_seconds:g} seconds.")
+    else:
+        print("Day Cache: Inactive.")
+    configs['slot_store'] = None
+    if SLOT_STORE_FILE:
+        try:
+            configs['notification_throttle_seconds'] = float(NOTIFICATION_THROTTLE_MINUTES) * 60
+        except ValueError:
+            print(f"Warning: Invalid NOTIFICATION_THROTTLE_MINUTES ('{NOTIFICATION_THROTTLE_MINUTES}'). Using 10 minutes.")
+            configs['notification_throttle_seconds'] = 600.0
+        try:
+            configs['slot_store'] = SlotStore(SLOT_STORE_FILE)
+            print(f"Slot Store: '{SLOT_STORE_FILE}', repeats suppressed for {configs['notification_throttle_seconds'] / 60:g} minutes.")
+        except Exception as e:
+            print(f"Warning: Could not open slot store '{SLOT_STORE_FILE}': {e}. Every slot will be sent every run.")
+    else:
+        print("Slot Store: Inactive.")
+    if configs['scrape_engine'] == "async":
+        print(f"Scrape Engine: async (max {configs['async_max_per_host']} concurrent requests per host).")
+    elif configs['scan_workers'] > 1:
+        print(f"Scrape Engine: sequential, {configs['scan_workers']} location worker threads.")
+    else:
+        print("Scrape Engine: sequential.")
     print("--- User-Defined Configuration Parsing Complete ---")
     return configs
 
@@ -685,6 +1173,11 @@ if __name__ == "__main__":
         base_interval_seconds = 10 * 60
         random_offset_min_s = -25
         random_offset_max_s = 25
+    try:
+        coalesce_seconds = max(0.0, float(STREAM_COALESCE_SECONDS))
+    except ValueError:
+        print(f"Warning: Invalid STREAM_COALESCE_SECONDS ('{STREAM_COALESCE_SECONDS}'). Sending each location immediately.")
+        coalesce_seconds = 0.0
 
     if not os.path.exists(LOCATIONS_JSON_FILE):
         print(f"ERROR: {LOCATIONS_JSON_FILE} not found. Make you are running scrape.py from the same directory that locations.json is in.")
@@ -701,27 +1194,67 @@ if __name__ == "__main__":
         print("!!! WARNING: Discord webhook URL is not set. Notifications will be skipped. !!!")
 
     config = parse_and_validate_configs(all_locations_data_main)
+    subscription_index = None
+    if SUBSCRIPTIONS_FILE:
+        try:
+            subscription_list = subscriptions.load_subscriptions(SUBSCRIPTIONS_FILE, config['appointment_type'])
+        except Exception as e:
+            print(f"Error loading or parsing subscriptions file '{SUBSCRIPTIONS_FILE}': {e}")
+            exit(1)
+        subscription_index = build_subscription_index(subscription_list, all_locations_data_main)
+        if not subscription_index.subscriptions:
+            print("ERROR: No valid subscriptions found. Exiting.")
+            exit(1)
+        print(f"Loaded {len(subscription_index.subscriptions)} subscription(s) from '{SUBSCRIPTIONS_FILE}'.")
     run_count = 0
     total_run_duration_seconds = 0.0 
 
+    use_adaptive_polling = POLL_SCHEDULER == "adaptive"
+    if use_adaptive_polling and subscription_index is not None:
+        print("Warning: POLL_SCHEDULER=adaptive does not support SUBSCRIPTIONS_FILE. Using the fixed interval so subscribers still get alerts.")
+        use_adaptive_polling = False
+    elif use_adaptive_polling and STREAM_NOTIFICATIONS:
+        print("Note: POLL_SCHEDULER=adaptive already notifies per location as each one is polled; STREAM_NOTIFICATIONS is ignored.")
+
     try:
+        if use_adaptive_polling:
+            run_adaptive_polling(
+                all_locations_data_main,
+                config,
+                lambda message: send_discord_notification(YOUR_DISCORD_WEBHOOK_URL, message),
+                base_interval_seconds
+            )
         while True:
             run_count += 1
             print(f"\n==================== Starting Run #{run_count} ====================")
             run_start_time = time.monotonic()
 
-            notification_payload_data = get_appointments(
-                all_locations_data_main,
-                config
-            )
+            if subscription_index is not None:
+                run_subscription_cycle(all_locations_data_main, config, subscription_index)
+                notification_payload_data = None
+            elif STREAM_NOTIFICATIONS:
+                streamed_sends = []
+                any_found_this_run = stream_appointments_for_all_types(
+                    all_locations_data_main,
+                    config,
+                    lambda message: streamed_sends.append(send_discord_notification(YOUR_DISCORD_WEBHOOK_URL, message)),
+                    coalesce_seconds
+                )
+                release_notified_slots(config, any(streamed_sends))
+                notification_payload_data = None
+            else:
+                notification_payload_data = get_appointments_for_all_types(
+                    all_locations_data_main,
+                    config
+                )
             run_end_time = time.monotonic()
             current_run_duration_seconds = run_end_time - run_start_time
             total_run_duration_seconds += current_run_duration_seconds
             average_run_duration_seconds = total_run_duration_seconds / run_count
 
             if notification_payload_data:
-                send_discord_notification(YOUR_DISCORD_WEBHOOK_URL, notification_payload_data)
-            else:
+                release_notified_slots(config, send_discord_notification(YOUR_DISCORD_WEBHOOK_URL, notification_payload_data))
+            elif subscription_index is None and not (STREAM_NOTIFICATIONS and any_found_this_run):
                 send_discord_notification(YOUR_DISCORD_WEBHOOK_URL, None)
             random_offset = random.uniform(random_offset_min_s, random_offset_max_s)
             total_sleep_seconds = base_interval_seconds + random_offset
@@ -730,6 +1263,13 @@ if __name__ == "__main__":
             print(f"\n--- Run #{run_count} finished. ---")
             print(f"Time taken for this run: {current_run_duration_seconds:.2f} seconds.")
             print(f"Average run time over {run_count} run(s): {average_run_duration_seconds:.2f} seconds.")
+            http_session.print_session_stats()
+            print(f"Notifications waiting to send: {notifier.queue_depth()}")
+            notifier.print_stats()
+            flush_slot_store(config)
+            if config.get('day_cache') is not None:
+                day_cache_hits, day_cache_misses = config['day_cache'].take_stats()
+                print(f"Day cache: {day_cache_hits} day(s) reused, {day_cache_misses} day(s) scraped.")
             sleep_minutes = int(total_sleep_seconds // 60)
             sleep_seconds_rem = int(total_sleep_seconds % 60)
             print(f"Next check in approximately {sleep_minutes} minutes and {sleep_seconds_rem} seconds.")
@@ -745,6 +1285,8 @@ if __name__ == "__main__":
         traceback.print_exc()
         print("Exiting.")
     finally:
+        if not notifier.wait_until_idle(timeout=30):
+            print(f"Gave up waiting on {notifier.queue_depth()} unsent notification(s).")
         print("Scraper shut down.")
         if run_count > 0:
             final_average = total_run_duration_seconds / run_count
@@ -0,0 +1,405 @@
+import os
+import threading
+import time
+
+# Helpers that read page state in one execute_script call instead of one WebDriver
+# round trip per attribute per element.
+
+_HARVEST_BUTTONS_SCRIPT = """
+const isDisplayed = (el) => {
+    if (!el.getClientRects().length) return false;
+    const style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none';
+};
+return Array.from(document.querySelectorAll(arguments[0])).map((el, index) => {
+    const text = (el.innerText || '').trim();
+    const addressElement = el.querySelector('div.form-control-child') || el.querySelector("div[class*='form-control']");
+    return {
+        index: index,
+        element: el,
+        id: el.getAttribute('data-id'),
+        classes: el.className || '',
+        text: text,
+        name: text ? text.split('\\n')[0].trim() : '',
+        address: addressElement ? (addressElement.innerText || '').trim() : null,
+        displayed: isDisplayed(el),
+        enabled: !el.disabled,
+    };
+});
+"""
+
+
+def harvest_location_buttons(driver, selector):
+    """Every element matching selector as a dict, from one round trip.
+
+    Keys: index, element (a WebElement for clicking), id (the data-id unit id), classes, text, name (first line of text),
+    address (text of the nested form-control-child div, or None), displayed, enabled, and
+    available (displayed, enabled and not marked disabled-unit).
+    """
+    buttons = driver.execute_script(_HARVEST_BUTTONS_SCRIPT, selector) or []
+    for button in buttons:
+        button["available"] = "disabled-unit" not in button["classes"] and button["displayed"] and button["enabled"]
+    return buttons
+
+
+_WAIT_FOR_SESSION_STORAGE_CHANGE_SCRIPT = """
+const deadline = Date.now() + arguments[2] * 1000;
+const done = arguments[arguments.length - 1];
+const poll = () => {
+    const value = window.sessionStorage.getItem(arguments[0]);
+    if (value && value !== arguments[1] && document.readyState === 'complete') {
+        done(value);
+    } else if (Date.now() > deadline) {
+        done(null);
+    } else {
+        setTimeout(poll, 100);
+    }
+};
+poll();
+"""
+
+
+def read_session_storage(driver, key):
+    return driver.execute_script("return window.sessionStorage.getItem(arguments[0]);", key)
+
+
+def wait_for_session_storage_change(driver, key, previous_value, timeout=25):
+    """Wait in the browser until sessionStorage[key] is set to something other than previous_value.
+
+    Returns the new value, or None if it did not change within timeout seconds.
+    """
+    return driver.execute_async_script(_WAIT_FOR_SESSION_STORAGE_CHANGE_SCRIPT, key, previous_value, timeout)
+
+
+# The select's data-datetime values once its options are for the clicked date ( {"day", "month", "year"}
+# from click_date ), else null. The first option is the "select a time" placeholder.
+_OPTIONS_FOR_DATE_JS = """
+const optionsForDate = (select, clicked) => {
+    if (!select || select.options.length <= 1) return null;
+    const datetimes = Array.from(select.options).slice(1).map((option) => option.getAttribute('data-datetime'));
+    // the options still belong to the previously clicked date until the AJAX call for this one returns
+    const [month, day, year] = (datetimes[0] || '').split(' ')[0].split('/').map((part) => parseInt(part, 10));
+    if (day !== clicked.day || (clicked.month && month !== clicked.month) || (clicked.year && year !== clicked.year)) return null;
+    return datetimes;
+};
+"""
+
+_WAIT_FOR_OPTION_DATETIMES_SCRIPT = _OPTIONS_FOR_DATE_JS + """
+const selectId = arguments[0];
+const clicked = arguments[1];
+const deadline = Date.now() + arguments[2] * 1000;
+const done = arguments[arguments.length - 1];
+const poll = () => {
+    const datetimes = optionsForDate(document.getElementById(selectId), clicked);
+    if (datetimes) {
+        done(datetimes);
+    } else if (Date.now() > deadline) {
+        done(null);
+    } else {
+        setTimeout(poll, 100);
+    }
+};
+poll();
+"""
+
+
+def wait_for_option_datetimes(driver, select_id, clicked_date, timeout=25):
+    """Wait in the browser until the select has the time options of clicked_date (from click_date) and return their data-datetime values.
+
+    The polling runs inside the page, so this is a single round trip. Returns None if no options
+    appeared within timeout seconds. The driver's script timeout must be longer than timeout.
+    """
+    return driver.execute_async_script(_WAIT_FOR_OPTION_DATETIMES_SCRIPT, select_id, clicked_date, timeout)
+
+
+# Resolves once the page has settled: document loaded, no jQuery AJAX in flight, no visible BlockUI
+# overlay, and no DOM mutations for quiet_ms. Resolves false if that doesn't happen by the deadline.
+_WAIT_FOR_SETTLED_SCRIPT = """
+const timeoutMs = arguments[0] * 1000;
+const quietMs = arguments[1];
+const done = arguments[arguments.length - 1];
+const started = Date.now();
+let lastMutation = Date.now();
+const observer = new MutationObserver(() => { lastMutation = Date.now(); });
+if (document.documentElement) {
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+}
+const overlayVisible = () => Array.from(
+    document.querySelectorAll('#BlockLoader, div.blockUI.blockOverlay, div.BlockLoader')
+).some((el) => el.getClientRects().length > 0 && window.getComputedStyle(el).display !== 'none');
+const check = () => {
+    const ajaxIdle = !window.jQuery || window.jQuery.active === 0;
+    const settled = document.readyState === 'complete' && ajaxIdle && !overlayVisible()
+        && Date.now() - lastMutation >= quietMs;
+    if (settled || Date.now() - started > timeoutMs) {
+        observer.disconnect();
+        done(settled);
+    } else {
+        setTimeout(check, 50);
+    }
+};
+check();
+"""
+
+_wait_stats = {}
+_wait_stats_lock = threading.Lock()  # several browser workers can wait at the same time
+
+
+def wait_until_settled(driver, phase, replaced_sleep_seconds=0.0, timeout=15, quiet_ms=250):
+    """Block until the page is idle instead of sleeping a fixed time, and record the time saved under phase.
+
+    replaced_sleep_seconds is the fixed sleep this wait stands in for; if the in-page wait fails
+    outright we fall back to sleeping that long. Returns True if the page settled before timeout.
+    """
+    started = time.monotonic()
+    try:
+        settled = bool(driver.execute_async_script(_WAIT_FOR_SETTLED_SCRIPT, timeout, quiet_ms))
+    except Exception as e:
+        print(f"Warning: settle wait for '{phase}' failed ({e}); sleeping {replaced_sleep_seconds}s instead.")
+        time.sleep(replaced_sleep_seconds)
+        settled = False
+    waited_seconds = time.monotonic() - started
+    with _wait_stats_lock:
+        stats = _wait_stats.setdefault(phase, {"count": 0, "waited": 0.0, "replaced": 0.0, "timeouts": 0})
+        stats["count"] += 1
+        stats["waited"] += waited_seconds
+        stats["replaced"] += replaced_sleep_seconds
+        stats["timeouts"] += 0 if settled else 1
+    return settled
+
+
+def print_wait_stats(reset=True):
+    """Print time spent and saved per wait phase since the last reset."""
+    if not _wait_stats:
+        return
+    total_saved = 0.0
+    print("Page wait timings:")
+    for phase, stats in _wait_stats.items():
+        saved_seconds = stats["replaced"] - stats["waited"]
+        if stats["replaced"]:
+            total_saved += saved_seconds
+        timeout_note = f", {stats['timeouts']} timed out" if stats["timeouts"] else ""
+        if stats["replaced"]:
+            print(f"  {phase}: {stats['count']} wait(s), {stats['waited']:.1f}s waited vs {stats['replaced']:.1f}s of fixed sleeps "
+                  f"({saved_seconds:+.1f}s saved){timeout_note}")
+        else:
+            print(f"  {phase}: {stats['count']} wait(s), {stats['waited']:.1f}s waited{timeout_note}")
+    print(f"  Total saved versus fixed sleeps: {total_saved:.1f}s")
+    if reset:
+        _wait_stats.clear()
+
+
+# Non-blocking probes for driving several tabs of one browser: each answers "is this tab ready for
+# its next step?" in one round trip and returns immediately, so the caller can move on to another
+# tab while this one waits on AJAX.
+
+_PAGE_BUSY_JS = """
+const pageBusy = () => document.readyState !== 'complete'
+    || (window.jQuery && window.jQuery.active > 0)
+    || Array.from(document.querySelectorAll('#BlockLoader, div.blockUI.blockOverlay, div.BlockLoader'))
+        .some((el) => el.getClientRects().length > 0 && window.getComputedStyle(el).display !== 'none');
+"""
+
+_READ_LOCATION_PAGE_SCRIPT = _PAGE_BUSY_JS + """
+const datepicker = document.querySelector(arguments[0]);
+if (pageBusy() || !datepicker || !datepicker.getClientRects().length) return null;
+const message = document.getElementById(arguments[1]);
+return {
+    no_appointments: !!message && message.innerHTML.includes('does not currently have any appointments available'),
+    dates: document.querySelectorAll(arguments[2]).length,
+};
+"""
+
+
+def read_location_page_state(driver, datepicker_selector, no_appointments_id, clickable_dates_selector):
+    """None while the location page is still loading, else {"no_appointments": bool, "dates": clickable date count}."""
+    return driver.execute_script(_READ_LOCATION_PAGE_SCRIPT, datepicker_selector, no_appointments_id, clickable_dates_selector)
+
+
+_CLICK_DATE_SCRIPT = _PAGE_BUSY_JS + """
+if (pageBusy()) return null;
+const links = document.querySelectorAll(arguments[0]);
+if (arguments[1] >= links.length) return {};
+const link = links[arguments[1]];
+const cell = link.closest('td');
+link.click();
+return {
+    day: parseInt(link.textContent, 10),
+    // jQuery UI datepicker cells carry a zero-based month
+    month: cell && cell.dataset.month !== undefined ? parseInt(cell.dataset.month, 10) + 1 : null,
+    year: cell && cell.dataset.year !== undefined ? parseInt(cell.dataset.year, 10) : null,
+};
+"""
+
+
+def click_date(driver, clickable_dates_selector, date_index):
+    """Click the date_index-th clickable date unless the page is busy.
+
+    Returns None if the page is busy (try again later), {} if there is no such date any more, else
+    {"day", "month", "year"} of the clicked date for read_option_datetimes.
+    """
+    return driver.execute_script(_CLICK_DATE_SCRIPT, clickable_dates_selector, date_index)
+
+
+_READ_OPTION_DATETIMES_SCRIPT = _OPTIONS_FOR_DATE_JS + """
+return optionsForDate(document.getElementById(arguments[0]), arguments[1]);
+"""
+
+
+def read_option_datetimes(driver, select_id, clicked_date):
+    """The time options' data-datetime values once they are for clicked_date (from click_date), else None."""
+    return driver.execute_script(_READ_OPTION_DATETIMES_SCRIPT, select_id, clicked_date)
+
+
+_LOCATION_LIST_READY_SCRIPT = _PAGE_BUSY_JS + """
+return !pageBusy() && document.querySelectorAll(arguments[0]).length > 0;
+"""
+
+
+def location_list_ready(driver, selector):
+    """True once the location buttons are back and the page is idle."""
+    return bool(driver.execute_script(_LOCATION_LIST_READY_SCRIPT, selector))
+
+
+# Page load measurements, grouped by browser profile so a lean profile can be compared with the normal one.
+
+_NAVIGATION_TIMING_SCRIPT = """
+if (arguments[0] && window.jQuery) jQuery.fx.off = true;  // BlockUI and datepicker fades finish instantly
+const navigation = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+return {
+    load_ms: navigation ? (navigation.loadEventEnd || navigation.domContentLoadedEventEnd) - navigation.startTime : null,
+    resources: resources.length,
+    transfer_bytes: resources.reduce((total, entry) => total + (entry.transferSize || 0), navigation ? navigation.transferSize || 0 : 0),
+};
+"""
+
+_profile_stats = {}
+_profile_stats_lock = threading.Lock()
+
+
+def _stats_for(profile):
+    return _profile_stats.setdefault(profile, {
+        "pages": 0, "load_ms": 0.0, "resources": 0, "transfer_bytes": 0,
+        "durations": {}, "memory_samples": 0, "memory_mb": 0.0,
+    })
+
+
+def record_page_timing(driver, profile, disable_animations=False):
+    """Record the current page's load time, resource count and bytes transferred under profile.
+
+    With disable_animations, jQuery animations on the page are also switched off in the same round trip.
+    """
+    try:
+        timing = driver.execute_script(_NAVIGATION_TIMING_SCRIPT, disable_animations)
+    except Exception:
+        return
+    if not timing or timing["load_ms"] is None or timing["load_ms"] <= 0:
+        return
+    with _profile_stats_lock:
+        stats = _stats_for(profile)
+        stats["pages"] += 1
+        stats["load_ms"] += timing["load_ms"]
+        stats["resources"] += timing["resources"]
+        stats["transfer_bytes"] += timing["transfer_bytes"]
+
+
+def record_duration(profile, name, seconds):
+    """Record how long one step ( e.g. a datepicker refresh ) took under profile."""
+    with _profile_stats_lock:
+        count, total = _stats_for(profile)["durations"].get(name, (0, 0.0))
+        _stats_for(profile)["durations"][name] = (count + 1, total + seconds)
+
+
+def _process_memory_kb(pid):
+    # Pss splits shared pages between the processes mapping them, so summing it over Firefox's
+    # processes does not count shared libraries once per process the way VmRSS would.
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def browser_memory_mb(driver):
+    """Proportional memory (PSS) of geckodriver and every Firefox process under it, in MB.
+
+    None off Linux or when the driver's process is gone.
+    """
+    try:
+        root_pid = driver.service.process.pid
+        root_kb = _process_memory_kb(root_pid)
+        if root_kb is None:
+            return None
+        children = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # the command name can contain spaces, so split after its closing parenthesis
+                    parent_pid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent_pid, []).append(int(entry))
+        total_kb = root_kb
+        pending = list(children.get(root_pid, []))
+        while pending:
+            pid = pending.pop()
+            pending.extend(children.get(pid, []))
+            total_kb += _process_memory_kb(pid) or 0
+        return total_kb / 1024
+    except Exception:
+        return None
+
+
+def record_browser_memory(driver, profile):
+    """Sample browser_memory_mb for the profile summary; returns it."""
+    memory_mb = browser_memory_mb(driver)
+    if memory_mb is None:
+        return None
+    with _profile_stats_lock:
+        stats = _stats_for(profile)
+        stats["memory_samples"] += 1
+        stats["memory_mb"] += memory_mb
+    return memory_mb
+
+
+def _profile_summary(stats):
+    summary = {}
+    if stats["pages"]:
+        summary["page load ms"] = stats["load_ms"] / stats["pages"]
+        summary["resources per page"] = stats["resources"] / stats["pages"]
+        summary["KB per page"] = stats["transfer_bytes"] / 1024 / stats["pages"]
+    for name, (count, total) in stats["durations"].items():
+        summary[f"{name} s"] = total / count
+    if stats["memory_samples"]:
+        summary["browser memory MB"] = stats["memory_mb"] / stats["memory_samples"]
+    return summary
+
+
+def print_page_timings(baseline_profile="normal"):
+    """Print per-profile averages, and each profile's change against baseline_profile when both were measured."""
+    with _profile_stats_lock:
+        summaries = {profile: _profile_summary(stats) for profile, stats in _profile_stats.items()}
+    baseline = summaries.get(baseline_profile, {})
+    for profile, summary in summaries.items():
+        if not summary:
+            continue
+        parts = []
+        for name, value in summary.items():
+            part = f"{name} {value:.1f}"
+            if profile != baseline_profile and baseline.get(name):
+                part += f" ({(value - baseline[name]) / baseline[name] * 100:+.0f}% vs {baseline_profile})"
+            parts.append(part)
+        print(f"Browser profile '{profile}': " + ", ".join(parts))
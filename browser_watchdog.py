@@ -0,0 +1,70 @@
+import os
+
+import browser_support
+
+# --- Configuration ---
+# Firefox grows with every page it visits. A browser is restarted between runs once its process tree
+# passes BROWSER_RECYCLE_RSS_MB megabytes or it has made BROWSER_RECYCLE_NAVIGATIONS navigations (0 turns either off).
+# Despite the name the ceiling is on PSS (proportional set size, shared pages split between processes), not RSS.
+try:
+    BROWSER_RECYCLE_RSS_MB = float(os.getenv("BROWSER_RECYCLE_RSS_MB", "1500"))
+except ValueError:
+    print(f"Warning: Invalid BROWSER_RECYCLE_RSS_MB ('{os.getenv('BROWSER_RECYCLE_RSS_MB')}'). Using 1500.")
+    BROWSER_RECYCLE_RSS_MB = 1500.0
+try:
+    BROWSER_RECYCLE_NAVIGATIONS = int(os.getenv("BROWSER_RECYCLE_NAVIGATIONS", "4000"))
+except ValueError:
+    print(f"Warning: Invalid BROWSER_RECYCLE_NAVIGATIONS ('{os.getenv('BROWSER_RECYCLE_NAVIGATIONS')}'). Using 4000.")
+    BROWSER_RECYCLE_NAVIGATIONS = 4000
+# --- End Configuration ---
+
+
+def count_navigation(driver, count=1):
+    """Note that driver loaded count pages ( a get, a click that leaves the page, a back )."""
+    driver.navigation_count = getattr(driver, "navigation_count", 0) + count
+
+
+def python_rss_mb():
+    """Resident memory of this Python process in MB, None off Linux. Stands in for the Python heap size."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class BrowserWatchdog:
+    """Samples browser and Python memory after each run and says which browsers should be restarted before the next.
+
+    It only ever decides between runs; the caller does the restart, so a sweep is never cut short.
+    """
+
+    def __init__(self, max_memory_mb=BROWSER_RECYCLE_RSS_MB, max_navigations=BROWSER_RECYCLE_NAVIGATIONS):
+        self.max_memory_mb = max_memory_mb
+        self.max_navigations = max_navigations
+        self.first_python_rss_mb = None
+        self.recycled = 0
+
+    def recycle_reason(self, driver, label="browser"):
+        """Sample driver and return why it should be restarted, or None to keep it."""
+        memory_mb = browser_support.browser_memory_mb(driver)
+        navigations = getattr(driver, "navigation_count", 0)
+        memory_text = f"{memory_mb:.0f} MB" if memory_mb is not None else "unknown"
+        print(f"Watchdog: {label} memory {memory_text}, {navigations} navigation(s).")
+        if self.max_memory_mb > 0 and memory_mb is not None and memory_mb >= self.max_memory_mb:
+            return f"memory {memory_mb:.0f} MB reached the {self.max_memory_mb:.0f} MB ceiling"
+        if self.max_navigations > 0 and navigations >= self.max_navigations:
+            return f"{navigations} navigations reached the limit of {self.max_navigations}"
+        return None
+
+    def check_python(self):
+        rss_mb = python_rss_mb()
+        if rss_mb is None:
+            return
+        if self.first_python_rss_mb is None:
+            self.first_python_rss_mb = rss_mb
+        print(f"Watchdog: Python RSS {rss_mb:.0f} MB ({rss_mb - self.first_python_rss_mb:+.0f} MB since the first run), "
+              f"{self.recycled} browser(s) recycled so far.")
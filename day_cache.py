@@ -0,0 +1,54 @@
+import threading
+import time
+
+
+class DayCache:
+    """Remembers each (location, formJourney)'s last date list and per-day time slots between runs.
+
+    A day's slots are reused until they are older than stale_seconds, so scrapeday only has to run
+    for dates that are new since the last run or that are due for a refresh.
+    """
+
+    def __init__(self, stale_seconds):
+        self.stale_seconds = stale_seconds
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def update_dates(self, key, dates):
+        """Record the latest date list for key, dropping cached days that are no longer offered."""
+        dates = tuple(dates)
+        with self.lock:
+            entry = self.entries.setdefault(key, {"dates": (), "days": {}})
+            if entry["dates"] == dates:
+                return False
+            offered = set(dates)
+            entry["days"] = {day: cached for day, cached in entry["days"].items() if day in offered}
+            entry["dates"] = dates
+            return True
+
+    def get_times(self, key, date, now=None):
+        """Cached slots for date if they are still fresh, else None."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            cached = self.entries.get(key, {}).get("days", {}).get(date)
+            if cached is not None and now - cached[0] < self.stale_seconds:
+                self.hits += 1
+                return list(cached[1])
+            self.misses += 1
+            return None
+
+    def store_times(self, key, date, times, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            entry = self.entries.setdefault(key, {"dates": (), "days": {}})
+            entry["days"][date] = (now, tuple(times))
+
+    def take_stats(self):
+        """Return (hits, misses) since the last call and reset the counters."""
+        with self.lock:
+            stats = (self.hits, self.misses)
+            self.hits = 0
+            self.misses = 0
+            return stats
@@ -0,0 +1,142 @@
+import html
+import re
+
+# Single-pass extractors for the few shapes we read out of skiptheline.ncdot.gov responses.
+# They return the same values the BeautifulSoup code they replace did, without building a tree.
+
+_ATTRS = r"((?:[^>\"']|\"[^\"]*\"|'[^']*')*)"
+
+
+def _tag_mentioning(word):
+    # The word may sit anywhere in the tag, including after a quoted value containing ">".
+    return r"(?=(?:[^>\"']|\"[^\"]*\"|'[^']*')*?(?:\"[^\"]*|'[^']*)?" + word + ")"
+
+
+_QFLOW_ITEM_RE = re.compile(r"<div\b" + _tag_mentioning("QflowObjectItem") + _ATTRS + r">", re.IGNORECASE)
+_CHILD_TOKEN_RE = re.compile(r"<!--(.*?)-->|<(/?)([a-zA-Z][\w:-]*)" + _ATTRS + r">", re.DOTALL)
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+_DATETIME_OPTION_RE = re.compile(r"<option\b" + _tag_mentioning("data-datetime") + _ATTRS + r">", re.IGNORECASE)
+_APPT_TYPE_OPTION_RE = re.compile(r"<option\b" + _tag_mentioning("data-appointmenttypeid") + _ATTRS + r">(.*?)</option", re.IGNORECASE | re.DOTALL)
+_FORM_JOURNEY_RE = re.compile(r"sessionStorage\.setItem\s*\(\s*[\"']formJourney[\"']\s*,\s*[\"'](.*?)[\"']\s*\)", re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def _attribute(attrs, name):
+    """Return the (unescaped) value of attribute `name` from a raw attribute string, or None if absent."""
+    match = re.search(r"(?:^|\s)" + name + r"\s*(?:=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+)))?(?=\s|/|$)", attrs, re.IGNORECASE)
+    if not match:
+        return None
+    value = next((group for group in match.groups() if group is not None), "")
+    return html.unescape(value)
+
+
+def _is_void(token):
+    return token.group(3).lower() in _VOID_TAGS or token.group(4).rstrip().endswith("/")
+
+
+def _first_child_div(html_text, pos):
+    """End of the opening tag of the first <div> directly inside the element whose content starts at pos, or None.
+
+    Comments and other elements before it are skipped, like BeautifulSoup's find('div', recursive=False).
+    """
+    depth = 0
+    for token in _CHILD_TOKEN_RE.finditer(html_text, pos):
+        if token.group(3) is None:
+            continue  # comment
+        if token.group(2):
+            if depth == 0:
+                return None  # the parent closed first
+            depth -= 1
+        elif depth == 0 and token.group(3).lower() == "div":
+            return token.end()
+        elif not _is_void(token):
+            depth += 1
+    return None
+
+
+def _element_string(html_text, pos):
+    """BeautifulSoup's .string for the element whose content starts at pos.
+
+    That is the text of its only child, looking through a single child element ( <div><b>Name</b></div> ),
+    or None when it has no children or several.
+    """
+    only_child = None
+    depth = 0
+    text_start = pos
+    for token in _CHILD_TOKEN_RE.finditer(html_text, pos):
+        if depth == 0:
+            if token.start() > text_start:
+                if only_child is not None:
+                    return None
+                only_child = ("text", html_text[text_start:token.start()])
+            if token.group(3) is None:
+                if only_child is not None:
+                    return None
+                only_child = ("comment", token.group(1))
+            elif token.group(2):
+                break  # this element's closing tag
+            else:
+                if only_child is not None:
+                    return None
+                only_child = ("element", None if _is_void(token) else token.end())
+        if token.group(3) is not None and not _is_void(token):
+            depth += -1 if token.group(2) else 1
+        text_start = token.end()
+    else:
+        return None  # never closed
+    if only_child is None:
+        return None
+    kind, value = only_child
+    if kind == "text":
+        return html.unescape(value)
+    if kind == "comment":
+        return value
+    return _element_string(html_text, value) if value is not None else None
+
+
+def extract_active_location_names(html_text):
+    """Names of QflowObjectItem location buttons that are Active-Unit and not disabled-unit."""
+    active_location_names = []
+    for item_match in _QFLOW_ITEM_RE.finditer(html_text):
+        classes = (_attribute(item_match.group(1), "class") or "").split()
+        if "QflowObjectItem" not in classes:
+            continue
+        if "Active-Unit" not in classes or "disabled-unit" in classes:
+            continue
+        name_container_pos = _first_child_div(html_text, item_match.end())
+        name_pos = _first_child_div(html_text, name_container_pos) if name_container_pos is not None else None
+        location_name = _element_string(html_text, name_pos) if name_pos is not None else None
+        if location_name:
+            active_location_names.append(location_name.strip())
+    return active_location_names
+
+
+def extract_option_datetimes(html_text):
+    """data-datetime values of every <option> carrying that attribute, in document order."""
+    datetimes = []
+    for option_match in _DATETIME_OPTION_RE.finditer(html_text):
+        value = _attribute(option_match.group(1), "data-datetime")
+        if value is not None:
+            datetimes.append(value)
+    return datetimes
+
+
+def extract_form_journey(html_text):
+    """The formJourney blob the page stores with sessionStorage.setItem, or None."""
+    match = _FORM_JOURNEY_RE.search(html_text)
+    return match.group(1) if match else None
+
+
+def extract_appointment_type_id(html_text):
+    """First numeric data-appointmenttypeid on an <option> whose text is not '-', or None."""
+    for option_match in _APPT_TYPE_OPTION_RE.finditer(html_text):
+        appt_id = _attribute(option_match.group(1), "data-appointmenttypeid")
+        option_text = html.unescape(_TAG_RE.sub("", option_match.group(2))).strip()
+        if appt_id and appt_id.isdigit() and option_text != '-':
+            return appt_id
+    return None
+
+
+def extract_form_journey_details(html_text):
+    """(formJourney, appointment type id) from a location's AmendStep page."""
+    return extract_form_journey(html_text), extract_appointment_type_id(html_text)
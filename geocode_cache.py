@@ -0,0 +1,83 @@
+import json
+import os
+import re
+import threading
+import time
+
+from geopy.geocoders import Nominatim
+
+# --- Configuration ---
+# Geocoded addresses are kept on disk so restarts (and driver restarts) don't hit Nominatim again.
+GEOCODE_CACHE_FILE = os.getenv("GEOCODE_CACHE_FILE", "geocode_cache.json")
+try:
+    GEOCODE_CACHE_TTL_DAYS = float(os.getenv("GEOCODE_CACHE_TTL_DAYS", "30"))
+except ValueError:
+    print(f"Warning: Invalid GEOCODE_CACHE_TTL_DAYS ('{os.getenv('GEOCODE_CACHE_TTL_DAYS')}'). Using 30.")
+    GEOCODE_CACHE_TTL_DAYS = 30.0
+# --- End Configuration ---
+
+_cache_lock = threading.Lock()
+_cache_entries = None
+
+
+def normalize_address(address):
+    """Lowercase, collapse whitespace and tidy commas so trivially different spellings share an entry."""
+    address = " ".join(str(address).lower().split())
+    return re.sub(r"\s*,\s*", ", ", address).strip(" ,.")
+
+
+def _load_locked():
+    global _cache_entries
+    if _cache_entries is None:
+        try:
+            with open(GEOCODE_CACHE_FILE, 'r') as f:
+                _cache_entries = json.load(f)
+        except FileNotFoundError:
+            _cache_entries = {}
+        except Exception as e:
+            print(f"Warning: Could not read geocode cache '{GEOCODE_CACHE_FILE}': {e}. Starting with an empty cache.")
+            _cache_entries = {}
+    return _cache_entries
+
+
+def _save_locked():
+    temp_path = f"{GEOCODE_CACHE_FILE}.tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(_cache_entries, f, indent=2)
+        os.replace(temp_path, GEOCODE_CACHE_FILE)
+    except OSError as e:
+        print(f"Warning: Could not write geocode cache '{GEOCODE_CACHE_FILE}': {e}")
+
+
+def get_cached_coordinates(address, now=None):
+    """(lat, lon) for address if it was geocoded within the TTL, else None."""
+    now = time.time() if now is None else now
+    with _cache_lock:
+        entry = _load_locked().get(normalize_address(address))
+    if entry and now - entry["geocoded_at"] < GEOCODE_CACHE_TTL_DAYS * 86400:
+        return entry["latitude"], entry["longitude"]
+    return None
+
+
+def geocode(address, user_agent="dmv_appointment_scraper", timeout=10):
+    """(lat, lon) for address, from the cache when possible. None if the geocoder can't find it.
+
+    Geocoder errors are raised to the caller; only successful lookups are cached.
+    """
+    cached_coordinates = get_cached_coordinates(address)
+    if cached_coordinates:
+        print(f"Using cached coordinates for '{address}'.")
+        return cached_coordinates
+
+    location = Nominatim(user_agent=user_agent).geocode(address, timeout=timeout)
+    if not location:
+        return None
+    with _cache_lock:
+        _load_locked()[normalize_address(address)] = {
+            "latitude": location.latitude,
+            "longitude": location.longitude,
+            "geocoded_at": time.time(),
+        }
+        _save_locked()
+    return location.latitude, location.longitude
@@ -0,0 +1,121 @@
+import os
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Configuration ---
+# Connections kept alive per host. Hosts listed in HTTP_POOL_SIZES get their own size,
+# e.g. "skiptheline.ncdot.gov=8,discord.com=2"; everything else uses HTTP_POOL_MAXSIZE.
+try:
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "4"))
+except ValueError:
+    print(f"Warning: Invalid HTTP_POOL_MAXSIZE ('{os.getenv('HTTP_POOL_MAXSIZE')}'). Using 4.")
+    HTTP_POOL_MAXSIZE = 4
+HTTP_POOL_SIZES = os.getenv("HTTP_POOL_SIZES", "skiptheline.ncdot.gov=8")
+# --- End Configuration ---
+
+_session = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_requests_sent = {}
+
+
+def _accepted_encodings():
+    encodings = ["gzip", "deflate"]
+    try:
+        import brotli  # noqa: F401 -- urllib3 only decodes br when a brotli package is importable
+        encodings.append("br")
+    except ImportError:
+        pass
+    return ", ".join(encodings)
+
+
+def parse_pool_sizes(pool_sizes_str):
+    """Parse a "host=size,host=size" string into a dict, skipping malformed entries."""
+    pool_sizes = {}
+    for entry in (pool_sizes_str or "").split(","):
+        if "=" not in entry:
+            continue
+        host, size = entry.split("=", 1)
+        try:
+            pool_sizes[host.strip()] = max(1, int(size))
+        except ValueError:
+            print(f"Warning: Invalid pool size '{entry}' in HTTP_POOL_SIZES. Skipping.")
+    return pool_sizes
+
+
+def _build_session():
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = _accepted_encodings()
+    session.headers["Connection"] = "keep-alive"
+    default_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("https://", default_adapter)
+    session.mount("http://", default_adapter)
+    for host, size in parse_pool_sizes(HTTP_POOL_SIZES).items():
+        session.mount(f"https://{host}", HTTPAdapter(pool_connections=1, pool_maxsize=size))
+    return session
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def _count_request(url):
+    host = urlparse(url).hostname
+    with _stats_lock:
+        _requests_sent[host] = _requests_sent.get(host, 0) + 1
+
+
+def post(url, **kwargs):
+    """Drop-in replacement for requests.post that reuses pooled keep-alive connections."""
+    _count_request(url)
+    return get_session().post(url, **kwargs)
+
+
+def get(url, **kwargs):
+    """Drop-in replacement for requests.get that reuses pooled keep-alive connections."""
+    _count_request(url)
+    return get_session().get(url, **kwargs)
+
+
+def total_requests(host=None):
+    """Total requests sent through the shared session since startup, only those to host if given."""
+    with _stats_lock:
+        if host is not None:
+            return _requests_sent.get(host, 0)
+        return sum(_requests_sent.values())
+
+
+def session_stats():
+    """Return {host: {"requests": n, "connections": n, "reused": n}} for the shared session."""
+    stats = {host: {"requests": count, "connections": 0, "reused": 0} for host, count in _requests_sent.items()}
+    if _session is None:
+        return stats
+    for adapter in set(_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for pool_key in list(pools.keys()):
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            host_stats = stats.setdefault(pool.host, {"requests": 0, "connections": 0, "reused": 0})
+            host_stats["connections"] += pool.num_connections
+    for host_stats in stats.values():
+        host_stats["reused"] = max(0, host_stats["requests"] - host_stats["connections"])
+    return stats
+
+
+def print_session_stats():
+    stats = session_stats()
+    if not stats:
+        return
+    print("HTTP connection reuse:")
+    for host, host_stats in sorted(stats.items()):
+        print(f"  {host}: {host_stats['requests']} requests over {host_stats['connections']} connection(s), {host_stats['reused']} reused")
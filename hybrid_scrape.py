@@ -0,0 +1,293 @@
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.firefox.service import Service as FirefoxService
+from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+import json
+import os
+import random
+import threading
+import time
+import browser_support
+import fast_extract
+import http_session
+import notifier
+import beta_requests_scrape as beta
+
+# Hybrid engine: a real browser walks the site once per session and hands its cookies and the
+# live sessionStorage formJourney of every location to the requests based sweep from
+# beta_requests_scrape.py. The browser only comes back when the site stops accepting them.
+# Every other setting ( APPOINTMENT_TYPE, filters, SCRAPE_ENGINE, DAY_CACHE_STALE_SECONDS, ... ) is read
+# by beta_requests_scrape.py and works the same here.
+
+# --- Configuration ---
+GECKODRIVER_PATH = os.getenv('GECKODRIVER_PATH', 'YOUR_GECKODRIVER_PATH_HERE')
+FIREFOX_BINARY_PATH = os.getenv("FIREFOX_BINARY_PATH")
+NCDOT_APPOINTMENT_URL = "https://skiptheline.ncdot.gov"
+# Consecutive location responses that don't validate before the browser captures a new session.
+HYBRID_MAX_INVALID_RESPONSES = os.getenv("HYBRID_MAX_INVALID_RESPONSES", "3")
+# Also capture a new session after this many minutes, even if the old one still works ( 0 = never ).
+HYBRID_SESSION_MAX_AGE_MINUTES = os.getenv("HYBRID_SESSION_MAX_AGE_MINUTES", "0")
+# --- End Configuration ---
+
+LOCATION_BUTTON_SELECTOR = "div.QflowObjectItem.form-control.ui-selectable"
+
+
+class SessionHealth:
+    """Counts responses from the captured session; stale after max_invalid_responses bad ones in a row."""
+
+    def __init__(self, max_invalid_responses):
+        self.max_invalid_responses = max_invalid_responses
+        self.lock = threading.Lock()
+        self.consecutive_invalid = 0
+        self.valid = 0
+        self.invalid = 0
+
+    def record(self, is_valid):
+        with self.lock:
+            if is_valid:
+                self.valid += 1
+                self.consecutive_invalid = 0
+            else:
+                self.invalid += 1
+                self.consecutive_invalid += 1
+
+    def is_stale(self):
+        with self.lock:
+            return self.consecutive_invalid >= self.max_invalid_responses
+
+
+def setup_driver(driver_path, binary_path=None):
+    print("Setting up Firefox driver...")
+    opts = Options()
+    opts.add_argument("--headless")
+    opts.set_preference("geo.enabled", False)
+    if binary_path:
+        opts.binary_location = binary_path
+    service = FirefoxService(executable_path=driver_path)
+    try:
+        driver = webdriver.Firefox(service=service, options=opts)
+        driver.implicitly_wait(2)
+        driver.set_page_load_timeout(90)
+        driver.set_script_timeout(40)  # longer than any in-page wait in browser_support
+        print("Firefox driver initialized.")
+        return driver
+    except Exception as e:
+        print(f"ERROR: Failed to initialize Firefox driver: {e}")
+        return None
+
+
+def walk_to_location_list(driver, appointment_type_name):
+    """Landing page -> Make an Appointment -> appointment type -> location list.
+
+    Returns the formJourney the appointment type page holds, the one the location list request posts
+    ( what beta_requests_scrape.py otherwise reads from "fjbase" in locations.json ).
+    """
+    driver.get(NCDOT_APPOINTMENT_URL)
+    WebDriverWait(driver, 90).until(EC.element_to_be_clickable((By.ID, "cmdMakeAppt"))).click()
+    browser_support.wait_until_settled(driver, "appointment type page")
+    location_list_journey = browser_support.read_session_storage(driver, "formJourney") or \
+        fast_extract.extract_form_journey(driver.page_source)
+    type_button_xpath = f"//div[contains(@class, 'QflowObjectItem') and .//div[contains(text(), '{appointment_type_name}')]]"
+    type_button = WebDriverWait(driver, 50).until(EC.element_to_be_clickable((By.XPATH, type_button_xpath)))
+    driver.execute_script("arguments[0].click();", type_button)
+    browser_support.wait_until_settled(driver, "location list")
+    WebDriverWait(driver, 45).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, LOCATION_BUTTON_SELECTOR)))
+    return location_list_journey
+
+
+def capture_location_journey(driver, button):
+    """Open one location and return the formJourney its page stores in sessionStorage, then go back to the list."""
+    previous_journey = browser_support.read_session_storage(driver, "formJourney")
+    driver.execute_script("arguments[0].click();", button["element"])
+    form_journey = browser_support.wait_for_session_storage_change(driver, "formJourney", previous_journey)
+    if not form_journey:
+        # older pages only have it in the inline sessionStorage.setItem call
+        form_journey = fast_extract.extract_form_journey(driver.page_source)
+    driver.back()
+    WebDriverWait(driver, 25).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, LOCATION_BUTTON_SELECTOR)))
+    browser_support.wait_until_settled(driver, "back to location list")
+    return form_journey
+
+
+def capture_session(appointment_type_names, wanted_locations=None):
+    """Walk the site in a real browser and capture what the HTTP sweep needs.
+
+    Returns ({location name: {"id", "formJourneys"}}, cookies, user agent, location list formJourney);
+    locations not in wanted_locations ( None means all ) are skipped. The browser is closed again before returning.
+    """
+    driver = setup_driver(GECKODRIVER_PATH, FIREFOX_BINARY_PATH)
+    if driver is None:
+        return {}, [], None, None
+    captured_locations = {}
+    location_list_journey = None
+    started = time.monotonic()
+    try:
+        for appointment_type_name in appointment_type_names:
+            journey_key = beta.REVERSE_TYPE_MAPPING[appointment_type_name]
+            print(f"Capturing '{appointment_type_name}' session in the browser...")
+            location_list_journey = walk_to_location_list(driver, appointment_type_name) or location_list_journey
+            available_names = [
+                button["name"] for button in browser_support.harvest_location_buttons(driver, LOCATION_BUTTON_SELECTOR)
+                if button["available"] and button["name"] and (wanted_locations is None or button["name"] in wanted_locations)
+            ]
+            for location_name in available_names:
+                # harvest again: element references go stale after every navigation
+                buttons = {button["name"]: button for button in browser_support.harvest_location_buttons(driver, LOCATION_BUTTON_SELECTOR)}
+                button = buttons.get(location_name)
+                if button is None or not button["available"]:
+                    continue
+                try:
+                    form_journey = capture_location_journey(driver, button)
+                except Exception as e:
+                    print(f"  Could not capture {location_name}: {type(e).__name__}: {e}")
+                    walk_to_location_list(driver, appointment_type_name)
+                    continue
+                if not form_journey or not button["id"]:
+                    print(f"  No formJourney captured for {location_name}.")
+                    continue
+                location_entry = captured_locations.setdefault(location_name, {"id": button["id"], "formJourneys": {}})
+                location_entry["formJourneys"][journey_key] = {"journeyContent": form_journey}
+            print(f"  Captured {sum(journey_key in entry['formJourneys'] for entry in captured_locations.values())} location(s).")
+        cookies = driver.get_cookies()
+        user_agent = driver.execute_script("return navigator.userAgent;")
+    except Exception as e:
+        # formJourneys are only good with the cookies of the session that produced them
+        print(f"ERROR: Browser session capture failed: {type(e).__name__}: {e}")
+        captured_locations, cookies, user_agent, location_list_journey = {}, [], None, None
+    finally:
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Warning during driver cleanup: {e}")
+    print(f"Browser session captured in {time.monotonic() - started:.1f}s.")
+    return captured_locations, cookies, user_agent, location_list_journey
+
+
+def install_session(cookies, user_agent):
+    """Send the browser's cookies and user agent with every request on the shared HTTP session.
+
+    Without cookies the session is left as it is.
+    """
+    if not cookies:
+        return
+    session = http_session.get_session()
+    session.cookies.clear()
+    for cookie in cookies:
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+    if user_agent:
+        session.headers["User-Agent"] = user_agent
+
+
+def merge_captured_locations(all_locations_data, captured_locations):
+    """locations.json entries ( for addresses and coordinates ) with the captured ids and formJourneys on top."""
+    merged_locations = {}
+    for location_name, location_details in all_locations_data.items():
+        if not isinstance(location_details, dict):
+            merged_locations[location_name] = location_details
+            continue
+        merged_locations[location_name] = dict(location_details, formJourneys=dict(location_details.get("formJourneys") or {}))
+    for location_name, captured in captured_locations.items():
+        entry = merged_locations.setdefault(location_name, {"formJourneys": {}})
+        entry["id"] = captured["id"]
+        entry["formJourneys"].update(captured["formJourneys"])
+    return merged_locations
+
+
+def wanted_locations_for(configs):
+    """Only capture what the sweep will check: the locations inside the distance filter, if there is one."""
+    if configs.get('is_distance_filter_active'):
+        return set(configs.get('locations_allowed_by_distance') or [])
+    return None
+
+
+if __name__ == "__main__":
+    if GECKODRIVER_PATH == 'YOUR_GECKODRIVER_PATH_HERE':
+        print("Please set your geckodriver path.")
+        exit()
+    try:
+        base_interval_seconds = int(beta.BASE_INTERVAL_MINUTES) * 60
+        random_offset_min_s = int(beta.RANDOM_OFFSET_SECONDS_MIN)
+        random_offset_max_s = max(random_offset_min_s, int(beta.RANDOM_OFFSET_SECONDS_MAX))
+    except ValueError:
+        print("Error: Invalid format for interval/offset ENV variables. Using defaults (10min +/- 25s).")
+        base_interval_seconds = 10 * 60
+        random_offset_min_s = -25
+        random_offset_max_s = 25
+    try:
+        max_invalid_responses = max(1, int(HYBRID_MAX_INVALID_RESPONSES))
+    except ValueError:
+        print(f"Warning: Invalid HYBRID_MAX_INVALID_RESPONSES ('{HYBRID_MAX_INVALID_RESPONSES}'). Using 3.")
+        max_invalid_responses = 3
+    try:
+        session_max_age_seconds = float(HYBRID_SESSION_MAX_AGE_MINUTES) * 60
+    except ValueError:
+        print(f"Warning: Invalid HYBRID_SESSION_MAX_AGE_MINUTES ('{HYBRID_SESSION_MAX_AGE_MINUTES}'). Sessions are kept until they stop working.")
+        session_max_age_seconds = 0
+
+    if not os.path.exists(beta.LOCATIONS_JSON_FILE):
+        print(f"ERROR: {beta.LOCATIONS_JSON_FILE} not found.")
+        exit()
+    with open(beta.LOCATIONS_JSON_FILE, 'r') as f:
+        all_locations_data_main = json.load(f)
+    print(f"Loaded location data from '{beta.LOCATIONS_JSON_FILE}'. ({len(all_locations_data_main)} locations)")
+
+    config = beta.parse_and_validate_configs(all_locations_data_main)
+    appointment_type_names = [type_configs['appointment_type'] for type_configs in beta.get_type_configs(config)]
+    sweep_locations_data = all_locations_data_main
+    session_health = None
+    session_captured_at = None
+    run_count = 0
+
+    try:
+        while True:
+            run_count += 1
+            print(f"\n==================== Starting Run #{run_count} ====================")
+            session_expired = session_max_age_seconds > 0 and session_captured_at is not None and \
+                time.monotonic() - session_captured_at > session_max_age_seconds
+            captured_this_run = session_health is None or session_health.is_stale() or session_expired
+            if captured_this_run:
+                if session_health is not None:
+                    print("Captured session stopped validating or expired. Refreshing it through the browser.")
+                captured_locations, cookies, user_agent, location_list_journey = capture_session(
+                    appointment_type_names, wanted_locations_for(config)
+                )
+                if captured_locations:
+                    install_session(cookies, user_agent)
+                    sweep_locations_data = merge_captured_locations(all_locations_data_main, captured_locations)
+                    config['location_list_journey'] = location_list_journey
+                else:
+                    print("Warning: Nothing captured from the browser; using the formJourneys in locations.json this run.")
+                    sweep_locations_data = all_locations_data_main
+                    config['location_list_journey'] = None
+                session_health = SessionHealth(max_invalid_responses)
+                session_captured_at = time.monotonic()
+                config['session_health'] = session_health
+
+            run_start_time = time.monotonic()
+            notification_payload_data = beta.get_appointments_for_all_types(sweep_locations_data, config)
+            print(f"HTTP sweep took {time.monotonic() - run_start_time:.2f} seconds "
+                  f"({session_health.valid} valid / {session_health.invalid} invalid location responses this session).")
+
+            if notification_payload_data:
+                beta.release_notified_slots(config, beta.send_discord_notification(beta.YOUR_DISCORD_WEBHOOK_URL, notification_payload_data))
+            else:
+                beta.send_discord_notification(beta.YOUR_DISCORD_WEBHOOK_URL, None)
+            http_session.print_session_stats()
+            notifier.print_stats()
+            beta.flush_slot_store(config)
+
+            if session_health.is_stale() and not captured_this_run:
+                # don't wait out the interval on a dead session, but never capture twice in a row without sleeping
+                continue
+            total_sleep_seconds = max(1, base_interval_seconds + random.uniform(random_offset_min_s, random_offset_max_s))
+            print(f"Next check in approximately {int(total_sleep_seconds // 60)} minutes and {int(total_sleep_seconds % 60)} seconds.")
+            time.sleep(total_sleep_seconds)
+
+    except KeyboardInterrupt:
+        print("\nCtrl+C detected. Exiting scraper.")
+    finally:
+        if not notifier.wait_until_idle(timeout=30):
+            print(f"Gave up waiting on {notifier.queue_depth()} unsent notification(s).")
+        print("Scraper shut down.")
@@ -0,0 +1,100 @@
+import json
+
+import numpy as np
+from geopy.distance import distance as geopy_distance
+
+EARTH_RADIUS_MILES = 3958.7613
+# Haversine on a sphere differs from geopy's ellipsoidal distance by well under 0.6%; offices this
+# close to the radius are re-checked with geopy so the cutoff matches the old per-office loop exactly.
+BOUNDARY_TOLERANCE = 0.006
+
+_file_indexes = {}
+_dict_indexes = {}
+
+
+class LocationIndex:
+    """DMV office coordinates held in NumPy arrays for vectorized radius queries."""
+
+    def __init__(self, names, coordinates):
+        self.names = list(names)
+        self.coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        # Precomputed once so a query is a handful of array operations.
+        self.lat_radians = np.radians(self.coordinates[:, 0])
+        self.lon_radians = np.radians(self.coordinates[:, 1])
+        self.cos_lat = np.cos(self.lat_radians)
+
+    @classmethod
+    def from_coordinates_list(cls, locations_data):
+        """From ncdot_locations_coordinates_only.json's [{"address", "coordinates"}, ...] list."""
+        names, coordinates = [], []
+        for item in locations_data:
+            location_coords = item.get("coordinates")
+            if not isinstance(location_coords, list) or len(location_coords) != 2:
+                print(f"Warning: Skipping location entry '{item.get('address', 'N/A')}' with invalid coordinates.")
+                continue
+            names.append(item["address"])
+            coordinates.append(location_coords)
+        return cls(names, coordinates)
+
+    @classmethod
+    def from_locations_dict(cls, locations_data):
+        """From locations.json's {name: {"coordinates": [lat, lon], ...}} mapping."""
+        names, coordinates = [], []
+        for location_name, location_data in locations_data.items():
+            if not isinstance(location_data, dict):
+                continue  # e.g. the top-level "fjbase" string
+            location_coords = location_data.get("coordinates")
+            if not isinstance(location_coords, list) or len(location_coords) != 2:
+                continue
+            names.append(location_name)
+            coordinates.append(location_coords)
+        return cls(names, coordinates)
+
+    def haversine_miles(self, point):
+        """Great-circle distance in miles from point (lat, lon) to every office."""
+        lat = np.radians(point[0])
+        lon = np.radians(point[1])
+        half_chord = (np.sin((self.lat_radians - lat) / 2) ** 2
+                      + np.cos(lat) * self.cos_lat * np.sin((self.lon_radians - lon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(half_chord, 1.0)))
+
+    def within(self, point, radius_miles):
+        """[(name, miles), ...] for every office within radius_miles of point, nearest first."""
+        radius_miles = float(radius_miles)
+        miles = self.haversine_miles(point)
+        candidates = np.nonzero(miles <= radius_miles * (1 + BOUNDARY_TOLERANCE))[0]
+        results = []
+        for i in candidates[np.argsort(miles[candidates], kind="stable")]:
+            distance_miles = float(miles[i])
+            if distance_miles >= radius_miles * (1 - BOUNDARY_TOLERANCE):
+                distance_miles = geopy_distance(point, tuple(self.coordinates[i])).miles
+                if distance_miles > radius_miles:
+                    continue
+            results.append((self.names[i], distance_miles))
+        # re-checked offices carry their geopy distance, so order by what is reported
+        results.sort(key=lambda result: result[1])
+        return results
+
+
+def load_coordinates_file(location_file):
+    """LocationIndex for a coordinates-only JSON file, loaded once per path."""
+    if location_file not in _file_indexes:
+        with open(location_file, 'r') as f:
+            _file_indexes[location_file] = LocationIndex.from_coordinates_list(json.load(f))
+    return _file_indexes[location_file]
+
+
+def index_for_locations(locations_data):
+    """LocationIndex for an already-loaded locations.json dict, rebuilt only when its names or coordinates change."""
+    # Keyed on content rather than the dict's identity, so editing the dict in place is never served a stale index.
+    key = tuple(
+        (location_name, tuple(location_data.get("coordinates")))
+        for location_name, location_data in locations_data.items()
+        if isinstance(location_data, dict) and isinstance(location_data.get("coordinates"), list)
+    )
+    index = _dict_indexes.get(key)
+    if index is None:
+        if len(_dict_indexes) >= 8:
+            _dict_indexes.clear()
+        index = _dict_indexes[key] = LocationIndex.from_locations_dict(locations_data)
+    return index
@@ -0,0 +1,169 @@
+import os
+import queue
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+import http_session
+
+# --- Configuration ---
+# Notifications are posted by a background thread so scraping never waits on a webhook.
+try:
+    NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", "5"))
+except ValueError:
+    print(f"Warning: Invalid NOTIFY_MAX_RETRIES ('{os.getenv('NOTIFY_MAX_RETRIES')}'). Using 5.")
+    NOTIFY_MAX_RETRIES = 5
+try:
+    NOTIFY_MAX_BACKOFF_SECONDS = float(os.getenv("NOTIFY_MAX_BACKOFF_SECONDS", "60"))
+except ValueError:
+    print(f"Warning: Invalid NOTIFY_MAX_BACKOFF_SECONDS ('{os.getenv('NOTIFY_MAX_BACKOFF_SECONDS')}'). Using 60.")
+    NOTIFY_MAX_BACKOFF_SECONDS = 60.0
+# --- End Configuration ---
+
+
+def _retry_after_seconds(response):
+    """Seconds the server asked us to wait, from Retry-After or Discord's rate-limit headers/body."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    reset_after = response.headers.get("X-RateLimit-Reset-After")
+    if reset_after:
+        try:
+            return max(0.0, float(reset_after))
+        except ValueError:
+            pass
+    try:
+        return max(0.0, float(response.json().get("retry_after")))
+    except Exception:
+        return None
+
+
+class NotificationDispatcher:
+    """Owns notification delivery: a queue of messages, each a list of POSTs sent in order by one worker thread.
+
+    429s wait out Retry-After (or Discord's X-RateLimit-Reset-After), 5xx and connection errors
+    back off exponentially, and a host that reports its rate-limit bucket empty is left alone
+    until the bucket resets, so chunks no longer need a fixed sleep between them.
+    """
+
+    def __init__(self, name="notifications", max_retries=NOTIFY_MAX_RETRIES, max_backoff_seconds=NOTIFY_MAX_BACKOFF_SECONDS):
+        self.name = name
+        self.max_retries = max_retries
+        self.max_backoff_seconds = max_backoff_seconds
+        self.pending = queue.Queue()
+        self.host_ready_at = {}
+        self.stats_lock = threading.Lock()
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.total_latency_seconds = 0.0
+        self.max_latency_seconds = 0.0
+        self.worker = threading.Thread(target=self._run, name=f"notification-dispatcher {name}", daemon=True)
+        self.worker.start()
+
+    def submit(self, description, posts):
+        """Queue one message. posts is a list of (url, requests.post keyword args) sent in order."""
+        self.pending.put((description, posts, time.monotonic()))
+        return self.queue_depth()
+
+    def stats(self):
+        """Delivery counters; latency is from submit() to the last part being accepted."""
+        with self.stats_lock:
+            return {
+                "delivered": self.delivered,
+                "failed": self.failed,
+                "retries": self.retries,
+                "queued": self.queue_depth(),
+                "average_latency_seconds": self.total_latency_seconds / self.delivered if self.delivered else 0.0,
+                "max_latency_seconds": self.max_latency_seconds,
+            }
+
+    def queue_depth(self):
+        return self.pending.unfinished_tasks
+
+    def wait_until_idle(self, timeout=None):
+        """Block until everything queued so far was delivered or given up on. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.pending.all_tasks_done:
+            while self.pending.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.pending.all_tasks_done.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            description, posts, submitted_at = self.pending.get()
+            delivered = False
+            try:
+                for i, (url, post_kwargs) in enumerate(posts):
+                    part = f"{description} part {i + 1}/{len(posts)}" if len(posts) > 1 else description
+                    if not self._post_with_retries(url, post_kwargs, part):
+                        print(f"Giving up on {description}; {len(posts) - i - 1} remaining part(s) not sent.")
+                        break
+                else:
+                    delivered = True
+            except Exception as e:
+                print(f"Unexpected error delivering {description}: {e}")
+            with self.stats_lock:
+                if delivered:
+                    latency_seconds = time.monotonic() - submitted_at
+                    self.delivered += 1
+                    self.total_latency_seconds += latency_seconds
+                    self.max_latency_seconds = max(self.max_latency_seconds, latency_seconds)
+                else:
+                    self.failed += 1
+            self.pending.task_done()
+
+    def _wait_for_host(self, host):
+        wait_seconds = self.host_ready_at.get(host, 0) - time.monotonic()
+        if wait_seconds > 0:
+            print(f"Waiting {wait_seconds:.1f}s for {host} rate limit to reset...")
+            time.sleep(wait_seconds)
+
+    def _post_with_retries(self, url, post_kwargs, description):
+        host = urlparse(url).hostname
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self.stats_lock:
+                    self.retries += 1
+            self._wait_for_host(host)
+            backoff_seconds = min(self.max_backoff_seconds, 2 ** attempt) * random.uniform(0.5, 1.0)
+            try:
+                response = http_session.post(url, **post_kwargs)
+            except requests.exceptions.RequestException as e:
+                print(f"Error sending {description} (attempt {attempt + 1}): {e}")
+                self.host_ready_at[host] = time.monotonic() + backoff_seconds
+                continue
+
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                reset_after = _retry_after_seconds(response) or 0
+                self.host_ready_at[host] = time.monotonic() + reset_after
+            if response.status_code == 429:
+                retry_after = _retry_after_seconds(response)
+                wait_seconds = min(self.max_backoff_seconds, retry_after if retry_after is not None else backoff_seconds)
+                print(f"Rate limited sending {description}; retrying in {wait_seconds:.1f}s.")
+                self.host_ready_at[host] = time.monotonic() + wait_seconds
+                continue
+            if response.status_code >= 500:
+                print(f"Server error {response.status_code} sending {description} (attempt {attempt + 1}).")
+                self.host_ready_at[host] = time.monotonic() + backoff_seconds
+                continue
+            if response.status_code >= 400:
+                print(f"Error sending {description}: HTTP {response.status_code} {response.text[:200]}")
+                return False
+            print(f"{description} sent successfully.")
+            return True
+        return False
+
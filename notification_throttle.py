@@ -0,0 +1,46 @@
+import time
+from collections import deque
+
+
+class NotificationThrottle:
+    """Remembers which keys were notified within the last window_seconds.
+
+    Entries sit in a deque in the order they were recorded, so expiring old ones only ever pops
+    from the left, and membership is a dict lookup. Both are O(1) amortized per notification.
+    """
+
+    def __init__(self, window_seconds):
+        self.window_seconds = window_seconds
+        self.expiry_queue = deque()
+        self.last_sent = {}
+
+    def __len__(self):
+        return len(self.last_sent)
+
+    def expire(self, now=None):
+        """Forget entries older than the window. Returns how many were dropped."""
+        now = time.time() if now is None else now
+        cutoff = now - self.window_seconds
+        expired_count = 0
+        while self.expiry_queue and self.expiry_queue[0][0] <= cutoff:
+            sent_at, key = self.expiry_queue.popleft()
+            # a key re-recorded later has a newer entry further back in the queue
+            if self.last_sent.get(key) == sent_at:
+                del self.last_sent[key]
+                expired_count += 1
+        return expired_count
+
+    def seconds_remaining(self, key, now=None):
+        """Seconds until key may be notified again, or 0 if it may be now."""
+        now = time.time() if now is None else now
+        self.expire(now)
+        sent_at = self.last_sent.get(key)
+        if sent_at is None:
+            return 0
+        return max(0.0, sent_at + self.window_seconds - now)
+
+    def record(self, key, sent_at=None):
+        """Mark key as notified at sent_at. Records must be made in time order."""
+        sent_at = time.time() if sent_at is None else sent_at
+        self.last_sent[key] = sent_at
+        self.expiry_queue.append((sent_at, key))
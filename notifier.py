@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from notification_dispatcher import NotificationDispatcher
+
+# --- Configuration ---
+# A notification target is either a bare URL or "kind:url" with kind one of discord, ntfy, signal or
+# webhook, e.g. "discord:https://discord.com/api/webhooks/...,ntfy:https://ntfy.sh/my-topic".
+# Several targets separated by commas all get every alert, each delivered independently.
+SIGNAL_NUMBER = os.getenv("SIGNAL_NUMBER")  # sending number for signal-cli REST targets
+SIGNAL_GROUP = os.getenv("SIGNAL_GROUP")    # recipient (group id or number) for signal-cli REST targets
+# --- End Configuration ---
+
+MAX_MESSAGE_LENGTH = 1950  # Slightly less than Discord's 2000 for safety margin
+
+_dispatchers = {}
+_notifiers = {}
+_registry_lock = threading.Lock()
+
+
+def split_message(message, max_length=MAX_MESSAGE_LENGTH):
+    """Split message into chunks of at most max_length, preferring line breaks."""
+    message_chunks = []
+    remaining_message = message
+    while len(remaining_message) > 0:
+        if len(remaining_message) <= max_length:
+            message_chunks.append(remaining_message)
+            remaining_message = ""
+        else:
+            split_index = remaining_message.rfind('\n', 0, max_length)
+            if split_index == -1:
+                split_index = max_length
+
+            message_chunks.append(remaining_message[:split_index])
+            remaining_message = remaining_message[split_index:].lstrip()
+
+            if split_index == max_length and len(remaining_message) > 0:
+                message_chunks[-1] += "\n... (message split)"  # forced split in middle of line
+    return message_chunks
+
+
+class DiscordSink:
+    kind = "discord"
+
+    def __init__(self, url):
+        self.url = url
+
+    def build_posts(self, message):
+        return [(self.url, {"json": {"content": chunk}, "timeout": 15}) for chunk in split_message(message)]
+
+
+class NtfySink:
+    kind = "ntfy"
+
+    def __init__(self, url, title="NCDMV Appointments"):
+        self.url = url
+        self.title = title
+
+    def build_posts(self, message):
+        return [(self.url, {"data": message.encode('utf-8'), "timeout": 10, "headers": {"Markdown": "yes", "Title": self.title}})]
+
+
+class SignalSink:
+    """signal-cli REST API /v2/send endpoint."""
+
+    kind = "signal"
+
+    def __init__(self, url, number=None, recipient=None):
+        self.url = url
+        self.number = number if number is not None else SIGNAL_NUMBER
+        self.recipient = recipient if recipient is not None else SIGNAL_GROUP
+
+    def build_posts(self, message):
+        return [
+            (self.url, {"json": {"number": self.number, "message": chunk, "recipients": [self.recipient]}, "timeout": 15})
+            for chunk in split_message(message)
+        ]
+
+
+class WebhookSink:
+    """Any endpoint accepting a JSON {"message": ...} POST."""
+
+    kind = "webhook"
+
+    def __init__(self, url):
+        self.url = url
+
+    def build_posts(self, message):
+        return [(self.url, {"json": {"message": message}, "timeout": 15})]
+
+
+SINK_TYPES = {sink_type.kind: sink_type for sink_type in (DiscordSink, NtfySink, SignalSink, WebhookSink)}
+
+
+def parse_sinks(targets, default_kind="discord", signal_number=None, signal_recipient=None):
+    """Build sinks from a comma separated list of "kind:url" or bare URLs (bare ntfy.sh URLs are ntfy)."""
+    sinks = []
+    for target in (targets or "").split(","):
+        target = target.strip()
+        if not target or target == "YOUR_WEBHOOK_URL_HERE":
+            continue
+        kind, _, url = target.partition(":")
+        if kind not in SINK_TYPES:
+            kind, url = ("ntfy" if "https://ntfy.sh/" in target else default_kind), target
+        if kind == "signal":
+            sinks.append(SignalSink(url, signal_number, signal_recipient))
+        else:
+            sinks.append(SINK_TYPES[kind](url))
+    return sinks
+
+
+def _dispatcher_for(sink):
+    # One queue per destination, so chunks to one sink stay in order while sinks deliver in parallel.
+    key = (sink.kind, sink.url)
+    with _registry_lock:
+        if key not in _dispatchers:
+            _dispatchers[key] = NotificationDispatcher(name=f"{sink.kind} ({urlparse(sink.url).hostname})")
+        return _dispatchers[key]
+
+
+class Notifier:
+    """Fans each alert out to every configured sink; each sink has its own background delivery thread."""
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+        self.dispatchers = [_dispatcher_for(sink) for sink in self.sinks]
+
+    def notify(self, message, description="notification"):
+        """Queue message for every sink and return immediately. Returns False if no sinks are configured."""
+        if not self.sinks:
+            print("No notification targets configured. Skipping notification.")
+            return False
+        for sink, dispatcher in zip(self.sinks, self.dispatchers):
+            posts = sink.build_posts(message)
+            depth = dispatcher.submit(f"{sink.kind} {description}", posts)
+            print(f"Queued {sink.kind} {description} in {len(posts)} chunk(s) ({depth} waiting for this target).")
+        return True
+
+
+def get_notifier(targets, default_kind="discord", signal_number=None, signal_recipient=None):
+    """Notifier for a target list string, built once per distinct configuration."""
+    key = (targets, default_kind, signal_number, signal_recipient)
+    with _registry_lock:
+        notifier = _notifiers.get(key)
+    if notifier is None:
+        notifier = Notifier(parse_sinks(targets, default_kind, signal_number, signal_recipient))
+        with _registry_lock:
+            notifier = _notifiers.setdefault(key, notifier)
+    return notifier
+
+
+def queue_depth():
+    """Messages still waiting to be delivered across every target."""
+    return sum(dispatcher.queue_depth() for dispatcher in list(_dispatchers.values()))
+
+
+def wait_until_idle(timeout=None):
+    """Wait for every target's queue to drain. Returns False if timeout ran out first."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for dispatcher in list(_dispatchers.values()):
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not dispatcher.wait_until_idle(remaining):
+            return False
+    return True
+
+
+def print_stats():
+    for dispatcher in list(_dispatchers.values()):
+        stats = dispatcher.stats()
+        if not stats["delivered"] and not stats["failed"] and not stats["queued"]:
+            continue
+        print(f"Notifications to {dispatcher.name}: {stats['delivered']} delivered, {stats['failed']} failed, "
+              f"{stats['retries']} retries, {stats['queued']} queued, "
+              f"latency avg {stats['average_latency_seconds']:.2f}s max {stats['max_latency_seconds']:.2f}s")
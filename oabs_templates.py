@@ -0,0 +1,109 @@
+import json
+import os
+import re
+import threading
+from urllib.parse import quote_plus
+
+# Pre-encoded form bodies for the OABSEngine steps the HTTP scraper posts to.
+# Step and control ids plus the engine version live in oabs_steps.json; the static part of
+# each body is url-encoded once and only the per-request fields are spliced in.
+
+OABS_STEPS_FILE = os.getenv("OABS_STEPS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "oabs_steps.json"))
+
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"}
+
+_ENGINE_VERSION_RE = re.compile(r"OABSEngine, Version=(\d+(?:\.\d+)+)")
+
+
+def _type_name(type_name, engine_version):
+    return f"{type_name}, OABSEngine, Version={engine_version}, Culture=neutral, PublicKeyToken=null"
+
+
+def _encode_field(name, value):
+    return f"{quote_plus(name)}={quote_plus(str(value))}"
+
+
+class RequestTemplate:
+    """A form body split into pre-encoded literal chunks and named variable slots."""
+
+    def __init__(self, fields, params=None):
+        # fields: list of (name, value, is_variable); variable values name the render() keyword.
+        self.params = params or {}
+        self.chunks = []
+        self.variables = []
+        literal_parts = []
+        for name, value, is_variable in fields:
+            if is_variable:
+                literal_parts.append(quote_plus(name) + "=")
+                self.chunks.append("&".join(literal_parts))
+                self.variables.append(value)
+                literal_parts = [""]
+            else:
+                literal_parts.append(_encode_field(name, value))
+        self.chunks.append("&".join(literal_parts))
+
+    def render(self, **values):
+        body_parts = [self.chunks[0]]
+        for variable_name, chunk in zip(self.variables, self.chunks[1:]):
+            body_parts.append(quote_plus(str(values[variable_name])))
+            body_parts.append(chunk)
+        return "".join(body_parts)
+
+
+class OabsTemplateRegistry:
+    def __init__(self, steps_file=OABS_STEPS_FILE):
+        self.steps_file = steps_file
+        self.lock = threading.Lock()
+        with open(steps_file, 'r') as f:
+            self.step_data = json.load(f)
+        self.engine_version = self.step_data["engine_version"]
+        self.templates = self._build_templates(self.engine_version)
+
+    def _build_templates(self, engine_version):
+        templates = {}
+        for step_name, step in self.step_data["steps"].items():
+            fields = [("StepId", step["step_id"], False), ("formJourney", "form_journey", True)]
+            for index, control in enumerate(step["controls"]):
+                prefix = f"StepControls[{index}]."
+                if "field_name" in control:
+                    fields.append((prefix + "FieldName", control["field_name"], False))
+                fields.append((prefix + "TargetTypeName", _type_name("OABSEngine.StepControl", engine_version), False))
+                fields.append((prefix + "Model.ModelTypeName", _type_name(f"OABSEngine.Models.{control['model']}", engine_version), False))
+                fields.append((prefix + "StepControlId", control["step_control_id"], False))
+                if "value" in control:
+                    fields.append((prefix + "Model.Value", control["value"], True))
+                for extra_name, extra_value in control.get("extra", {}).items():
+                    fields.append((prefix + extra_name, extra_value, False))
+            templates[step_name] = RequestTemplate(fields, step.get("params"))
+        return templates
+
+    def render(self, step_name, **values):
+        """Return (query params, encoded form body) for one step."""
+        template = self.templates[step_name]
+        return template.params, template.render(**values)
+
+    def update_engine_version(self, html_text):
+        """Rebuild the templates if html_text advertises a different OABSEngine version. Returns True if it changed.
+
+        Every new process starts from oabs_steps.json again and re-detects a newer version after its first 500.
+        """
+        match = _ENGINE_VERSION_RE.search(html_text or "")
+        if not match or match.group(1) == self.engine_version:
+            return False
+        with self.lock:
+            new_version = match.group(1)
+            if new_version == self.engine_version:
+                return False
+            print(f"OABSEngine version changed from {self.engine_version} to {new_version}. Rebuilding request templates.")
+            self.templates = self._build_templates(new_version)
+            # Kept in memory only: oabs_steps.json is checked in and may be shared by several scrapers.
+            self.engine_version = new_version
+        return True
+
+    def refresh_engine_version(self, fetch_page):
+        """Re-derive the engine version from a fresh page fetch. fetch_page() returns page html."""
+        try:
+            return self.update_engine_version(fetch_page())
+        except Exception as e:
+            print(f"Warning: Could not fetch page to detect OABSEngine version: {e}")
+            return False
@@ -0,0 +1,115 @@
+import heapq
+import threading
+import time
+
+
+class AdaptivePollScheduler:
+    """Per-location polling queue whose intervals follow how often each location actually changes.
+
+    Every location keeps an exponentially weighted estimate of its change rate and of how many
+    requests one poll of it costs. The request budget per minute is split across locations in
+    proportion to change rate (plus a floor so quiet locations are still checked), so busy offices
+    are polled every few seconds and dead ones every few minutes while total load stays fixed.
+    """
+
+    def __init__(self, requests_per_minute, min_interval_seconds=5, max_interval_seconds=600,
+                 smoothing=0.3, floor_rate_per_minute=0.05):
+        self.requests_per_minute = requests_per_minute
+        self.min_interval_seconds = min_interval_seconds
+        self.max_interval_seconds = max_interval_seconds
+        self.smoothing = smoothing
+        self.floor_rate_per_minute = floor_rate_per_minute
+        self.locations = {}
+        self.queue = []
+        self.lock = threading.Lock()
+
+    def sync_locations(self, keys, now=None):
+        """Start tracking new keys (due immediately) and forget keys no longer in the list."""
+        now = time.monotonic() if now is None else now
+        keys = set(keys)
+        with self.lock:
+            for key in keys - set(self.locations):
+                self.locations[key] = {
+                    "change_rate": self.floor_rate_per_minute,
+                    "cost": 1.0,
+                    "last_polled": None,
+                    "signature": None,
+                    "next_due": now,
+                }
+                heapq.heappush(self.queue, (now, key))
+            for key in set(self.locations) - keys:
+                del self.locations[key]
+            self._prune_locked()
+
+    def is_due(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            state = self.locations.get(key)
+            return state is None or state["next_due"] <= now
+
+    def pop_due(self, now=None):
+        """Remove and return every tracked key whose poll time has come, most overdue first."""
+        now = time.monotonic() if now is None else now
+        due_keys = []
+        with self.lock:
+            while self.queue and self.queue[0][0] <= now:
+                due_at, key = heapq.heappop(self.queue)
+                state = self.locations.get(key)
+                # entries for dropped keys or superseded schedule times are left in the heap lazily
+                if state is not None and state["next_due"] == due_at:
+                    due_keys.append(key)
+        return due_keys
+
+    def seconds_until_next(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            while self.queue and (self.queue[0][1] not in self.locations
+                                  or self.locations[self.queue[0][1]]["next_due"] != self.queue[0][0]):
+                heapq.heappop(self.queue)
+            if not self.queue:
+                return None
+            return max(0.0, self.queue[0][0] - now)
+
+    def interval_for(self, key):
+        with self.lock:
+            return self._interval_locked(key)
+
+    def _interval_locked(self, key):
+        # Poll frequency f_i = budget * rate_i / sum(rate_j * cost_j), so sum(f_i * cost_i) == budget.
+        weighted_cost = sum(state["change_rate"] * state["cost"] for state in self.locations.values())
+        if weighted_cost <= 0:
+            return self.max_interval_seconds
+        polls_per_minute = self.requests_per_minute * self.locations[key]["change_rate"] / weighted_cost
+        interval = 60.0 / polls_per_minute if polls_per_minute > 0 else self.max_interval_seconds
+        return min(self.max_interval_seconds, max(self.min_interval_seconds, interval))
+
+    def record(self, key, signature, cost=1, now=None):
+        """Record a finished poll of key. Returns True if its signature changed since the last poll."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            state = self.locations.get(key)
+            if state is None:
+                return False
+            changed = state["last_polled"] is not None and signature != state["signature"]
+            if state["last_polled"] is not None:
+                elapsed_minutes = max((now - state["last_polled"]) / 60.0, 1e-6)
+                observed_rate = (1.0 if changed else 0.0) / elapsed_minutes
+                state["change_rate"] = max(
+                    self.floor_rate_per_minute,
+                    (1 - self.smoothing) * state["change_rate"] + self.smoothing * observed_rate,
+                )
+            state["cost"] = (1 - self.smoothing) * state["cost"] + self.smoothing * max(1, cost)
+            state["last_polled"] = now
+            state["signature"] = signature
+            state["next_due"] = now + self._interval_locked(key)
+            heapq.heappush(self.queue, (state["next_due"], key))
+            self._prune_locked()
+            return changed
+
+    def _prune_locked(self):
+        # Callers that only use is_due never pop, so drop superseded entries once they outnumber the live ones.
+        if len(self.queue) <= 2 * len(self.locations) + 16:
+            return
+        self.queue = [(due_at, key) for due_at, key in self.queue
+                      if key in self.locations and self.locations[key]["next_due"] == due_at]
+        heapq.heapify(self.queue)
@@ -4,30 +4,44 @@ from selenium.webdriver.firefox.service import Service as FirefoxService
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, NoSuchElementException, WebDriverException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 import time
 import random
-import requests
+import threading
 import os
 import json
-from geopy.distance import distance as geopy_distance
-from geopy.geocoders import Nominatim
 from decimal import Decimal
 from datetime import datetime, timedelta, time as dt_time, date
 import calendar
-import hashlib
+from urllib.parse import quote
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import browser_support
+import browser_watchdog
+import notifier
+import geocode_cache
+import location_index
+from poll_scheduler import AdaptivePollScheduler
+from slot_store import SlotStore
+from notification_throttle import NotificationThrottle
 
 # --- Configuration ---
 
 YOUR_DISCORD_WEBHOOK_URL = os.getenv("YOUR_DISCORD_WEBHOOK_URL", "YOUR_WEBHOOK_URL_HERE") # !!! REPLACE WITH YOUR ACTUAL WEBHOOK URL !!!
 GECKODRIVER_PATH = os.getenv('GECKODRIVER_PATH','YOUR_GECKODRIVER_PATH_HERE') # Replace with your geckodriver path
 
+# YOUR_DISCORD_WEBHOOK_URL can also list several targets, e.g. "discord:https://discord.com/api/webhooks/...,ntfy:https://ntfy.sh/topic".
+# A bare URL is treated as a signal-cli REST endpoint ( or ntfy for ntfy.sh URLs ).
 SIGNAL_NUMBER = os.getenv("SIGNAL_NUMBER") # Replace with your Signal number
 SIGNAL_GROUP = os.getenv("SIGNAL_GROUP") # Replace with your Signal group ID
 
 # Notification throttling - track recent notifications to prevent spam
 NOTIFICATION_THROTTLE_MINUTES = 10  # Don't send duplicate notifications within this window
-recent_notifications = {}  # Dictionary to track recent notifications
+recent_notifications = NotificationThrottle(NOTIFICATION_THROTTLE_MINUTES * 60)  # (location, datetime) -> last sent
+
+# Every seen slot and when it was notified is kept in this SQLite file, so a restart doesn't
+# re-announce slots that were already sent. Set to "" to keep notification history in memory only.
+SLOT_STORE_FILE = os.getenv("SLOT_STORE_FILE", "slot_state.sqlite3")
 
 
 # Can change address via environment values or manually edit this code 
@@ -70,10 +84,19 @@ if GECKODRIVER_PATH == 'YOUR_GECKODRIVER_PATH_HERE':
     exit()
 
 BASE_INTERVAL_SECONDS = int(os.getenv('BASE_INTERVAL_SECONDS', 30))
+
+# "adaptive" only visits locations whose own poll interval has come up, based on how often each one's
+# appointments actually change, keeping to POLL_BUDGET_PER_MINUTE location visits per minute overall.
+POLL_SCHEDULER = os.getenv("POLL_SCHEDULER", "interval").lower()
+POLL_BUDGET_PER_MINUTE = float(os.getenv("POLL_BUDGET_PER_MINUTE", "6"))
+POLL_MIN_INTERVAL_SECONDS = float(os.getenv("POLL_MIN_INTERVAL_SECONDS", "30"))
+POLL_MAX_INTERVAL_SECONDS = float(os.getenv("POLL_MAX_INTERVAL_SECONDS", "900"))
+poll_scheduler = None
+if POLL_SCHEDULER == "adaptive":
+    poll_scheduler = AdaptivePollScheduler(POLL_BUDGET_PER_MINUTE, POLL_MIN_INTERVAL_SECONDS, POLL_MAX_INTERVAL_SECONDS)
 MIN_RANDOM_DELAY_SECONDS = 1
 MAX_RANDOM_DELAY_SECONDS = 3
 NCDOT_APPOINTMENT_URL = "https://skiptheline.ncdot.gov"
-MAX_DISCORD_MESSAGE_LENGTH = 1950 # Slightly less than 2000 for safety margin
 
 # if you want it to notify you even when there are no appointments available, then set this to true
 PROOF_OF_LIFE = False
@@ -88,8 +111,89 @@ FIREFOX_BINARY_PATH = os.getenv("FIREFOX_BINARY_PATH")
 if not FIREFOX_BINARY_PATH and os.path.isfile("C:/Program Files/Mozilla Firefox/firefox.exe"):
     FIREFOX_BINARY_PATH = "C:/Program Files/Mozilla Firefox/firefox.exe"
 
+# Each extra browser walks the landing page once and then takes a share of the available locations.
+# BROWSER_WORKERS is capped so that workers x BROWSER_MEMORY_PER_WORKER_MB fits in BROWSER_MEMORY_BUDGET_MB
+# (0 means no budget). A headless Firefox on this site sits around 300-500 MB.
+BROWSER_WORKERS = int(os.getenv("BROWSER_WORKERS", "1"))
+BROWSER_MEMORY_BUDGET_MB = int(os.getenv("BROWSER_MEMORY_BUDGET_MB", "0"))
+BROWSER_MEMORY_PER_WORKER_MB = int(os.getenv("BROWSER_MEMORY_PER_WORKER_MB", "450"))
+# Work on this many locations at once in tabs of each browser, switching to whichever tab has its
+# page ready while the others wait on the site. Much cheaper in memory than extra browsers.
+BROWSER_TABS = int(os.getenv("BROWSER_TABS", "1"))
+# Lean browser profile: no images, web fonts, media or requests to the hosts below, no disk cache,
+# no animations and one content process. "compare" runs the first sweep with the normal profile,
+# then restarts the browsers lean, so the printed page timings show both side by side.
+LEAN_BROWSER = os.getenv("LEAN_BROWSER", "False")  # True, False or compare
+LEAN_BROWSER_BLOCKED_HOSTS = [host.strip() for host in os.getenv(
+    "LEAN_BROWSER_BLOCKED_HOSTS",
+    "google-analytics.com,googletagmanager.com,doubleclick.net,fonts.googleapis.com,fonts.gstatic.com,"
+    "use.typekit.net,connect.facebook.net,bat.bing.com,clarity.ms,hotjar.com,newrelic.com,nr-data.net"
+).split(",") if host.strip()]
+
 # --- End Configuration ---
 
+LOCATION_BUTTON_SELECTOR = "div.QflowObjectItem.form-control.ui-selectable"
+DATEPICKER_SELECTOR = "table.ui-datepicker-calendar"
+NO_APPOINTMENTS_ELEMENT_ID = "547650da-008d-4fd0-a164-31a44e94"
+CLICKABLE_DATES_SELECTOR = "td[data-handler='selectDay']:not(.ui-datepicker-unselectable):not(.ui-state-disabled) a.ui-state-default"
+TIME_SELECT_ID = "6f1a7b21-2558-41bb-8e4d-2cba7a8b1608"
+notification_lock = threading.Lock()  # first-appointment alerts can come from several browser workers at once
+pool_drivers = []  # the extra browsers of the worker pool, kept between runs; None means start a new one
+watchdog = browser_watchdog.BrowserWatchdog()
+
+def get_browser_worker_count():
+    """BROWSER_WORKERS, reduced to what fits in BROWSER_MEMORY_BUDGET_MB."""
+    worker_count = max(1, BROWSER_WORKERS)
+    if BROWSER_MEMORY_BUDGET_MB > 0:
+        affordable = max(1, BROWSER_MEMORY_BUDGET_MB // max(1, BROWSER_MEMORY_PER_WORKER_MB))
+        if affordable < worker_count:
+            print(f"BROWSER_WORKERS={worker_count} needs about {worker_count * BROWSER_MEMORY_PER_WORKER_MB} MB; "
+                  f"using {affordable} browser(s) to stay within BROWSER_MEMORY_BUDGET_MB={BROWSER_MEMORY_BUDGET_MB}.")
+            worker_count = affordable
+    return worker_count
+
+browser_worker_count = get_browser_worker_count()
+lean_baseline_done = LEAN_BROWSER != "compare"  # compare mode measures one normal-profile run first
+
+def browser_profile_for_new_driver():
+    if LEAN_BROWSER == "True" or (LEAN_BROWSER == "compare" and lean_baseline_done):
+        return "lean"
+    return "normal"
+
+def apply_lean_profile(firefox_options):
+    """Turn off everything the scraper never looks at. Stylesheets stay, the visibility checks depend on them."""
+    preferences = {
+        "permissions.default.image": 2,
+        "gfx.downloadable_fonts.enabled": False,
+        "browser.display.use_document_fonts": 0,
+        "media.autoplay.default": 5,
+        "browser.cache.disk.enable": False,
+        "browser.sessionstore.resume_from_crash": False,
+        "browser.sessionstore.max_tabs_undo": 0,
+        "network.prefetch-next": False,
+        "network.dns.disablePrefetch": True,
+        "network.http.speculative-parallel-limit": 0,
+        "ui.prefersReducedMotion": 1,
+        "toolkit.cosmeticAnimations.enabled": False,
+        "dom.ipc.processCount": 1,
+        "dom.ipc.processPrelaunch.enabled": False,
+        "fission.autostart": False,
+    }
+    for name, value in preferences.items():
+        firefox_options.set_preference(name, value)
+    if LEAN_BROWSER_BLOCKED_HOSTS:
+        # A proxy auto-config script sends the blocked hosts to a closed local port, so they fail at once.
+        pac_script = "function FindProxyForURL(url, host) { var blocked = %s; for (var i = 0; i < blocked.length; i++) { " \
+                     "if (host == blocked[i] || dnsDomainIs(host, '.' + blocked[i])) return 'PROXY 127.0.0.1:9'; } " \
+                     "return 'DIRECT'; }" % json.dumps(LEAN_BROWSER_BLOCKED_HOSTS)
+        firefox_options.set_preference("network.proxy.type", 2)
+        firefox_options.set_preference("network.proxy.autoconfig_url", "data:application/x-ns-proxy-autoconfig," + quote(pac_script))
+
+def record_page(driver):
+    """Record the page timing under this driver's profile; on a lean driver also stop the page's jQuery animations."""
+    profile = getattr(driver, "browser_profile", "normal")
+    browser_support.record_page_timing(driver, profile, disable_animations=profile == "lean")
+
 def wait_for_overlays_to_disappear(driver, timeout=15):
     """Wait for any blocking overlays to disappear."""
     overlay_selectors = [
@@ -109,50 +213,45 @@ def wait_for_overlays_to_disappear(driver, timeout=15):
         except Exception as e:
             print(f"Warning checking overlay {selector_value}: {e}")
 
-def cleanup_old_notifications():
-    """Remove notifications older than the throttle window."""
-    current_time = datetime.now()
-    cutoff_time = current_time - timedelta(minutes=NOTIFICATION_THROTTLE_MINUTES)
-    
-    # Remove old entries
-    keys_to_remove = []
-    for notification_hash, timestamp in recent_notifications.items():
-        if timestamp < cutoff_time:
-            keys_to_remove.append(notification_hash)
-    
-    for key in keys_to_remove:
-        del recent_notifications[key]
-    
-    if keys_to_remove:
-        print(f"Cleaned up {len(keys_to_remove)} old notification entries")
-
-def create_notification_hash(location_name, datetime_str):
-    """Create a unique hash for a specific appointment to track notifications."""
-    # Combine location and datetime to create a unique identifier
-    combined_string = f"{location_name}|{datetime_str}"
-    return hashlib.md5(combined_string.encode()).hexdigest()
-
 def should_send_notification(location_name, datetime_str):
     """Check if we should send a notification for this appointment."""
-    cleanup_old_notifications()
-    
-    notification_hash = create_notification_hash(location_name, datetime_str)
-    current_time = datetime.now()
-    
-    # Check if we've already sent a notification for this appointment recently
-    if notification_hash in recent_notifications:
-        last_sent = recent_notifications[notification_hash]
-        time_since_last = current_time - last_sent
-        
-        if time_since_last < timedelta(minutes=NOTIFICATION_THROTTLE_MINUTES):
-            minutes_remaining = NOTIFICATION_THROTTLE_MINUTES - (time_since_last.total_seconds() / 60)
-            print(f"Skipping notification for {location_name} at {datetime_str} - last sent {time_since_last.total_seconds():.1f}s ago (throttled for {minutes_remaining:.1f} more minutes)")
+    notification_key = (location_name, datetime_str)
+    with notification_lock:
+        seconds_remaining = recent_notifications.seconds_remaining(notification_key)
+
+        # Check if we've already sent a notification for this appointment recently
+        if seconds_remaining > 0:
+            seconds_since_last = NOTIFICATION_THROTTLE_MINUTES * 60 - seconds_remaining
+            print(f"Skipping notification for {location_name} at {datetime_str} - last sent {seconds_since_last:.1f}s ago (throttled for {seconds_remaining / 60:.1f} more minutes)")
             return False
-    
-    # Record this notification
-    recent_notifications[notification_hash] = current_time
+
+        # Record this notification
+        recent_notifications.record(notification_key)
     return True
 
+def load_recent_notifications(store):
+    """Seed recent_notifications with slots the store says were notified within the throttle window."""
+    cutoff_time = datetime.now() - timedelta(minutes=NOTIFICATION_THROTTLE_MINUTES)
+    notified_slots = store.notified_since(APPOINTMENT_TYPE, cutoff_time.timestamp())
+    for location_name, datetime_str, notified_at in sorted(notified_slots, key=lambda row: row[2]):
+        recent_notifications.record((location_name, datetime_str), notified_at)
+    if notified_slots:
+        print(f"Loaded {len(notified_slots)} recently notified appointments from {SLOT_STORE_FILE}")
+
+def record_run_in_slot_store(store, raw_results, notified_results):
+    """Record this run's seen and notified slots in one batched write."""
+    for location, result in raw_results.items():
+        if isinstance(result, list) and result:
+            store.observe(APPOINTMENT_TYPE, location, result)
+    for location, result in notified_results.items():
+        if isinstance(result, list) and result:
+            store.mark_notified(APPOINTMENT_TYPE, location, result)
+    try:
+        seen_count, notified_count = store.flush()
+        print(f"Slot store: recorded {seen_count} seen and {notified_count} notified appointments.")
+    except Exception as e:
+        print(f"Warning: Could not write to slot store: {e}")
+
 def filter_new_appointments(raw_results):
     """Filter results to only include appointments that haven't been notified about recently."""
     filtered_results = {}
@@ -280,133 +379,44 @@ def get_filtered_locations(your_address, distance_range_str, location_file):
         return None, False
 
     try:
-        with open(location_file, 'r') as f:
-            locations_data = json.load(f)
+        locations_index = location_index.load_coordinates_file(location_file)
         print(f"Loaded location data from {location_file}")
     except Exception as e:
         print(f"Error loading location data from '{location_file}': {e}. Scraping all locations.")
         return None, False
 
     try:
-        geolocator = Nominatim(user_agent="dmv_appointment_scraper")
         print(f"Geocoding your address: {your_address}...")
-        user_location = geolocator.geocode(your_address, timeout=10)
-        if not user_location:
+        user_coords = geocode_cache.geocode(your_address)
+        if not user_coords:
             raise ValueError("Could not geocode YOUR_ADDRESS")
-        user_coords = (user_location.latitude, user_location.longitude)
         print(f"Your coordinates: {user_coords}")
     except Exception as e:
         print(f"Error geocoding YOUR_ADDRESS '{your_address}': {e}. Scraping all locations.")
         return None, False
 
-    allowed_locations = set()
     print("Calculating distances...")
-    for item in locations_data:
-        try:
-            location_address = item["address"] 
-            location_coords = item["coordinates"]
-            if len(location_coords) != 2:
-                raise ValueError("Invalid coordinates format")
-            dist = geopy_distance(user_coords, tuple(location_coords)).miles
-            if Decimal(dist) <= distance_range_miles:
-                allowed_locations.add(location_address)
-        except Exception as e:
-            print(f"Warning: Error processing location entry '{item.get('address', 'N/A')}': {e}")
-            continue 
+    # address -> miles, nearest first
+    allowed_locations = dict(locations_index.within(user_coords, distance_range_miles))
 
     print(f"Found {len(allowed_locations)} locations within range.")
     return allowed_locations, True
 
-class options_loaded_in_select(object):
-    def __init__(self, locator):
-        self.locator = locator
-
-    def __call__(self, driver):
-        try:
-            select_element = driver.find_element(*self.locator)
-            if not select_element.is_enabled():
-                return False
-            options = select_element.find_elements(By.TAG_NAME, "option")
-            if len(options) > 1 and options[1].get_attribute("data-datetime"):
-                return True
-            return False
-        except NoSuchElementException:
-            return False
-
 def send_discord_notification(webhook_url, message_content):
+    """Queue message_content for every target in webhook_url (bare URLs are signal-cli REST, see notifier.py)."""
     if not webhook_url or webhook_url == "YOUR_WEBHOOK_URL_HERE":
         print("Discord webhook URL not configured. Skipping notification.")
         return
 
+    targets = notifier.get_notifier(webhook_url, default_kind="signal", signal_number=SIGNAL_NUMBER, signal_recipient=SIGNAL_GROUP)
     if message_content == None and PROOF_OF_LIFE == True:
-        requests.post(webhook_url, json={"content":"No valid appointments found at this time"}, timeout=10)
+        targets.notify("No valid appointments found at this time", "proof-of-life notification")
         return
     elif message_content == None:
         return
 
     # intro_message = f"@everyone Appointments available at {NCDOT_APPOINTMENT_URL}:\n"
-    full_message = INTRO_MESSAGE + message_content
-
-    message_chunks = []
-    remaining_message = full_message
-
-    while len(remaining_message) > 0:
-        if len(remaining_message) <= MAX_DISCORD_MESSAGE_LENGTH:
-            message_chunks.append(remaining_message)
-            remaining_message = ""
-        else:
-            split_index = remaining_message.rfind('\n', 0, MAX_DISCORD_MESSAGE_LENGTH)
-            if split_index == -1:
-                split_index = MAX_DISCORD_MESSAGE_LENGTH
-
-            message_chunks.append(remaining_message[:split_index])
-            remaining_message = remaining_message[split_index:].lstrip()
-
-            if split_index == MAX_DISCORD_MESSAGE_LENGTH and len(remaining_message) > 0:
-                 message_chunks[-1] += "\n... (split)" # forced split in middle of line
-
-
-    print(f"Sending notification in {len(message_chunks)} chunk(s)...")
-    success = True
-    if "https://ntfy.sh/" in webhook_url:
-        try:
-            response = requests.post(webhook_url, data=full_message,timeout=10,headers={ "Markdown": "yes" })
-            response.raise_for_status()
-            print("ntfy notification sent successfully")
-        except requests.exceptions.RequestException as e:
-            print(f"Error sending ntfy notification: {e}")
-            success = False
-        except Exception as e:
-            print(f"An unexpected error occurred during sending ntfy notification: {e}")
-            success = False
-    else:
-        for i, chunk in enumerate(message_chunks):
-            payload = {
-                        "number": SIGNAL_NUMBER,
-                        "message": chunk,
-                        "recipients": [
-                            SIGNAL_GROUP
-                        ]
-                    }
-            try:
-                response = requests.post(webhook_url, json=payload, timeout=15)
-                response.raise_for_status()
-                print(f"Signal notification chunk {i+1}/{len(message_chunks)} sent successfully.")
-                if i < len(message_chunks) - 1:
-                    time.sleep(1) # avoid ratelimit
-            except requests.exceptions.RequestException as e:
-                print(f"Error sending Signal notification chunk {i+1}: {e}")
-                success = False
-                break
-            except Exception as e:
-                print(f"An unexpected error occurred during Signal notification chunk {i+1}: {e}")
-                success = False
-                break
-
-    if success:
-        print("All Discord notification chunks sent.")
-    else:
-        print("Failed to send all Discord notification chunks.")
+    targets.notify(INTRO_MESSAGE + message_content)
 
 
 def format_results_for_discord(raw_results):
@@ -431,18 +441,26 @@ def parse_datetime_for_sort(datetime_str):
     except ValueError:
         return datetime.max
 
-def wait_for_options_in_select(driver, locator, timeout=35):
-    start_wait = time.time()
-    while time.time() - start_wait < timeout:
-        try:
-            select_element = driver.find_element(*locator)
-            options = select_element.find_elements(By.TAG_NAME, "option")
-            if len(options) > 1:
-                return select_element
-        except Exception:
-            pass
-        time.sleep(0.3)
-    return None
+def recycle_grown_browsers(driver):
+    """Between runs: restart any pool browser the watchdog finds too big. Returns True if the main driver needs a restart."""
+    watchdog.check_python()
+    restart_main_driver = False
+    if driver is not None:
+        reason = watchdog.recycle_reason(driver, "main browser")
+        if reason:
+            print(f"Recycling the main browser before the next run: {reason}.")
+            watchdog.recycled += 1
+            restart_main_driver = True
+    for i, pool_driver in enumerate(pool_drivers):
+        if pool_driver is None:
+            continue
+        reason = watchdog.recycle_reason(pool_driver, f"worker {i + 1} browser")
+        if reason:
+            print(f"Recycling worker {i + 1}'s browser: {reason}.")
+            watchdog.recycled += 1
+            cleanup_driver(pool_driver)
+            pool_drivers[i] = None
+    return restart_main_driver
 
 def initialize_webdriver(driver_path, binary_path, user_address=None):
     """Initialize and return a new Firefox webdriver instance."""
@@ -456,11 +474,9 @@ def initialize_webdriver(driver_path, binary_path, user_address=None):
             print(f"Setting browser location for address: {user_address}")
             # Get coordinates for the user's address
             try:
-                from geopy.geocoders import Nominatim
-                geolocator = Nominatim(user_agent="dmv_appointment_scraper")
-                location = geolocator.geocode(user_address, timeout=10)
+                location = geocode_cache.geocode(user_address)
                 if location:
-                    lat, lon = location.latitude, location.longitude
+                    lat, lon = location
                     print(f"Setting browser coordinates to: {lat}, {lon}")
                     
                     # Enable geolocation and set coordinates
@@ -478,6 +494,15 @@ def initialize_webdriver(driver_path, binary_path, user_address=None):
                 firefox_options.set_preference("geo.enabled", False)
         else:
             firefox_options.set_preference("geo.enabled", False)
+
+        if BROWSER_TABS > 1:
+            # Tabs we are not looking at keep running the site's timers at full speed
+            firefox_options.set_preference("dom.min_background_timeout_value", 4)
+            firefox_options.set_preference("dom.timeout.enable_budget_timer_throttling", False)
+
+        browser_profile = browser_profile_for_new_driver()
+        if browser_profile == "lean":
+            apply_lean_profile(firefox_options)
             
         if binary_path:
             firefox_options.binary_location = binary_path
@@ -486,7 +511,9 @@ def initialize_webdriver(driver_path, binary_path, user_address=None):
         driver = webdriver.Firefox(service=service, options=firefox_options)
         driver.implicitly_wait(2)
         driver.set_page_load_timeout(90)
-        print("Firefox driver initialized.")
+        driver.set_script_timeout(40)  # longer than any in-page wait in browser_support
+        driver.browser_profile = browser_profile
+        print(f"Firefox driver initialized ({browser_profile} profile).")
         return driver
     except Exception as e:
         error_msg = str(e).lower()
@@ -546,6 +573,566 @@ def navigate_to_location_selection(driver, url):
         print(f"ERROR: Failed to navigate to location selection: {e}")
         return False
 
+def open_location_list(url, driver):
+    """Walk from the landing page to the location list. Returns (ok, driver); driver is None if it needs a restart."""
+    print(f"Navigating to URL: {url}")
+    driver.get(url)
+    browser_watchdog.count_navigation(driver)
+    print("Page loaded.")
+
+    try:
+        make_appointment_button = WebDriverWait(driver, 90).until(
+            EC.presence_of_element_located((By.ID, "cmdMakeAppt"))
+        )
+        print("Found 'Make an Appointment' button.")
+        make_appointment_button.click()
+        browser_watchdog.count_navigation(driver)
+        print("Clicked 'Make an Appointment' button.")
+    except (WebDriverException, TimeoutException) as e:
+        print(f"ERROR: Could not find or click 'Make an Appointment' button: {e}. Stopping.")
+        if isinstance(e, WebDriverException):
+            return False, None  # Need driver restart
+        return False, driver
+
+    try:
+        first_layer_button_xpath = f"//div[contains(@class, 'QflowObjectItem') and .//div[contains(text(), '{APPOINTMENT_TYPE}')]]"
+        
+        # Wait for the page to go idle and any blocking overlays to disappear
+        browser_support.wait_until_settled(driver, "appointment type page", replaced_sleep_seconds=2)
+        
+        first_layer_button = WebDriverWait(driver, 50).until(
+            EC.element_to_be_clickable((By.XPATH, first_layer_button_xpath))
+        )
+        print(f"Found '{APPOINTMENT_TYPE}' button.")
+        
+        # Try clicking with JavaScript if regular click fails due to overlay
+        try:
+            first_layer_button.click()
+            print(f"Clicked '{APPOINTMENT_TYPE}' button.")
+        except Exception as click_error:
+            print(f"Regular click failed: {click_error}. Trying JavaScript click...")
+            driver.execute_script("arguments[0].click();", first_layer_button)
+            print(f"JavaScript clicked '{APPOINTMENT_TYPE}' button.")
+        browser_watchdog.count_navigation(driver)
+        
+        # Wait for the location selection page to load
+        print("Waiting for location selection page to load...")
+        browser_support.wait_until_settled(driver, "location list", replaced_sleep_seconds=3)
+        
+    except (WebDriverException, TimeoutException) as e:
+        print(f"ERROR: Could not find or click '{APPOINTMENT_TYPE}' button: {e}. Stopping.")
+        if isinstance(e, WebDriverException):
+            return False, None  # Need driver restart
+        return False, driver
+
+    location_button_wait = WebDriverWait(driver, 45)
+    try:
+        print("Waiting for location buttons...")
+        location_button_wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, LOCATION_BUTTON_SELECTOR)))
+        print("Location buttons are present.")
+        record_page(driver)
+    except (WebDriverException, TimeoutException) as e:
+        print(f"ERROR: No location buttons found after clicking appointment type: {e}. Stopping.")
+        if isinstance(e, WebDriverException):
+            return False, None  # Need driver restart
+        return False, driver
+    return True, driver
+
+def is_first_alert_location(run_state, location_name):
+    """Immediate alerts come from one location per run, and only until any location has finished."""
+    with run_state["lock"]:
+        if run_state["locations_finished"]:
+            return False
+        return run_state.setdefault("first_alert_location", location_name) == location_name
+
+def select_matching_datetimes(option_datetimes, location_name, location_address,
+                              date_filter_enabled, start_date, end_date,
+                              time_filter_enabled, start_time, end_time,
+                              run_state):
+    """The data-datetime values of one date's time options that pass the date/time filters.
+
+    Until the first location of the run has finished, the first match also goes out as an immediate alert.
+    """
+    matching_datetimes = []
+    for datetime_str in option_datetimes:
+        try:
+            if not datetime_str:
+                continue
+
+            appointment_dt = datetime.strptime(datetime_str, "%m/%d/%Y %I:%M:%S %p")
+            appointment_date = appointment_dt.date()
+            appointment_time = appointment_dt.time()
+
+            date_ok = not date_filter_enabled or (start_date <= appointment_date <= end_date)
+            time_ok = not time_filter_enabled or (start_time <= appointment_time <= end_time)
+
+            if date_ok and time_ok:
+                matching_datetimes.append(datetime_str)
+                # Only send immediate notification for the very first new appointment found
+                if len(matching_datetimes) == 1 and is_first_alert_location(run_state, location_name):
+                    # Check if this specific appointment should trigger an immediate notification
+                    if should_send_notification(location_name, datetime_str):
+                        # Format the first appointment in a readable way
+                        try:
+                            # Parse and reformat the datetime string for better readability
+                            dt_obj = datetime.strptime(datetime_str, "%m/%d/%Y %I:%M:%S %p")
+                            pretty_date = dt_obj.strftime("%A, %B %d, %Y")  # e.g., "Monday, January 15, 2025"
+                            pretty_time = dt_obj.strftime("%I:%M %p")       # e.g., "2:30 PM"
+                            pretty_datetime = f"{pretty_date} at {pretty_time}"
+                        except:
+                            # Fallback to original format if parsing fails
+                            pretty_datetime = datetime_str
+
+                        first_appointment_message = f"🚨🚨🚨 NEW APPOINTMENTS ARRIVING!\n\n**First Available:**\n📍 **Location:** {location_name}\n📅 **Date & Time:** {pretty_datetime}\n🏢 **Address:** {location_address}\n\n*More appointments may be available - check next message for full list*"
+                        send_discord_notification(YOUR_DISCORD_WEBHOOK_URL, first_appointment_message)
+                    else:
+                        print(f"Skipping immediate notification for first appointment (recently notified)")
+        except Exception:
+            pass
+    return matching_datetimes
+
+def store_location_result(raw_location_results, location_name, appointment_datetimes, status_message):
+    """Record one location's sorted times (or its status message) and feed the poll scheduler."""
+    if appointment_datetimes:
+        try:
+            appointment_datetimes.sort(key=parse_datetime_for_sort)
+        except Exception as e_sort:
+             print(f"  Warning: Could not sort times for {location_name}: {e_sort}")
+        raw_location_results[location_name] = appointment_datetimes
+    elif status_message:
+        raw_location_results[location_name] = status_message
+    else:
+        raw_location_results[location_name] = []
+    if poll_scheduler is not None:
+        poll_scheduler.record(location_name, repr(raw_location_results[location_name]))
+
+def find_location_button(location_buttons, index, expected_name):
+    """The harvested button for expected_name, normally at index; None if the office is no longer listed."""
+    button = location_buttons[index] if index < len(location_buttons) else None
+    if button is None or (button["name"] or f"Location {index}") != expected_name:
+        # The list can come back in a different order, e.g. in another worker's browser; find the office by name.
+        button = next((b for b in location_buttons if (b["name"] or f"Location {b['index']}") == expected_name), None)
+    return button
+
+def process_locations(driver, locations_to_process,
+                      allowed_locations_filter, filtering_active,
+                      date_filter_enabled, start_date, end_date,
+                      time_filter_enabled, start_time, end_time,
+                      run_state):
+    """Visit each (index, name) from the quick scan, starting and ending on the location list."""
+    raw_location_results = {}
+    for index, expected_name in locations_to_process:
+        location_name = f"Unknown Location {index}"
+        location_address_from_site = "Unknown Address"
+        location_processed_successfully = False
+
+        try:
+            print(f"\n--- Processing available location index: {index} ---")
+            WebDriverWait(driver, 15).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, LOCATION_BUTTON_SELECTOR)))
+            location_buttons = browser_support.harvest_location_buttons(driver, LOCATION_BUTTON_SELECTOR)
+            
+            button = find_location_button(location_buttons, index, expected_name)
+            if button is None:
+                print(f"{expected_name} (index {index}) is no longer in the location list. Skipping.")
+                continue
+            index = button["index"]
+            current_button = button["element"]
+            
+            # Double-check that button is still available (page might have changed)
+            if not button["available"]:
+                print(f"Location {index} became unavailable since scan. Skipping.")
+                continue
+
+            print(f"Button {index} text: '{button['text']}'")
+            location_name = button["name"] or f"Unknown Location {index}"
+            if button["address"] is not None:
+                location_address_from_site = button["address"]
+            else:
+                location_address_from_site = f"Unknown Address {index}"
+                print(f"Could not find any address element for button {index}")
+            print(f"Location: {location_name} ({location_address_from_site})")
+
+            if filtering_active and location_address_from_site not in allowed_locations_filter:
+                # The button list changed since the quick scan; skip just this one.
+                print(f"Skipping {location_name} (Address '{location_address_from_site}' not in allow list)")
+                continue
+
+            if poll_scheduler is not None and not poll_scheduler.is_due(location_name):
+                print(f"Skipping {location_name} (not due yet, polled every {poll_scheduler.interval_for(location_name):.0f}s)")
+                continue
+
+            print(f"Clicking button for: {location_name}")
+            current_button.click()
+            browser_watchdog.count_navigation(driver)
+            location_processed_successfully = True
+            browser_support.wait_until_settled(driver, "location page", replaced_sleep_seconds=1)
+            record_page(driver)
+
+            valid_appointment_datetimes_for_location = []
+            location_status_message = ""
+            process_dates = True
+
+            try:
+                print("Waiting for datepicker...")
+                WebDriverWait(driver, 30).until(
+                    EC.visibility_of_element_located((By.CSS_SELECTOR, DATEPICKER_SELECTOR))
+                )
+                print("Datepicker visible.")
+                try:
+                    error_element = driver.find_element(By.ID, NO_APPOINTMENTS_ELEMENT_ID)
+                    error_html = error_element.get_attribute('innerHTML')
+                    if "does not currently have any appointments available" in error_html:
+                        print("Message: No appointments available in next 90 days.")
+                        location_status_message = "No appointments in next 90 days"
+                        process_dates = False
+                except NoSuchElementException:
+                    pass
+                except Exception as e:
+                    print(f"Warning checking 90-day error msg: {e}")
+
+            except Exception as e:
+                print(f"Did not find datepicker or error occurred: {e}")
+                location_status_message = "Datepicker Not Found"
+                process_dates = False
+
+            if process_dates:
+                print("Processing available dates...")
+                try:
+                    WebDriverWait(driver,10).until(EC.presence_of_element_located((By.CSS_SELECTOR, DATEPICKER_SELECTOR)))
+                    date_elements = driver.find_elements(By.CSS_SELECTOR, CLICKABLE_DATES_SELECTOR)
+                    num_dates = len(date_elements)
+                    print(f"Found {num_dates} clickable dates.")
+
+                    if num_dates == 0 and not location_status_message:
+                        location_status_message = "No clickable dates found"
+
+                    for date_index in range(num_dates):
+                        processed_date = False
+                        try:
+                            current_date_links = driver.find_elements(By.CSS_SELECTOR, CLICKABLE_DATES_SELECTOR)
+                            if date_index >= len(current_date_links):
+                                print(f"Date index {date_index} out of bounds on re-find. Skipping remaining.")
+                                break
+
+                            date_link_element = current_date_links[date_index]
+                            date_day_text = date_link_element.text
+                            print(f"    Processing Date Index {date_index} (Day: '{date_day_text}')...", end="")
+
+                            # No quiet window here: only AJAX and the BlockUI overlay have to clear.
+                            overlay_timed_out = not browser_support.wait_until_settled(driver, "date overlay", timeout=15, quiet_ms=0)
+                            if overlay_timed_out:
+                                print(" Overlay still visible after timeout. Skipping date click due to persistent overlay.")
+                                continue
+
+                            clicked_date = browser_support.click_date(driver, CLICKABLE_DATES_SELECTOR, date_index)
+                            clicked_at = time.monotonic()
+                            if not clicked_date:
+                                print(" Date could not be clicked. Skipping.")
+                                continue
+
+                            # Waits for this date's time options and reads every data-datetime in one round trip
+                            option_datetimes = browser_support.wait_for_option_datetimes(driver, TIME_SELECT_ID, clicked_date, timeout=25)
+
+                            if option_datetimes is not None:
+                                browser_support.record_duration(getattr(driver, "browser_profile", "normal"),
+                                                                "datepicker refresh", time.monotonic() - clicked_at)
+                                matching_datetimes = select_matching_datetimes(
+                                    option_datetimes, location_name, location_address_from_site,
+                                    date_filter_enabled, start_date, end_date,
+                                    time_filter_enabled, start_time, end_time, run_state
+                                )
+                                valid_appointment_datetimes_for_location.extend(matching_datetimes)
+                                times_found_this_date = len(matching_datetimes)
+                                if times_found_this_date > 0:
+                                    print(f" Added {times_found_this_date} time(s).")
+                                    processed_date = True
+                                else:
+                                     print(" No matching times found.")
+                            else:
+                                 print(" Time options did not load.")
+
+                        except Exception as e_date:
+                            if not processed_date: 
+                                 print(f" Error processing date index {date_index} (Day '{date_day_text}'): {e_date}")
+
+                except Exception as e_find_dates:
+                    print(f"  Error finding or looping through date elements: {e_find_dates}")
+                    if not location_status_message:
+                        location_status_message = "Error processing dates"
+
+            store_location_result(raw_location_results, location_name,
+                                  valid_appointment_datetimes_for_location, location_status_message)
+
+        except Exception as location_e:
+            print(f"!! ERROR processing location index {index} ({location_name}): {location_e}")
+            raw_location_results[location_name] = f"Error processing location: {type(location_e).__name__}"
+
+        finally:
+            if location_name in raw_location_results:
+                with run_state["lock"]:
+                    run_state["locations_finished"] += 1
+            if location_processed_successfully:
+                try:
+                    print("Navigating back to location list...")
+                    driver.back()
+                    browser_watchdog.count_navigation(driver)
+                    print("Waiting for location buttons...")
+                    WebDriverWait(driver, 25).until(
+                         EC.presence_of_all_elements_located((By.CSS_SELECTOR, LOCATION_BUTTON_SELECTOR))
+                    )
+                    browser_support.wait_until_settled(driver, "back to location list", replaced_sleep_seconds=2.5)
+                    print("Location buttons present for next iteration.")
+                except Exception as back_wait_e:
+                     print(f"WARNING: Issue navigating back or waiting for buttons after location index {index}: {back_wait_e}. Trying next location.")
+
+    return raw_location_results
+
+def open_extra_tabs(url, driver, tab_count):
+    """Walk tab_count - 1 extra tabs of driver to the location list, reusing tabs from earlier runs.
+
+    Returns the handles of the tabs that got there, main tab first; the main tab is left current.
+    """
+    main_handle = driver.current_window_handle
+    spare_handles = [handle for handle in driver.window_handles if handle != main_handle]
+    ready_handles = [main_handle]
+    for tab_number in range(1, tab_count):
+        if spare_handles:
+            driver.switch_to.window(spare_handles.pop(0))
+        else:
+            driver.switch_to.new_window("tab")
+        print(f"[tab {tab_number}] Opening the location list...")
+        ok, _ = open_location_list(url, driver)
+        if ok:
+            ready_handles.append(driver.current_window_handle)
+        else:
+            print(f"[tab {tab_number}] Could not reach the location list; continuing with fewer tabs.")
+    driver.switch_to.window(main_handle)
+    return ready_handles
+
+def finish_tab_location(driver, tab, raw_location_results, run_state, status_message=None):
+    """Store the tab's current location and start navigating it back to the location list."""
+    store_location_result(raw_location_results, tab["name"], tab["datetimes"],
+                          status_message if status_message is not None else tab["status"])
+    with run_state["lock"]:
+        run_state["locations_finished"] += 1
+    print(f"[tab {tab['number']}] Finished {tab['name']}: {len(tab['datetimes'])} time(s).")
+    driver.execute_script("window.history.back();")
+    browser_watchdog.count_navigation(driver)
+    tab.update(state="back", deadline=time.monotonic() + 25)
+
+def step_location_tab(driver, tab, pending_locations, raw_location_results, filter_args, run_state):
+    """Advance the current tab by one step without blocking on the site. Returns True if it made progress."""
+    (allowed_locations_filter, filtering_active,
+     date_filter_enabled, start_date, end_date,
+     time_filter_enabled, start_time, end_time) = filter_args
+    now = time.monotonic()
+
+    if tab["state"] == "list":
+        if not pending_locations:
+            tab["state"] = "done"
+            return True
+        index, expected_name = pending_locations.popleft()
+        location_buttons = browser_support.harvest_location_buttons(driver, LOCATION_BUTTON_SELECTOR)
+        button = find_location_button(location_buttons, index, expected_name)
+        if button is None or not button["available"]:
+            print(f"[tab {tab['number']}] {expected_name} is no longer available. Skipping.")
+            return True
+        location_name = button["name"] or f"Unknown Location {button['index']}"
+        location_address = button["address"] if button["address"] is not None else f"Unknown Address {button['index']}"
+        if filtering_active and location_address not in allowed_locations_filter:
+            print(f"[tab {tab['number']}] Skipping {location_name} (Address '{location_address}' not in allow list)")
+            return True
+        if poll_scheduler is not None and not poll_scheduler.is_due(location_name):
+            print(f"[tab {tab['number']}] Skipping {location_name} (not due yet, polled every {poll_scheduler.interval_for(location_name):.0f}s)")
+            return True
+        print(f"[tab {tab['number']}] Opening {location_name} ({location_address})")
+        driver.execute_script("arguments[0].click();", button["element"])
+        browser_watchdog.count_navigation(driver)
+        tab.update(state="location", name=location_name, address=location_address, datetimes=[], status="",
+                   date_index=0, date_count=0, deadline=now + 30)
+        return True
+
+    if tab["state"] == "location":
+        page = browser_support.read_location_page_state(driver, DATEPICKER_SELECTOR, NO_APPOINTMENTS_ELEMENT_ID, CLICKABLE_DATES_SELECTOR)
+        if page is None:
+            if now > tab["deadline"]:
+                finish_tab_location(driver, tab, raw_location_results, run_state, "Datepicker Not Found")
+                return True
+            return False
+        if page["no_appointments"]:
+            finish_tab_location(driver, tab, raw_location_results, run_state, "No appointments in next 90 days")
+        elif page["dates"] == 0:
+            finish_tab_location(driver, tab, raw_location_results, run_state, "No clickable dates found")
+        else:
+            record_page(driver)
+            tab.update(state="date", date_count=page["dates"], deadline=now + 15)
+        return True
+
+    if tab["state"] == "date":
+        if tab["date_index"] >= tab["date_count"]:
+            finish_tab_location(driver, tab, raw_location_results, run_state)
+            return True
+        clicked_date = browser_support.click_date(driver, CLICKABLE_DATES_SELECTOR, tab["date_index"])
+        if clicked_date is None:
+            if now > tab["deadline"]:
+                print(f"[tab {tab['number']}] Overlay still visible on {tab['name']}; skipping date index {tab['date_index']}.")
+                tab.update(date_index=tab["date_index"] + 1, deadline=now + 15)
+                return True
+            return False
+        if not clicked_date:
+            finish_tab_location(driver, tab, raw_location_results, run_state)
+            return True
+        tab.update(state="times", clicked_date=clicked_date, clicked_at=now, deadline=now + 25)
+        return True
+
+    if tab["state"] == "times":
+        option_datetimes = browser_support.read_option_datetimes(driver, TIME_SELECT_ID, tab["clicked_date"])
+        if option_datetimes is None:
+            if now <= tab["deadline"]:
+                return False
+            print(f"[tab {tab['number']}] Time options did not load for {tab['name']} date index {tab['date_index']}.")
+        else:
+            browser_support.record_duration(getattr(driver, "browser_profile", "normal"),
+                                            "datepicker refresh", now - tab["clicked_at"])
+            tab["datetimes"].extend(select_matching_datetimes(
+                option_datetimes, tab["name"], tab["address"],
+                date_filter_enabled, start_date, end_date,
+                time_filter_enabled, start_time, end_time, run_state
+            ))
+        tab.update(state="date", date_index=tab["date_index"] + 1, deadline=now + 15)
+        return True
+
+    if tab["state"] == "back":
+        if browser_support.location_list_ready(driver, LOCATION_BUTTON_SELECTOR):
+            tab["state"] = "list"
+            return True
+        if now > tab["deadline"]:
+            print(f"[tab {tab['number']}] Location list did not come back; retiring this tab for the run.")
+            tab["state"] = "done"
+            return True
+        return False
+
+    return False
+
+def process_locations_in_tabs(url, driver, locations_to_process, tab_count, filter_args, run_state):
+    """Visit the locations with tab_count tabs of one driver, switching to whichever tab can make progress.
+
+    Each tab takes the next location, nearest first, as soon as it is back on the location list.
+    """
+    handles = open_extra_tabs(url, driver, tab_count)
+    print(f"Processing {len(locations_to_process)} locations in {len(handles)} tab(s) of one browser.")
+    tabs = [{"number": number, "handle": handle, "state": "list"} for number, handle in enumerate(handles)]
+    pending_locations = deque(locations_to_process)
+    raw_location_results = {}
+    started = time.monotonic()
+    current_handle = driver.current_window_handle
+    while any(tab["state"] != "done" for tab in tabs):
+        progressed = False
+        for tab in tabs:
+            if tab["state"] == "done":
+                continue
+            if tab["handle"] != current_handle:
+                driver.switch_to.window(tab["handle"])
+                current_handle = tab["handle"]
+            try:
+                progressed = step_location_tab(driver, tab, pending_locations, raw_location_results, filter_args, run_state) or progressed
+            except Exception as tab_e:
+                print(f"[tab {tab['number']}] ERROR in state '{tab['state']}': {type(tab_e).__name__}: {tab_e}")
+                if isinstance(tab_e, WebDriverException) and not is_driver_healthy(driver):
+                    raise
+                if tab["state"] in ("location", "date", "times"):
+                    try:
+                        finish_tab_location(driver, tab, raw_location_results, run_state,
+                                            f"Error processing location: {type(tab_e).__name__}")
+                    except Exception:
+                        tab["state"] = "done"
+                else:
+                    tab["state"] = "done"
+                progressed = True
+        if not progressed:
+            time.sleep(0.05)
+    driver.switch_to.window(handles[0])
+    print(f"Tabs finished {len(raw_location_results)}/{len(locations_to_process)} location(s) in {time.monotonic() - started:.1f}s.")
+    ordered_results = {name: raw_location_results.pop(name) for _, name in locations_to_process if name in raw_location_results}
+    ordered_results.update(raw_location_results)
+    return ordered_results
+
+def process_locations_in_browser(url, driver, locations_to_process, filter_args, run_state):
+    """Visit the locations one at a time, or interleaved across BROWSER_TABS tabs of this driver."""
+    tab_count = min(max(1, BROWSER_TABS), len(locations_to_process))
+    if tab_count > 1:
+        return process_locations_in_tabs(url, driver, locations_to_process, tab_count, filter_args, run_state)
+    return process_locations(driver, locations_to_process, *filter_args, run_state)
+
+def run_location_shard(worker_number, url, driver, shard, filter_args, run_state,
+                       driver_path, binary_path, user_address, on_location_list=False):
+    """One pool worker: bring up its driver if needed, walk to the location list once, then visit its shard.
+
+    Returns (results, driver); driver is None if it has to be restarted before the next run.
+    """
+    started = time.monotonic()
+    try:
+        if driver is not None and not is_driver_healthy(driver):
+            print(f"Worker {worker_number}: driver appears unhealthy, restarting it...")
+            cleanup_driver(driver)
+            driver = None
+        if driver is None:
+            driver = initialize_webdriver(driver_path, binary_path, user_address)
+            if driver is None:
+                print(f"Worker {worker_number}: could not start a webdriver; its {len(shard)} location(s) are skipped this run.")
+                return {}, None
+        if not on_location_list:
+            ok, walked_driver = open_location_list(url, driver)
+            if not ok:
+                if walked_driver is None:
+                    cleanup_driver(driver)
+                print(f"Worker {worker_number}: could not reach the location list; its {len(shard)} location(s) are skipped this run.")
+                return {}, walked_driver
+        results = process_locations_in_browser(url, driver, shard, filter_args, run_state)
+    except Exception as e:
+        print(f"Worker {worker_number}: error ({type(e).__name__}: {e}); its remaining locations are skipped this run.")
+        if isinstance(e, WebDriverException):
+            cleanup_driver(driver)
+            return {}, None
+        return {}, driver
+    print(f"Worker {worker_number}: {len(results)}/{len(shard)} location(s) in {time.monotonic() - started:.1f}s.")
+    return results, driver
+
+def process_locations_in_pool(url, driver, locations_to_process, worker_count, filter_args, run_state,
+                              driver_path, binary_path, user_address):
+    """Split the locations round robin over worker_count browsers and merge their results nearest first.
+
+    Worker 0 is the main driver, which is already on the location list; the others are kept in
+    pool_drivers between runs. Returns (raw_location_results, main driver or None).
+    """
+    while len(pool_drivers) < worker_count - 1:
+        pool_drivers.append(None)
+    # round robin so every worker starts on one of the nearest offices
+    shards = [locations_to_process[worker::worker_count] for worker in range(worker_count)]
+    print(f"Processing {len(locations_to_process)} locations with {worker_count} browsers "
+          f"({', '.join(str(len(shard)) for shard in shards)} each).")
+    with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="browser-worker") as executor:
+        futures = [executor.submit(run_location_shard, 0, url, driver, shards[0], filter_args, run_state,
+                                   driver_path, binary_path, user_address, True)]
+        for worker in range(1, worker_count):
+            futures.append(executor.submit(run_location_shard, worker, url, pool_drivers[worker - 1], shards[worker],
+                                           filter_args, run_state, driver_path, binary_path, user_address))
+        shard_results = []
+        for worker, future in enumerate(futures):
+            results, worker_driver = future.result()
+            shard_results.append(results)
+            if worker == 0:
+                driver = worker_driver
+            else:
+                pool_drivers[worker - 1] = worker_driver
+
+    combined = {}
+    for results in shard_results:
+        combined.update(results)
+    raw_location_results = {name: combined.pop(name) for _, name in locations_to_process if name in combined}
+    raw_location_results.update(combined)
+    return raw_location_results, driver
+
 def extract_times_for_all_locations_firefox(
     url, driver, driver_path, binary_path,
     allowed_locations_filter, filtering_active,
@@ -571,350 +1158,58 @@ def extract_times_for_all_locations_firefox(
             print("Driver appears unhealthy, returning for restart...")
             return {}, False, None
 
-        print(f"Navigating to URL: {url}")
-        driver.get(url)
-        print("Page loaded.")
-
-        try:
-            make_appointment_button = WebDriverWait(driver, 90).until(
-                EC.presence_of_element_located((By.ID, "cmdMakeAppt"))
-            )
-            print("Found 'Make an Appointment' button.")
-            make_appointment_button.click()
-            print("Clicked 'Make an Appointment' button.")
-        except (WebDriverException, TimeoutException) as e:
-            print(f"ERROR: Could not find or click 'Make an Appointment' button: {e}. Stopping.")
-            if isinstance(e, WebDriverException):
-                return {}, False, None  # Need driver restart
-            return {}, False, driver
-
-        try:
-            first_layer_button_xpath = f"//div[contains(@class, 'QflowObjectItem') and .//div[contains(text(), '{APPOINTMENT_TYPE}')]]"
-            time.sleep(2)
-            
-            # Wait for any blocking overlays to disappear
-            wait_for_overlays_to_disappear(driver)
-            
-            first_layer_button = WebDriverWait(driver, 50).until(
-                EC.element_to_be_clickable((By.XPATH, first_layer_button_xpath))
-            )
-            print(f"Found '{APPOINTMENT_TYPE}' button.")
-            
-            # Try clicking with JavaScript if regular click fails due to overlay
-            try:
-                first_layer_button.click()
-                print(f"Clicked '{APPOINTMENT_TYPE}' button.")
-            except Exception as click_error:
-                print(f"Regular click failed: {click_error}. Trying JavaScript click...")
-                driver.execute_script("arguments[0].click();", first_layer_button)
-                print(f"JavaScript clicked '{APPOINTMENT_TYPE}' button.")
-            
-            # Wait for the location selection page to load
-            print("Waiting for location selection page to load...")
-            time.sleep(3)
-            
-        except (WebDriverException, TimeoutException) as e:
-            print(f"ERROR: Could not find or click '{APPOINTMENT_TYPE}' button: {e}. Stopping.")
-            if isinstance(e, WebDriverException):
-                return {}, False, None  # Need driver restart
-            return {}, False, driver
-
-        location_button_wait = WebDriverWait(driver, 45)
-        # Look for actual DMV office location buttons - these should have different structure
-        second_layer_button_selector = "div.QflowObjectItem.form-control.ui-selectable"
-
-        try:
-            print("Waiting for location buttons...")
-            location_button_wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, second_layer_button_selector)))
-            print("Location buttons are present.")
-        except (WebDriverException, TimeoutException) as e:
-            print(f"ERROR: No location buttons found after clicking appointment type: {e}. Stopping.")
-            if isinstance(e, WebDriverException):
-                return {}, False, None  # Need driver restart
+        ok, driver = open_location_list(url, driver)
+        if not ok:
             return {}, False, driver
 
-        initial_buttons = driver.find_elements(By.CSS_SELECTOR, second_layer_button_selector)
-        num_initial_buttons = len(initial_buttons)
+        # One execute_script round trip returns every button's state, name and address
+        location_buttons = browser_support.harvest_location_buttons(driver, LOCATION_BUTTON_SELECTOR)
+        num_initial_buttons = len(location_buttons)
         print(f"Found {num_initial_buttons} total location buttons (including inactive ones).")
         
         # Quick sanity check - make sure we're on the location selection page
-        if any("Driver License" in btn.text or "Motorcycle" in btn.text or "Teen Driver" in btn.text for btn in initial_buttons[:5]):
+        if any("Driver License" in btn["text"] or "Motorcycle" in btn["text"] or "Teen Driver" in btn["text"] for btn in location_buttons[:5]):
             print("WARNING: Still appears to be on appointment type selection page, not location selection!")
             print("This suggests the appointment type click didn't navigate to the location page.")
             return {}, False, driver
 
         # First, quickly identify all available buttons to avoid processing unavailable ones
         print("Quickly scanning for available locations...")
-        available_button_indices = []
-        WebDriverWait(driver, 15).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, second_layer_button_selector)))
-        location_button_elements = driver.find_elements(By.CSS_SELECTOR, second_layer_button_selector)
-        
-        for index in range(min(num_initial_buttons, len(location_button_elements))):
-            try:
-                current_button = location_button_elements[index]
-                button_class = current_button.get_attribute("class") or ""
-                has_disabled_class = "disabled-unit" in button_class
-                
-                if not has_disabled_class and current_button.is_displayed() and current_button.is_enabled():
-                    available_button_indices.append(index)
-                    # Get location name for quick reference
-                    try:
-                        button_lines = current_button.text.splitlines()
-                        location_name = button_lines[0].strip() if button_lines else f"Location {index}"
-                        print(f"  Available: {location_name} (index {index})")
-                    except:
-                        print(f"  Available: Location {index}")
-            except Exception as e:
-                continue
+        available_buttons = []
+        for button in location_buttons:
+            if button["available"]:
+                location_name = button["name"] or f"Location {button['index']}"
+                available_buttons.append((button["index"], location_name, button["address"]))
+                print(f"  Available: {location_name} (index {button['index']})")
         
-        print(f"Found {len(available_button_indices)} available locations out of {num_initial_buttons} total.")
-        if len(available_button_indices) == 0:
+        print(f"Found {len(available_buttons)} available locations out of {num_initial_buttons} total.")
+        if filtering_active:
+            # Scan nearest first by our own distances, and only offices inside the radius.
+            in_range_buttons = [button for button in available_buttons if button[2] in allowed_locations_filter]
+            for index, location_name, location_address in available_buttons:
+                if location_address not in allowed_locations_filter:
+                    print(f"  Out of range: {location_name} ({location_address})")
+            available_buttons = sorted(in_range_buttons, key=lambda button: allowed_locations_filter[button[2]])
+            print(f"{len(available_buttons)} available locations are within range, nearest first.")
+        locations_to_process = [(index, location_name) for index, location_name, _ in available_buttons]
+        if poll_scheduler is not None:
+            poll_scheduler.sync_locations([location_name for _, location_name in locations_to_process])
+        if len(locations_to_process) == 0:
             print("No available locations found - all are currently disabled/unavailable.")
             return raw_location_results, True, driver
-        
-        # Now process only the available locations
-        for index in available_button_indices:
-            location_name = f"Unknown Location {index}"
-            location_address_from_site = "Unknown Address"
-            location_processed_successfully = False
-
-            try:
-                print(f"\n--- Processing available location index: {index} ---")
-                WebDriverWait(driver, 15).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, second_layer_button_selector)))
-                location_button_elements = driver.find_elements(By.CSS_SELECTOR, second_layer_button_selector)
-                
-                if index >= len(location_button_elements):
-                    print(f"Index {index} out of bounds ({len(location_button_elements)} total buttons). Skipping.")
-                    continue
-
-                current_button = location_button_elements[index]
-                
-                # Double-check that button is still available (page might have changed)
-                try:
-                    button_class = current_button.get_attribute("class") or ""
-                    has_disabled_class = "disabled-unit" in button_class
-                    
-                    if has_disabled_class or not current_button.is_displayed() or not current_button.is_enabled():
-                        print(f"Location {index} became unavailable since scan. Skipping.")
-                        continue
-                except Exception as e:
-                    print(f"Warning: Could not re-check button state for index {index}: {e}. Skipping.")
-                    continue
-
-                try:
-                    button_text = current_button.text
-                    print(f"Button {index} text: '{button_text}'")
-                    
-                    button_lines = current_button.text.splitlines()
-                    if button_lines:
-                        location_name = button_lines[0].strip()
-                    else:
-                        location_name = f"Unknown Location {index}"
-                        
-                    try:
-                        address_element = current_button.find_element(By.CSS_SELECTOR, "div.form-control-child")
-                        location_address_from_site = address_element.text.strip()
-                    except NoSuchElementException:
-                        print(f"Could not find address element with 'div.form-control-child' for button {index}")
-                        # Try alternative selectors
-                        try:
-                            address_element = current_button.find_element(By.CSS_SELECTOR, "div[class*='form-control']")
-                            location_address_from_site = address_element.text.strip()
-                            print(f"Found address using alternative selector: '{location_address_from_site}'")
-                        except NoSuchElementException:
-                            location_address_from_site = f"Unknown Address {index}"
-                            print(f"Could not find any address element for button {index}")
-                    
-                    print(f"Location: {location_name} ({location_address_from_site})")
-                except Exception as e:
-                    print(f"Warning: Could not get name/address for index {index}: {e}")
-                    location_name = f"Unknown Location {index}"
-                    location_address_from_site = f"Unknown Address {index}"
-
-                if filtering_active and location_address_from_site not in allowed_locations_filter:
-                    print(f"Skipping {location_name} (Address '{location_address_from_site}' not in allow list)")
-                    # Since locations are sorted by distance, if this one is out of range, 
-                    # all remaining locations will also be out of range
-                    print("Breaking out of location loop - remaining locations will be out of range")
-                    break
-
-                print(f"Clicking button for: {location_name}")
-                current_button.click()
-                location_processed_successfully = True
-                time.sleep(1)
-
-                valid_appointment_datetimes_for_location = []
-                location_status_message = ""
-                process_dates = True
-
-                datepicker_table_selector_css = "table.ui-datepicker-calendar"
-                error_locator_id = "547650da-008d-4fd0-a164-31a44e94"
-                overlay_selector_css = "div.blockUI.blockOverlay"
-
-                try:
-                    print("Waiting for datepicker...")
-                    WebDriverWait(driver, 30).until(
-                        EC.visibility_of_element_located((By.CSS_SELECTOR, datepicker_table_selector_css))
-                    )
-                    print("Datepicker visible.")
-                    try:
-                        error_element = driver.find_element(By.ID, error_locator_id)
-                        error_html = error_element.get_attribute('innerHTML')
-                        if "does not currently have any appointments available" in error_html:
-                            print("Message: No appointments available in next 90 days.")
-                            location_status_message = "No appointments in next 90 days"
-                            process_dates = False
-                    except NoSuchElementException:
-                        pass
-                    except Exception as e:
-                        print(f"Warning checking 90-day error msg: {e}")
-
-                except Exception as e:
-                    print(f"Did not find datepicker or error occurred: {e}")
-                    location_status_message = "Datepicker Not Found"
-                    process_dates = False
-
-                if process_dates:
-                    print("Processing available dates...")
-                    clickable_dates_selector_css = "td[data-handler='selectDay']:not(.ui-datepicker-unselectable):not(.ui-state-disabled) a.ui-state-default"
-                    time_select_locator = (By.ID, "6f1a7b21-2558-41bb-8e4d-2cba7a8b1608")
-
-                    try:
-                        WebDriverWait(driver,10).until(EC.presence_of_element_located((By.CSS_SELECTOR, datepicker_table_selector_css)))
-                        date_elements = driver.find_elements(By.CSS_SELECTOR, clickable_dates_selector_css)
-                        num_dates = len(date_elements)
-                        print(f"Found {num_dates} clickable dates.")
-
-                        if num_dates == 0 and not location_status_message:
-                            location_status_message = "No clickable dates found"
-
-                        for date_index in range(num_dates):
-                            processed_date = False
-                            try:
-                                current_date_links = driver.find_elements(By.CSS_SELECTOR, clickable_dates_selector_css)
-                                if date_index >= len(current_date_links):
-                                    print(f"Date index {date_index} out of bounds on re-find. Skipping remaining.")
-                                    break
-
-                                date_link_element = current_date_links[date_index]
-                                date_day_text = date_link_element.text
-                                print(f"    Processing Date Index {date_index} (Day: '{date_day_text}')...", end="")
-
-                                overlay_wait_start = time.time()
-                                max_overlay_wait = 15
-                                overlay_timed_out = False
-                                while True:
-                                    try:
-                                        overlay = driver.find_element(By.CSS_SELECTOR, overlay_selector_css)
-                                        if overlay.is_displayed():
-                                            if time.time() - overlay_wait_start > max_overlay_wait:
-                                                print(" Overlay still visible after timeout.", end="")
-                                                overlay_timed_out = True
-                                                break
-                                            time.sleep(0.5)
-                                        else:
-                                            break
-                                    except NoSuchElementException:
-                                        break
-                                    except Exception as e_overlay_check:
-                                        print(f" Error checking overlay: {e_overlay_check}", end="")
-                                        break
-
-                                if overlay_timed_out:
-                                    print(" Skipping date click due to persistent overlay.")
-                                    continue
-
-                                date_link_element.click()
-
-                                time_select_element = wait_for_options_in_select(driver, time_select_locator, timeout=25)
-
-                                if time_select_element:
-                                    time_options = time_select_element.find_elements(By.TAG_NAME, "option")
-                                    times_found_this_date = 0
-                                    for option in time_options[1:]:
-                                        try:
-                                            datetime_str = option.get_attribute("data-datetime")
-                                            if not datetime_str:
-                                                continue
-
-                                            appointment_dt = datetime.strptime(datetime_str, "%m/%d/%Y %I:%M:%S %p")
-                                            appointment_date = appointment_dt.date()
-                                            appointment_time = appointment_dt.time()
-
-                                            date_ok = not date_filter_enabled or (start_date <= appointment_date <= end_date)
-                                            time_ok = not time_filter_enabled or (start_time <= appointment_time <= end_time)
-
-                                            if date_ok and time_ok:
-                                                valid_appointment_datetimes_for_location.append(datetime_str)
-                                                times_found_this_date += 1
-                                                # Only send immediate notification for the very first new appointment found
-                                                if times_found_this_date == 1 and len(raw_location_results.keys()) == 0:
-                                                    # Check if this specific appointment should trigger an immediate notification
-                                                    if should_send_notification(location_name, datetime_str):
-                                                        # Format the first appointment in a readable way
-                                                        try:
-                                                            # Parse and reformat the datetime string for better readability
-                                                            dt_obj = datetime.strptime(datetime_str, "%m/%d/%Y %I:%M:%S %p")
-                                                            pretty_date = dt_obj.strftime("%A, %B %d, %Y")  # e.g., "Monday, January 15, 2025"
-                                                            pretty_time = dt_obj.strftime("%I:%M %p")       # e.g., "2:30 PM"
-                                                            pretty_datetime = f"{pretty_date} at {pretty_time}"
-                                                        except:
-                                                            # Fallback to original format if parsing fails
-                                                            pretty_datetime = datetime_str
-                                                        
-                                                        first_appointment_message = f"🚨🚨🚨 NEW APPOINTMENTS ARRIVING!\n\n**First Available:**\n📍 **Location:** {location_name}\n📅 **Date & Time:** {pretty_datetime}\n🏢 **Address:** {location_address_from_site}\n\n*More appointments may be available - check next message for full list*"
-                                                        send_discord_notification(YOUR_DISCORD_WEBHOOK_URL, first_appointment_message)
-                                                    else:
-                                                        print(f"Skipping immediate notification for first appointment (recently notified)")
-                                        except Exception:
-                                            pass
-                                    if times_found_this_date > 0:
-                                        print(f" Added {times_found_this_date} time(s).")
-                                        processed_date = True
-                                    else:
-                                         print(" No matching times found.")
-                                else:
-                                     print(" Time options did not load.")
-
-                            except Exception as e_date:
-                                if not processed_date: 
-                                     print(f" Error processing date index {date_index} (Day '{date_day_text}'): {e_date}")
-
-                    except Exception as e_find_dates:
-                        print(f"  Error finding or looping through date elements: {e_find_dates}")
-                        if not location_status_message:
-                            location_status_message = "Error processing dates"
-
-                if valid_appointment_datetimes_for_location:
-                    try:
-                        valid_appointment_datetimes_for_location.sort(key=parse_datetime_for_sort)
-                    except Exception as e_sort:
-                         print(f"  Warning: Could not sort times for {location_name}: {e_sort}")
-                    raw_location_results[location_name] = valid_appointment_datetimes_for_location
-                elif location_status_message:
-                    raw_location_results[location_name] = location_status_message
-                else:
-                    raw_location_results[location_name] = []
-
-            except Exception as location_e:
-                print(f"!! ERROR processing location index {index} ({location_name}): {location_e}")
-                raw_location_results[location_name] = f"Error processing location: {type(location_e).__name__}"
-
-            finally:
-                if location_processed_successfully:
-                    try:
-                        print("Navigating back to location list...")
-                        driver.back()
-                        time.sleep(2.0)
-                        print("Waiting for location buttons...")
-                        WebDriverWait(driver, 25).until(
-                             EC.presence_of_all_elements_located((By.CSS_SELECTOR, second_layer_button_selector))
-                        )
-                        print("Location buttons present for next iteration.")
-                        time.sleep(0.5)
-                    except Exception as back_wait_e:
-                         print(f"WARNING: Issue navigating back or waiting for buttons after location index {index}: {back_wait_e}. Trying next location.")
 
+        filter_args = (allowed_locations_filter, filtering_active,
+                       date_filter_enabled, start_date, end_date,
+                       time_filter_enabled, start_time, end_time)
+        run_state = {"lock": threading.Lock(), "locations_finished": 0}
+        worker_count = min(browser_worker_count, len(locations_to_process))
+        if worker_count > 1:
+            raw_location_results, driver = process_locations_in_pool(
+                url, driver, locations_to_process, worker_count, filter_args, run_state,
+                driver_path, binary_path, user_address
+            )
+        else:
+            raw_location_results = process_locations_in_browser(url, driver, locations_to_process, filter_args, run_state)
 
         print("\nFinished processing locations loop.")
 
@@ -929,6 +1224,10 @@ def extract_times_for_all_locations_firefox(
             return {}, False, None
         return {}, False, driver  # Return False to indicate need for driver restart
 
+    browser_support.print_wait_stats()
+    for run_driver in [run_driver for run_driver in [driver] + pool_drivers if run_driver is not None]:
+        browser_support.record_browser_memory(run_driver, getattr(run_driver, "browser_profile", "normal"))
+    browser_support.print_page_timings()
     print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Extraction process finished.")
     return raw_location_results, True, driver  # Return True to indicate successful run
 
@@ -944,84 +1243,112 @@ if YOUR_DISCORD_WEBHOOK_URL == "YOUR_WEBHOOK_URL_HERE":
     print("!!! WARNING: DISCORD WEBHOOK URL IS NOT SET. Notifications will be skipped. !!!")
     print("!!! Edit the YOUR_DISCORD_WEBHOOK_URL variable in the script. !!!")
 
+slot_store = None
+if SLOT_STORE_FILE:
+    try:
+        slot_store = SlotStore(SLOT_STORE_FILE)
+        load_recent_notifications(slot_store)
+    except Exception as e:
+        print(f"Warning: Could not open slot store '{SLOT_STORE_FILE}': {e}. Notification history will not survive restarts.")
+        slot_store = None
+
 # Initialize webdriver once outside the main loop
 driver = None
 driver_restart_needed = True
 
-while True:
-    print(f"\n--- Starting run at {time.strftime('%Y-%m-%d %H:%M:%S')} ---")
+try:
+    while True:
+        print(f"\n--- Starting run at {time.strftime('%Y-%m-%d %H:%M:%S')} ---")
 
-    try:
-        # Initialize or restart driver if needed
-        if driver_restart_needed or driver is None or not is_driver_healthy(driver):
-            if driver:
-                print("Restarting webdriver...")
-                cleanup_driver(driver)
-                driver = None
-            driver = initialize_webdriver(GECKODRIVER_PATH, FIREFOX_BINARY_PATH, YOUR_ADDRESS)
-            if driver is None:
-                print("Failed to initialize webdriver. Retrying in next run...")
-                driver_restart_needed = True
-                time.sleep(5)
-                continue
-            driver_restart_needed = False
+        try:
+            # Initialize or restart driver if needed
+            if driver_restart_needed or driver is None or not is_driver_healthy(driver):
+                if driver:
+                    print("Restarting webdriver...")
+                    cleanup_driver(driver)
+                    driver = None
+                driver = initialize_webdriver(GECKODRIVER_PATH, FIREFOX_BINARY_PATH, YOUR_ADDRESS)
+                if driver is None:
+                    print("Failed to initialize webdriver. Retrying in next run...")
+                    driver_restart_needed = True
+                    time.sleep(5)
+                    continue
+                driver_restart_needed = False
         
-        results, success, driver = extract_times_for_all_locations_firefox(
-            NCDOT_APPOINTMENT_URL, # URL
-            driver,                # Persistent driver
-            GECKODRIVER_PATH,      # Driver path
-            FIREFOX_BINARY_PATH,   # Binary path
-            allowed_locations,     # Distance filter
-            filtering_enabled,     # Distance filter flag
-            date_filter,           # Date filter flag
-            dt_start,              # Date filter start
-            dt_end,                # Date filter end
-            time_filter,           # Time filter flag
-            tm_start,              # Time filter start
-            tm_end,                # Time filter end
-            YOUR_ADDRESS           # User address for geolocation
-        )
+            results, success, driver = extract_times_for_all_locations_firefox(
+                NCDOT_APPOINTMENT_URL, # URL
+                driver,                # Persistent driver
+                GECKODRIVER_PATH,      # Driver path
+                FIREFOX_BINARY_PATH,   # Binary path
+                allowed_locations,     # Distance filter
+                filtering_enabled,     # Distance filter flag
+                date_filter,           # Date filter flag
+                dt_start,              # Date filter start
+                dt_end,                # Date filter end
+                time_filter,           # Time filter flag
+                tm_start,              # Time filter start
+                tm_end,                # Time filter end
+                YOUR_ADDRESS           # User address for geolocation
+            )
         
-        if not success:
-            print("!!! Error occurred during extraction. Will restart driver in next run. !!!")
-            driver_restart_needed = True
-            # If driver was returned as None, we need to restart
-            if driver is None:
+            if not success:
+                print("!!! Error occurred during extraction. Will restart driver in next run. !!!")
                 driver_restart_needed = True
-            continue
+                # If driver was returned as None, we need to restart
+                if driver is None:
+                    driver_restart_needed = True
+                continue
+
+            print(results)
 
-        print(results)
+            if not lean_baseline_done:
+                print("Baseline run with the normal browser profile done. Restarting the browsers with the lean profile.")
+                lean_baseline_done = True
+                driver_restart_needed = True
+                for i, pool_driver in enumerate(pool_drivers):
+                    cleanup_driver(pool_driver)
+                    pool_drivers[i] = None
 
-        # Filter out appointments that have been notified about recently
-        filtered_results = filter_new_appointments(results)
+            # Filter out appointments that have been notified about recently
+            filtered_results = filter_new_appointments(results)
         
-        discord_message_content = format_results_for_discord(filtered_results)
-        if discord_message_content:
-            print("New appointment times found (after filtering). Sending notification...")
-            send_discord_notification(YOUR_DISCORD_WEBHOOK_URL, discord_message_content)
-        else:
-            # Check if we had results but they were all filtered out
-            original_message_content = format_results_for_discord(results)
-            if original_message_content:
-                print("Appointments found but all were recently notified about - no new notification sent.")
+            if slot_store is not None:
+                record_run_in_slot_store(slot_store, results, filtered_results)
+
+            discord_message_content = format_results_for_discord(filtered_results)
+            if discord_message_content:
+                print("New appointment times found (after filtering). Sending notification...")
+                send_discord_notification(YOUR_DISCORD_WEBHOOK_URL, discord_message_content)
             else:
-                send_discord_notification(YOUR_DISCORD_WEBHOOK_URL, None)
-                print("No valid appointment times found in this run.")
+                # Check if we had results but they were all filtered out
+                original_message_content = format_results_for_discord(results)
+                if original_message_content:
+                    print("Appointments found but all were recently notified about - no new notification sent.")
+                else:
+                    send_discord_notification(YOUR_DISCORD_WEBHOOK_URL, None)
+                    print("No valid appointment times found in this run.")
 
-    except Exception as e:
-        print(f"!!! Unexpected error in main loop: {e}. Will restart driver in next run. !!!")
-        driver_restart_needed = True
-        continue
+            # Only here, with the sweep finished, may a browser be swapped for a fresh one.
+            if recycle_grown_browsers(driver):
+                driver_restart_needed = True
 
-    #base_sleep = BASE_INTERVAL_SECONDS
-    random_delay = random.randint(MIN_RANDOM_DELAY_SECONDS, MAX_RANDOM_DELAY_SECONDS)
-    total_sleep = random_delay
+        except Exception as e:
+            print(f"!!! Unexpected error in main loop: {e}. Will restart driver in next run. !!!")
+            driver_restart_needed = True
+            continue
 
-    print(f"--- Run finished. Sleeping for {total_sleep // 60} minutes and {total_sleep % 60} seconds ---")
-    try:
-        #time.sleep(0)
-        pass
-    except KeyboardInterrupt:
-        print("\nCtrl+C detected. Closing webdriver and exiting script.")
-        cleanup_driver(driver)
-        break
+        #base_sleep = BASE_INTERVAL_SECONDS
+        random_delay = random.randint(MIN_RANDOM_DELAY_SECONDS, MAX_RANDOM_DELAY_SECONDS)
+        total_sleep = random_delay
+
+        print(f"--- Run finished. Sleeping for {total_sleep // 60} minutes and {total_sleep % 60} seconds ---")
+except KeyboardInterrupt:
+    print("\nCtrl+C detected. Closing webdriver and exiting script.")
+finally:
+    # also reached mid-sweep, so alerts still queued in the notifier get their chance to go out
+    cleanup_driver(driver)
+    for pool_driver in pool_drivers:
+        cleanup_driver(pool_driver)
+    if not notifier.wait_until_idle(timeout=30):
+        print(f"Gave up waiting on {notifier.queue_depth()} unsent notification(s).")
+    notifier.print_stats()
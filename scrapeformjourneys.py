@@ -8,9 +8,8 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException,
 import time
 import json
 import os
-import re
-from bs4 import BeautifulSoup
 import traceback
+import fast_extract
 
 # --- Configuration ---
 GECKODRIVER_PATH = os.getenv('GECKODRIVER_PATH', 'YOUR_GECKODRIVER_PATH_HERE')
@@ -60,16 +59,7 @@ def save_locations_data(filepath, data):
     except Exception as e_save: print(f"Error saving data to {filepath}: {e_save}")
 
 def extract_form_journey_details(html_source):
-    soup = BeautifulSoup(html_source, 'html.parser')
-    fj_content, appt_id_str = None, None
-    for script_tag in soup.find_all('script', type="text/javascript"):
-        if script_tag.string and (match := re.search(r"sessionStorage\.setItem\s*\(\s*[\"']formJourney[\"']\s*,\s*[\"'](.*?)[\"']\s*\)", script_tag.string, re.DOTALL)):
-            fj_content = match.group(1); break
-    for select_el in soup.find_all('select'):
-        for option_el in select_el.find_all('option', attrs={'data-appointmenttypeid': True}):
-            if (appt_id := option_el.get('data-appointmenttypeid')) and appt_id.isdigit() and option_el.get_text(strip=True) != '-':
-                appt_id_str = appt_id; break
-        if appt_id_str: break
+    fj_content, appt_id_str = fast_extract.extract_form_journey_details(html_source)
     if not fj_content: print("    DEBUG: formJourney content not found.")
     if not appt_id_str: print("    DEBUG: data-appointmenttypeid not found.")
     return fj_content, appt_id_str
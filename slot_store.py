@@ -0,0 +1,132 @@
+import sqlite3
+import threading
+import time
+
+# Every appointment slot we have seen, keyed by (appointment type, location, slot), with when it was
+# first and last seen and when we last notified about it. Lives in a SQLite file so dedup survives
+# restarts. Writes are buffered in memory and committed in one transaction by flush(), once per run.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    appointment_type TEXT NOT NULL,
+    location TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    notified_at REAL,
+    PRIMARY KEY (appointment_type, location, slot)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS slots_by_last_seen ON slots (appointment_type, last_seen);
+CREATE INDEX IF NOT EXISTS slots_by_notified_at ON slots (appointment_type, notified_at);
+"""
+
+_UPSERT_SEEN = """
+INSERT INTO slots (appointment_type, location, slot, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (appointment_type, location, slot) DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen)
+"""
+
+_UPSERT_NOTIFIED = """
+INSERT INTO slots (appointment_type, location, slot, first_seen, last_seen, notified_at) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (appointment_type, location, slot) DO UPDATE SET notified_at = excluded.notified_at
+"""
+
+
+class SlotStore:
+    def __init__(self, path, retention_days=30):
+        self.path = path
+        self.retention_seconds = retention_days * 86400
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(_SCHEMA)
+        self.pending_seen = {}
+        self.pending_notified = {}
+        self.held_notified = set()
+
+    def observe(self, appointment_type, location, slots, now=None):
+        """Buffer that these slots were seen at location this run."""
+        now = time.time() if now is None else now
+        with self.lock:
+            for slot in slots:
+                key = (appointment_type, location, slot)
+                first_seen, _ = self.pending_seen.get(key, (now, now))
+                self.pending_seen[key] = (first_seen, now)
+
+    def mark_notified(self, appointment_type, location, slots, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            for slot in slots:
+                self.pending_notified[(appointment_type, location, slot)] = now
+
+    def hold_notified(self, appointment_type, location, slots):
+        """Buffer slots about to go out in a notification; release_held() marks them once it was handed off."""
+        with self.lock:
+            for slot in slots:
+                self.held_notified.add((appointment_type, location, slot))
+
+    def release_held(self, notified, now=None):
+        """Mark every held slot notified if the message carrying them was handed off, else forget them."""
+        now = time.time() if now is None else now
+        with self.lock:
+            held, self.held_notified = self.held_notified, set()
+            if notified:
+                for key in held:
+                    self.pending_notified[key] = now
+        return len(held)
+
+    def last_notified(self, appointment_type, location):
+        """{slot: notified_at} for every slot at location we have notified about, including unflushed ones."""
+        with self.lock:
+            notified = dict(self.connection.execute(
+                "SELECT slot, notified_at FROM slots WHERE appointment_type = ? AND location = ? AND notified_at IS NOT NULL",
+                (appointment_type, location)
+            ).fetchall())
+            for (pending_type, pending_location, slot), notified_at in self.pending_notified.items():
+                if pending_type == appointment_type and pending_location == location:
+                    notified[slot] = notified_at
+        return notified
+
+    def filter_unnotified(self, appointment_type, location, slots, throttle_seconds, now=None):
+        """The slots not notified about within the last throttle_seconds."""
+        now = time.time() if now is None else now
+        notified = self.last_notified(appointment_type, location)
+        return [slot for slot in slots if slot not in notified or now - notified[slot] >= throttle_seconds]
+
+    def notified_since(self, appointment_type, since):
+        """[(location, slot, notified_at), ...] notified at or after since."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT location, slot, notified_at FROM slots WHERE appointment_type = ? AND notified_at >= ?",
+                (appointment_type, since)
+            ).fetchall()
+
+    def history(self, appointment_type, location=None, since=None):
+        """[(location, slot, first_seen, last_seen, notified_at), ...] most recently seen first."""
+        query = "SELECT location, slot, first_seen, last_seen, notified_at FROM slots WHERE appointment_type = ?"
+        params = [appointment_type]
+        if location is not None:
+            query += " AND location = ?"
+            params.append(location)
+        if since is not None:
+            query += " AND last_seen >= ?"
+            params.append(since)
+        with self.lock:
+            return self.connection.execute(query + " ORDER BY last_seen DESC", params).fetchall()
+
+    def flush(self, now=None):
+        """Write everything buffered this run in one transaction and drop slots not seen for retention_days."""
+        now = time.time() if now is None else now
+        with self.lock:
+            seen_rows = [key + times for key, times in self.pending_seen.items()]
+            notified_rows = [key + (notified_at, notified_at, notified_at) for key, notified_at in self.pending_notified.items()]
+            with self.connection:
+                self.connection.executemany(_UPSERT_SEEN, seen_rows)
+                self.connection.executemany(_UPSERT_NOTIFIED, notified_rows)
+                self.connection.execute("DELETE FROM slots WHERE last_seen < ?", (now - self.retention_seconds,))
+            self.pending_seen.clear()
+            self.pending_notified.clear()
+        return len(seen_rows), len(notified_rows)
+
+    def close(self):
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,121 @@
+import bisect
+import json
+from datetime import datetime
+
+# Subscription file format (JSON list), one entry per person/family being notified:
+# [
+#   {
+#     "name": "Smith family",
+#     "webhook_url": "https://discord.com/api/webhooks/...",
+#     "appointment_type": "Non-CDL Road Test",
+#     "address": "123 Main St, Raleigh, NC",
+#     "distance": 25,
+#     "date_range_start": "2025-08-01",
+#     "date_range_end": "2025-08-31",
+#     "time_range_start": "08:00",
+#     "time_range_end": "17:00"
+#   }
+# ]
+# Everything except webhook_url is optional; missing filters match everything.
+
+
+def _parse_optional(value, fmt, field_name, subscription_name):
+    if not value:
+        return None
+    try:
+        parsed = datetime.strptime(str(value), fmt)
+    except ValueError:
+        print(f"Warning: Invalid {field_name} '{value}' for subscription '{subscription_name}'. Ignoring it.")
+        return None
+    return parsed.date() if fmt == "%Y-%m-%d" else parsed.time()
+
+
+def load_subscriptions(filepath, default_appointment_type):
+    """Read and validate the subscription file. Entries without a webhook_url are skipped."""
+    with open(filepath, 'r') as f:
+        raw_subscriptions = json.load(f)
+
+    subscriptions = []
+    for index, raw in enumerate(raw_subscriptions):
+        name = raw.get("name") or f"subscription {index + 1}"
+        if not raw.get("webhook_url"):
+            print(f"Warning: Subscription '{name}' has no webhook_url. Skipping it.")
+            continue
+        subscriptions.append({
+            "id": index,
+            "name": name,
+            "webhook_url": raw["webhook_url"],
+            "appointment_type": raw.get("appointment_type") or default_appointment_type,
+            "address": raw.get("address"),
+            "distance": str(raw["distance"]) if raw.get("distance") is not None else None,
+            "date_start": _parse_optional(raw.get("date_range_start"), "%Y-%m-%d", "date_range_start", name),
+            "date_end": _parse_optional(raw.get("date_range_end"), "%Y-%m-%d", "date_range_end", name),
+            "time_start": _parse_optional(raw.get("time_range_start"), "%H:%M", "time_range_start", name),
+            "time_end": _parse_optional(raw.get("time_range_end"), "%H:%M", "time_range_end", name),
+        })
+    return subscriptions
+
+
+class SubscriptionIndex:
+    """Subscriptions indexed by (formJourney, location) and sorted by date window start.
+
+    Each subscription needs "form_journey" and "allowed_locations" (a dict of location name -> miles
+    from the subscriber's address, or None for every location) filled in before it is added. The miles
+    decide the sweep order: each location goes by its distance to the nearest subscriber wanting it.
+    """
+
+    def __init__(self, subscriptions):
+        self.subscriptions = {subscription["id"]: subscription for subscription in subscriptions}
+        self.open_location_subscriptions = {}
+        self.location_subscriptions = {}
+        for subscription in subscriptions:
+            if subscription["allowed_locations"] is None:
+                self.open_location_subscriptions.setdefault(subscription["form_journey"], []).append(subscription)
+            else:
+                for location_name in subscription["allowed_locations"]:
+                    self.location_subscriptions.setdefault((subscription["form_journey"], location_name), []).append(subscription)
+        self._sorted_cache = {}
+
+    def form_journeys(self):
+        return sorted({subscription["form_journey"] for subscription in self.subscriptions.values()})
+
+    def locations_for(self, form_journey):
+        """Union of every subscriber's allowed locations for this journey, or None if any of them wants all."""
+        if self.open_location_subscriptions.get(form_journey):
+            return None
+        return {location_name for journey, location_name in self.location_subscriptions if journey == form_journey}
+
+    def date_window(self, form_journey):
+        """(earliest start, latest end) over this journey's subscribers; None on a side means unbounded."""
+        journey_subscriptions = [s for s in self.subscriptions.values() if s["form_journey"] == form_journey]
+        starts = [s["date_start"] for s in journey_subscriptions]
+        ends = [s["date_end"] for s in journey_subscriptions]
+        window_start = None if not starts or None in starts else min(starts)
+        window_end = None if not ends or None in ends else max(ends)
+        return window_start, window_end
+
+    def _subscriptions_by_start(self, form_journey, location_name):
+        cache_key = (form_journey, location_name)
+        if cache_key not in self._sorted_cache:
+            candidates = self.location_subscriptions.get(cache_key, []) + self.open_location_subscriptions.get(form_journey, [])
+            candidates.sort(key=lambda s: s["date_start"] or datetime.min.date())
+            self._sorted_cache[cache_key] = ([s["date_start"] or datetime.min.date() for s in candidates], candidates)
+        return self._sorted_cache[cache_key]
+
+    def match(self, form_journey, location_name, appointment_datetimes):
+        """Map subscription id -> the appointment datetimes from this location that fall inside its windows."""
+        starts, candidates = self._subscriptions_by_start(form_journey, location_name)
+        matches = {}
+        for appointment_dt in appointment_datetimes:
+            appointment_date = appointment_dt.date()
+            appointment_time = appointment_dt.time()
+            # only subscriptions whose window has started by this date can match
+            for subscription in candidates[:bisect.bisect_right(starts, appointment_date)]:
+                if subscription["date_end"] and appointment_date > subscription["date_end"]:
+                    continue
+                if subscription["time_start"] and appointment_time < subscription["time_start"]:
+                    continue
+                if subscription["time_end"] and appointment_time > subscription["time_end"]:
+                    continue
+                matches.setdefault(subscription["id"], []).append(appointment_dt)
+        return matches
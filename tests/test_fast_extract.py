@@ -0,0 +1,143 @@
+import timeit
+
+import pytest
+
+import fast_extract
+
+bs4 = pytest.importorskip("bs4")
+BeautifulSoup = bs4.BeautifulSoup
+
+
+# Reference versions: the BeautifulSoup code fast_extract replaced.
+
+def _bs4_active_location_names(html_text):
+    soup = BeautifulSoup(html_text, 'html.parser')
+    active_location_names = []
+    for loc_div in soup.find_all('div', class_='QflowObjectItem'):
+        classes = loc_div.get('class', [])
+        if 'Active-Unit' in classes and 'disabled-unit' not in classes:
+            name_container = loc_div.find('div', recursive=False)
+            if name_container:
+                location_name_tag = name_container.find('div', recursive=False)
+                if location_name_tag and location_name_tag.string:
+                    active_location_names.append(location_name_tag.string.strip())
+    return active_location_names
+
+
+def _bs4_option_datetimes(html_text):
+    soup = BeautifulSoup(html_text, 'html.parser')
+    return [option.get('data-datetime') for option in soup.find_all('option', attrs={'data-datetime': True})]
+
+
+def _bs4_form_journey_details(html_text):
+    soup = BeautifulSoup(html_text, 'html.parser')
+    fj_content, appt_id_str = None, None
+    for script_tag in soup.find_all('script', type="text/javascript"):
+        if script_tag.string and (match := fast_extract._FORM_JOURNEY_RE.search(script_tag.string)):
+            fj_content = match.group(1)
+            break
+    for select_el in soup.find_all('select'):
+        for option_el in select_el.find_all('option', attrs={'data-appointmenttypeid': True}):
+            if (appt_id := option_el.get('data-appointmenttypeid')) and appt_id.isdigit() and option_el.get_text(strip=True) != '-':
+                appt_id_str = appt_id
+                break
+        if appt_id_str:
+            break
+    return fj_content, appt_id_str
+
+
+_SAMPLE_LOCATIONS_HTML = """
+<div class="UnitIdList QFlowObjectModel">
+  <div class="QflowObjectItem form-control ui-selectable Active-Unit" data-id="101">
+    <div title="Charlotte East">
+      <div>Charlotte East</div>
+      <div class="form-control-child">6635 Executive Circle, Suite 130, Charlotte, NC 28212</div>
+    </div>
+  </div>
+  <div class="QflowObjectItem form-control ui-selectable Active-Unit disabled-unit" data-id="102">
+    <div title="Charlotte South"><div>Charlotte South</div></div>
+  </div>
+  <div class='QflowObjectItem form-control ui-selectable' data-id="103">
+    <div title="Raleigh West"><div>Raleigh West</div></div>
+  </div>
+  <div class="QflowObjectItem form-control ui-selectable Active-Unit" data-id="104" title="a > b">
+    <div title="Wilkesboro"><div>Wilkes &amp; Boro </div></div>
+  </div>
+  <div class="QflowObjectItem form-control ui-selectable Active-Unit" data-id="105">
+    <!-- <div>Not A Location</div> -->
+    <span class="icon"><div>icon</div></span>
+    <div title="Asheboro"><br><span>Open</span><img src="x.png"/><div>Asheboro</div></div>
+  </div>
+  <div data-note="open > 8am" class="QflowObjectItem form-control ui-selectable Active-Unit" data-id="106">
+    <div title="Boone"><div>Boone</div></div>
+  </div>
+  <div class="QflowObjectItem form-control ui-selectable Active-Unit" data-id="107">
+    <div title="Bold"><div><b>Bold &amp; Bright</b></div></div>
+  </div>
+  <div class="QflowObjectItem form-control ui-selectable Active-Unit" data-id="108">
+    <div title="Mixed"><div>Mixed <b>markup</b></div></div>
+  </div>
+  <div class="QflowObjectItem form-control ui-selectable Active-Unit" data-id="109">
+    <div title="Empty"><div></div></div>
+  </div>
+</div>
+"""
+
+_SAMPLE_TIMES_HTML = """
+<select id="6f1a7b21-2558-41bb-8e4d-2cba7a8b1608" class="form-control">
+  <option value="">-</option>
+  <option value="1" data-datetime="7/23/2025 8:00:00 AM">8:00 AM</option>
+  <option value="2" data-datetime='7/23/2025 2:45:00 PM'>2:45 PM</option>
+  <option value="3" data-datetime="">blank</option>
+  <option value="4" data-other="x">not a slot</option>
+  <option title="a > b" value="5" data-datetime="7/24/2025 9:15:00 AM">9:15 AM</option>
+</select>
+"""
+
+_SAMPLE_JOURNEY_HTML = """
+<script type="text/javascript">
+  sessionStorage.setItem("formJourney", "eyJhIjoxfQ==abc");
+</script>
+<select class="form-control">
+  <option data-appointmenttypeid="">-</option>
+  <option data-appointmenttypeid="0">-</option>
+  <option data-appointmenttypeid="8">Motorcycle Skills Test</option>
+</select>
+"""
+
+
+CHECKS = [
+    ("location buttons", fast_extract.extract_active_location_names, _bs4_active_location_names, _SAMPLE_LOCATIONS_HTML),
+    ("time slot options", fast_extract.extract_option_datetimes, _bs4_option_datetimes, _SAMPLE_TIMES_HTML),
+    ("form journey", fast_extract.extract_form_journey_details, _bs4_form_journey_details, _SAMPLE_JOURNEY_HTML),
+]
+
+
+@pytest.mark.parametrize("label, fast_func, reference_func, sample_html", CHECKS, ids=[check[0] for check in CHECKS])
+def test_matches_beautifulsoup(label, fast_func, reference_func, sample_html):
+    assert fast_func(sample_html) == reference_func(sample_html)
+
+
+@pytest.mark.parametrize("name_html", [
+    "<div>Plain</div>",
+    "<div><b>Bold</b></div>",
+    "<div><span><b>Nested</b></span></div>",
+    "<div><!--note--></div>",
+    "<div>Text<!--note--></div>",
+    "<div><br></div>",
+    "<div>  </div>",
+    "<div>A &lt; B</div>",
+])
+def test_location_name_shapes_match_beautifulsoup(name_html):
+    page = f'<div class="QflowObjectItem Active-Unit"><div>{name_html}</div></div>'
+    assert fast_extract.extract_active_location_names(page) == _bs4_active_location_names(page)
+
+
+@pytest.mark.parametrize("label, fast_func, reference_func, sample_html", CHECKS, ids=[check[0] for check in CHECKS])
+def test_faster_than_beautifulsoup(label, fast_func, reference_func, sample_html):
+    sample_html = sample_html * 20
+    fast_seconds = min(timeit.repeat(lambda: fast_func(sample_html), number=20, repeat=3))
+    reference_seconds = min(timeit.repeat(lambda: reference_func(sample_html), number=20, repeat=3))
+    print(f"{label}: fast {fast_seconds / 20 * 1e6:.0f}us vs BeautifulSoup {reference_seconds / 20 * 1e6:.0f}us "
+          f"({reference_seconds / fast_seconds:.1f}x)")
+    assert fast_seconds < reference_seconds
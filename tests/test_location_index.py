@@ -0,0 +1,63 @@
+import os
+import random
+
+from geopy.distance import geodesic
+
+import location_index
+from location_index import BOUNDARY_TOLERANCE, LocationIndex
+
+COORDINATES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ncdot_locations_coordinates_only.json")
+
+LOCATIONS_WITH_FJBASE = {
+    "fjbase": "eyJmb3JtSm91cm5leSI6dHJ1ZX0=",
+    "Charlotte East": {"id": 1, "coordinates": [35.20451966309286, -80.73117073796423]},
+    "Raleigh West": {"id": 2, "coordinates": [35.8032, -78.7267]},
+    "No Coordinates": {"id": 3},
+}
+
+
+def test_from_locations_dict_skips_non_dict_entries():
+    index = LocationIndex.from_locations_dict(LOCATIONS_WITH_FJBASE)
+    assert index.names == ["Charlotte East", "Raleigh West"]
+
+
+def test_index_for_locations_with_fjbase():
+    charlotte = (35.2271, -80.8431)
+    within = dict(location_index.index_for_locations(LOCATIONS_WITH_FJBASE).within(charlotte, 25))
+    assert list(within) == ["Charlotte East"]
+
+
+def test_get_locations_within_distance_with_fjbase(monkeypatch):
+    import beta_requests_scrape as beta
+
+    monkeypatch.setattr(beta.geocode_cache, "geocode", lambda address, **kwargs: (35.2271, -80.8431))
+    allowed, _ = beta.get_locations_within_distance("Charlotte, NC", "200", LOCATIONS_WITH_FJBASE)
+    assert list(allowed) == ["Charlotte East", "Raleigh West"]
+
+
+def _geodesic_within(index, point, radius_miles):
+    return {name for name, coordinates in zip(index.names, index.coordinates)
+            if geodesic(point, tuple(coordinates)).miles <= radius_miles}
+
+
+def test_within_matches_geodesic_at_radii_close_to_office_distances():
+    index = location_index.load_coordinates_file(COORDINATES_FILE)
+    rng = random.Random(12)
+    points = [(rng.uniform(33.8, 36.6), rng.uniform(-84.3, -75.5)) for _ in range(8)]
+    for point in points:
+        for coordinates in rng.sample(list(index.coordinates), 10):
+            office_miles = geodesic(point, tuple(coordinates)).miles
+            # Just inside and outside the office, plus points in the band where haversine alone is unreliable.
+            for radius_miles in (office_miles, office_miles * (1 + 1e-9), office_miles * (1 - 1e-9),
+                                 office_miles * (1 + BOUNDARY_TOLERANCE / 2), office_miles * (1 - BOUNDARY_TOLERANCE / 2)):
+                within = index.within(point, radius_miles)
+                assert {name for name, _ in within} == _geodesic_within(index, point, radius_miles)
+                assert [miles for _, miles in within] == sorted(miles for _, miles in within)
+
+
+def test_haversine_stays_inside_the_boundary_tolerance():
+    index = location_index.load_coordinates_file(COORDINATES_FILE)
+    for point in [(35.2271, -80.8431), (35.5951, -82.5515), (36.0726, -79.7920), (34.2257, -77.9447)]:
+        exact = [geodesic(point, tuple(coordinates)).miles for coordinates in index.coordinates]
+        for haversine_miles, geodesic_miles in zip(index.haversine_miles(point), exact):
+            assert abs(haversine_miles - geodesic_miles) <= geodesic_miles * BOUNDARY_TOLERANCE
@@ -0,0 +1,80 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+
+from notification_throttle import NotificationThrottle
+
+WINDOW_MINUTES = 10
+START_TIME = datetime(2025, 7, 1, 8, 0)
+
+
+def old_should_send(recent_notifications, location_name, datetime_str, current_time, window_minutes=WINDOW_MINUTES):
+    """The per-call full scan plus MD5 hashing NotificationThrottle replaced in scrapedmv.py."""
+    cutoff_time = current_time - timedelta(minutes=window_minutes)
+    keys_to_remove = [h for h, timestamp in recent_notifications.items() if timestamp < cutoff_time]
+    for key in keys_to_remove:
+        del recent_notifications[key]
+    notification_hash = hashlib.md5(f"{location_name}|{datetime_str}".encode()).hexdigest()
+    if notification_hash in recent_notifications:
+        if current_time - recent_notifications[notification_hash] < timedelta(minutes=window_minutes):
+            return False
+    recent_notifications[notification_hash] = current_time
+    return True
+
+
+def new_should_send(throttle, location_name, datetime_str, now):
+    """What scrapedmv's should_send_notification does with the throttle."""
+    key = (location_name, datetime_str)
+    if throttle.seconds_remaining(key, now) > 0:
+        return False
+    throttle.record(key, now)
+    return True
+
+
+def slots(count):
+    return [(f"Location {i % 120}", f"7/{1 + i // 2000}/2025 {i % 2000}") for i in range(count)]
+
+
+def test_same_decisions_as_the_old_scan():
+    old_state = {}
+    throttle = NotificationThrottle(WINDOW_MINUTES * 60)
+    batch = slots(1500)
+    # runs 0 and 1 are inside the window, run 700 is after it expired
+    for run_seconds in (0, 1, 301, 700):
+        current_time = START_TIME + timedelta(seconds=run_seconds)
+        old_decisions = [old_should_send(old_state, loc, dt, current_time) for loc, dt in batch]
+        new_decisions = [new_should_send(throttle, loc, dt, current_time.timestamp()) for loc, dt in batch]
+        assert old_decisions == new_decisions
+    assert len(throttle) == len(old_state)
+
+
+def test_expire_drops_only_entries_past_the_window():
+    throttle = NotificationThrottle(600)
+    for i, key in enumerate(slots(12000)):
+        throttle.record(key, i * 0.1)
+    assert throttle.expire(1200) == 6001
+    assert len(throttle) == 5999
+
+
+def test_benchmark_with_10k_tracked_slots():
+    tracked = slots(12000)
+    now = START_TIME.timestamp()
+    old_state = {hashlib.md5(f"{loc}|{dt}".encode()).hexdigest(): START_TIME for loc, dt in tracked}
+    throttle = NotificationThrottle(WINDOW_MINUTES * 60)
+    for key in tracked:
+        throttle.record(key, now)
+    probes = tracked[::40]
+
+    started = time.perf_counter()
+    for loc, dt in probes:
+        old_should_send(old_state, loc, dt, START_TIME + timedelta(seconds=1))
+    old_seconds = (time.perf_counter() - started) / len(probes)
+
+    started = time.perf_counter()
+    for loc, dt in probes:
+        new_should_send(throttle, loc, dt, now + 1)
+    new_seconds = (time.perf_counter() - started) / len(probes)
+
+    print(f"{len(tracked)} tracked slots: scan+md5 {old_seconds * 1e6:.0f}us per check, "
+          f"expiry queue {new_seconds * 1e6:.1f}us ({old_seconds / new_seconds:.0f}x)")
+    assert new_seconds * 20 < old_seconds